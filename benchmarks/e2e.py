@@ -0,0 +1,241 @@
+"""
+End-to-end benchmark of the API: the service under gunicorn, Devino simulated over HTTP by "manage.py simulate_devino".
+
+    python3 benchmarks/e2e.py --workers 4 --concurrency 16 --requests 2000 --output result.json
+
+Prints JSON with requests per second, latency percentiles, database queries per request
+and RSS of every gunicorn worker for each scenario.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ['send_message', 'add_task', 'get_state_detailing']
+
+CREATE_TOKEN = """
+import django
+django.setup()
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+user, _ = User.objects.get_or_create(username='benchmark')
+print(Token.objects.get_or_create(user=user)[0].key)
+"""
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError('{} did not start'.format(url))
+
+
+def percentile(values, share):
+    # nearest rank
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(int(round(share * len(values))) - 1, 0))]
+
+
+def get_rss(pid):
+    """
+    Resident memory of a process in MB
+    """
+    with open('/proc/{}/status'.format(pid)) as status_file:
+        for line in status_file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def get_children(pid):
+    children = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open('/proc/{}/stat'.format(name)) as stat_file:
+                # the command may contain spaces, the parent pid follows it
+                parent = int(stat_file.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == pid:
+            children.append(int(name))
+    return sorted(children)
+
+
+class Stack(object):
+    """
+    Migrated database, Devino simulator and gunicorn started with benchmarks.settings
+    """
+
+    def __init__(self, workers, latency, log):
+        self.workers = workers
+        self.log = log
+        self.directory = tempfile.TemporaryDirectory()
+        self.simulator_port = get_free_port()
+        self.port = get_free_port()
+        self.url = 'http://127.0.0.1:{}'.format(self.port)
+        self.env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='benchmarks.settings',
+            PYTHONPATH=BASE_DIR,
+            BENCHMARK_SQLITE=os.path.join(self.directory.name, 'db.sqlite3'),
+            BENCHMARK_DEVINO_URL='http://127.0.0.1:{}'.format(self.simulator_port),
+            BENCHMARK_LATENCY=str(latency),
+        )
+        self.processes = []
+
+    def __enter__(self):
+        # output of every process goes to the log, startup failures are found there
+        self.log_file = open(self.log, 'w')
+        try:
+            self.manage('migrate', '--noinput')
+            self.manage('createcachetable')
+            self.token = subprocess.check_output([sys.executable, '-c', CREATE_TOKEN], cwd=BASE_DIR, env=self.env,
+                                                 stderr=self.log_file).decode().split()[-1]
+
+            self.start([sys.executable, 'manage.py', 'simulate_devino', '--port', str(self.simulator_port)])
+            # the gunicorn script of the interpreter's environment, 19.x can't be run with -m
+            gunicorn = os.path.join(os.path.dirname(sys.executable), 'gunicorn')
+            self.gunicorn = self.start([gunicorn, 'project.wsgi', '--workers', str(self.workers),
+                                        '--bind', '127.0.0.1:{}'.format(self.port)])
+            wait_for('http://127.0.0.1:{}/'.format(self.simulator_port))
+            wait_for(self.url)
+        except Exception as ex:
+            self.__exit__()
+            raise RuntimeError('{}, see {}'.format(ex, self.log))
+        return self
+
+    def __exit__(self, *args):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.wait()
+        self.log_file.close()
+        self.directory.cleanup()
+
+    def manage(self, *args):
+        subprocess.check_call([sys.executable, 'manage.py'] + list(args), cwd=BASE_DIR, env=self.env,
+                              stdout=self.log_file, stderr=self.log_file)
+
+    def start(self, args):
+        process = subprocess.Popen(args, cwd=BASE_DIR, env=self.env, stdout=self.log_file, stderr=self.log_file)
+        self.processes.append(process)
+        return process
+
+    def get_workers_rss(self):
+        return {str(pid): round(get_rss(pid), 1) for pid in get_children(self.gunicorn.pid)}
+
+
+def make_request(scenario, number, contacts):
+    if scenario == 'send_message':
+        return 'post', '/api/send_message/', {'json': {
+            'sender_email': 'sender@example.com', 'sender_name': 'Sender',
+            'recipient_email': 'recipient{}@example.com'.format(number), 'recipient_name': 'Recipient',
+            'subject': 'Subject', 'text': 'Text ' * 50,
+        }}
+    if scenario == 'add_task':
+        return 'post', '/api/add_task/', {'json': {
+            'name': 'Task {}'.format(number), 'sender_email': 'sender@example.com', 'sender_name': 'Sender',
+            'subject': 'Subject', 'text': 'Text',
+            'contact_list': [[id_contact, True] for id_contact in range(1, contacts + 1)],
+        }}
+    if scenario == 'get_state_detailing':
+        # a task of its own for every request, so the answers cache is not what is measured
+        return 'get', '/api/get_state_detailing/', {'params': {'id_task': number, 'range_start': 1, 'range_end': 100}}
+    raise ValueError('Unknown scenario {}'.format(scenario))
+
+
+def run_scenario(stack, scenario, concurrency, count, contacts, warmup):
+    local = threading.local()
+
+    def call(number):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+            local.session.headers['Authorization'] = 'Token {}'.format(stack.token)
+        method, path, kwargs = make_request(scenario, number, contacts)
+        started = time.time()
+        response = local.session.request(method, stack.url + path, **kwargs)
+        return time.time() - started, response.status_code, int(response.headers.get('X-Db-Queries', 0))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(1, warmup + 1)))
+
+        started = time.time()
+        results = list(executor.map(call, range(warmup + 1, warmup + count + 1)))
+        duration = time.time() - started
+
+    latencies = [latency for latency, status_code, queries in results]
+    return {
+        'requests': count,
+        'concurrency': concurrency,
+        'duration': round(duration, 3),
+        'requests_per_second': round(count / duration, 1),
+        'latency': {
+            'mean': round(sum(latencies) / len(latencies), 4),
+            'p50': round(percentile(latencies, 0.5), 4),
+            'p95': round(percentile(latencies, 0.95), 4),
+            'p99': round(percentile(latencies, 0.99), 4),
+        },
+        'queries_per_request': round(sum(queries for latency, status_code, queries in results) / count, 2),
+        'status_codes': dict(Counter(str(status_code) for latency, status_code, queries in results)),
+        'rss_mb': stack.get_workers_rss(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='Scenarios to run, all by default')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight')
+    parser.add_argument('--requests', type=int, default=1000, help='Measured requests of each scenario')
+    parser.add_argument('--warmup', type=int, default=50, help='Requests before measuring')
+    parser.add_argument('--contacts', type=int, default=10000, help='contact_list rows of add_task')
+    parser.add_argument('--latency', type=float, default=0.05, help='Median seconds of a simulated Devino call')
+    parser.add_argument('--output', help='File for the JSON result, stdout by default')
+    parser.add_argument('--log', default='e2e.log', help='File for the output of the started processes')
+    args = parser.parse_args()
+    args.scenario = args.scenario or SCENARIOS
+
+    result = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'log')},
+        'scenarios': {},
+    }
+    with Stack(args.workers, args.latency, args.log) as stack:
+        for scenario in args.scenario:
+            result['scenarios'][scenario] = run_scenario(stack, scenario, args.concurrency, args.requests,
+                                                         args.contacts, args.warmup)
+
+    output = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
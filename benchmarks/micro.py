@@ -0,0 +1,244 @@
+"""
+Micro-benchmarks of the building blocks of the API, run on a throwaway test database.
+
+    python3 benchmarks/micro.py --output result.json                # measure
+    python3 benchmarks/micro.py --save benchmarks/baseline.json     # store a new baseline
+    python3 benchmarks/micro.py --compare benchmarks/baseline.json  # exit 1 on a regression
+
+A measurement regresses when it is slower than the baseline by more than its tolerance:
+"tolerance" of the benchmark in the baseline file or --tolerance. Baselines depend on the machine,
+compare runs of the same host.
+"""
+import os
+import sys
+import json
+import uuid
+import timeit
+import argparse
+import datetime
+import platform
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARKS = OrderedDict()
+
+TASK = {'name': 'Task', 'sender_email': 'sender@example.com', 'sender_name': 'Sender', 'subject': 'Subject',
+        'text': 'Text'}
+MESSAGE = {'sender_email': 'sender@example.com', 'sender_name': 'Sender', 'recipient_email': 'recipient@example.com',
+           'recipient_name': 'Recipient', 'subject': 'Subject', 'text': 'Text ' * 50, 'user_message_id': '1'}
+
+
+def benchmark(number=1, repeat=5, tolerance=None):
+    """
+    Register a function that prepares the data and returns the callable to measure,
+    the best of repeat runs of number calls is kept. Tolerance of noisy benchmarks goes to the baseline.
+    """
+    def register(fn):
+        BENCHMARKS[fn.__name__] = (fn, number, repeat, tolerance)
+        return fn
+    return register
+
+
+def make_contact_list(size):
+    return [[id_contact, True] for id_contact in range(1, size + 1)]
+
+
+@benchmark(number=1, repeat=3)
+def add_task_validate_100k():
+    from core import serializers
+    data = dict(TASK, contact_list=make_contact_list(100000))
+
+    def run():
+        serializer = serializers.AddTask(data=data)
+        assert serializer.is_valid(), serializer.errors
+    return run
+
+
+@benchmark(number=1, repeat=3)
+def add_task_file_validate_100k():
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from core import serializers
+    content = ''.join('{},1\n'.format(id_contact) for id_contact in range(1, 100001)).encode()
+
+    def run():
+        data = dict(TASK, contact_file=SimpleUploadedFile('contacts.csv', content))
+        serializer = serializers.AddTaskFile(data=data)
+        assert serializer.is_valid(), serializer.errors
+        list(serializer.validated_data['contact_list'])
+    return run
+
+
+@benchmark(number=10, repeat=5)
+def get_status_messages_validate_10k():
+    from core import serializers
+    data = {'id_messages': [uuid.uuid4().hex for _ in range(10000)]}
+
+    def run():
+        serializer = serializers.GetStatusMessages(data=data)
+        assert serializer.is_valid(), serializer.errors
+    return run
+
+
+@benchmark(number=1000, repeat=5)
+def json_dumps_send_message():
+    from core.utils import date_handler
+    data = dict(MESSAGE, dc=datetime.datetime(2017, 7, 15, 16, 0))
+
+    def run():
+        json.dumps(data, default=date_handler)
+    return run
+
+
+@benchmark(number=5, repeat=5)
+def json_dumps_add_task_100k():
+    from core.utils import date_handler
+    data = dict(TASK, start=datetime.datetime(2017, 7, 15, 16, 0), contact_list=make_contact_list(100000))
+
+    def run():
+        json.dumps(data, default=date_handler)
+    return run
+
+
+@benchmark(number=200, repeat=5, tolerance=0.5)
+def audit_write_send_message():
+    from email_devino.client import ApiAnswer
+    from core import audit, consts
+    answer = ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': [uuid.uuid4().hex]})
+
+    def run():
+        audit.bulk_write([audit.make_record(consts.SEND_MESSAGE, MESSAGE, answer=answer, latency=0.1)])
+    return run
+
+
+@benchmark(number=20, repeat=5, tolerance=0.5)
+def audit_write_batch_100():
+    from email_devino.client import ApiAnswer
+    from core import audit, consts
+    answer = ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': [uuid.uuid4().hex]})
+
+    def run():
+        audit.bulk_write([audit.make_record(consts.SEND_MESSAGE, MESSAGE, answer=answer, latency=0.1)
+                          for _ in range(100)])
+    return run
+
+
+@benchmark(number=20, repeat=5, tolerance=0.5)
+def audit_write_add_task_10k():
+    from django.test.utils import override_settings
+    from email_devino.client import ApiAnswer
+    from core import audit, consts
+    answer = ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': 1})
+    data = dict(TASK, contact_list=make_contact_list(10000))
+
+    def run():
+        # the contact list goes to the blob store like in production
+        with override_settings(DEVINO_AUDIT_BLOB_THRESHOLD=4096):
+            audit.bulk_write([audit.make_record(consts.ADD_TASK, data, answer=answer, latency=0.1)])
+    return run
+
+
+def measure(names):
+    results = OrderedDict()
+    for name in names:
+        fn, number, repeat, tolerance = BENCHMARKS[name]
+        timings = timeit.repeat(fn(), number=number, repeat=repeat)
+        results[name] = {'seconds': min(timings) / number, 'number': number, 'repeat': repeat}
+        if tolerance is not None:
+            results[name]['tolerance'] = tolerance
+        sys.stderr.write('{:<36} {:>12.6f} s\n'.format(name, results[name]['seconds']))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    {name: {'seconds', 'baseline', 'ratio', 'tolerance', 'regressed'}} of the benchmarks in both
+    """
+    comparison = OrderedDict()
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        allowed = baseline[name].get('tolerance', tolerance)
+        ratio = result['seconds'] / baseline[name]['seconds']
+        comparison[name] = {
+            'seconds': result['seconds'],
+            'baseline': baseline[name]['seconds'],
+            'ratio': round(ratio, 3),
+            'tolerance': allowed,
+            'regressed': ratio > 1 + allowed,
+        }
+    return comparison
+
+
+def get_environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'node': platform.node(),
+            'processor': platform.processor()}
+
+
+def setup_django():
+    sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+    import django
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+    from django.test.runner import DiscoverRunner
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    return runner, runner.setup_databases()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='append', choices=list(BENCHMARKS),
+                        help='Benchmarks to run, all by default')
+    parser.add_argument('--save', metavar='FILE', help='Store the measurements as the baseline')
+    parser.add_argument('--compare', metavar='FILE', help='Compare with the baseline and fail on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown share for benchmarks without their own tolerance')
+    parser.add_argument('--any-environment', action='store_true',
+                        help='Compare with a baseline recorded in another environment')
+    parser.add_argument('--output', help='File for the JSON result, stdout by default')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        # timings of another host or python say nothing about the code
+        if baseline['environment'] != get_environment() and not args.any_environment:
+            sys.stderr.write('The baseline was recorded in {}, this is {}. Save a baseline here with --save '
+                             'or pass --any-environment\n'.format(baseline['environment'], get_environment()))
+            sys.exit(2)
+
+    runner, old_config = setup_django()
+    try:
+        results = measure(args.benchmark or list(BENCHMARKS))
+    finally:
+        runner.teardown_databases(old_config)
+
+    result = {'environment': get_environment(), 'benchmarks': results}
+    regressed = []
+    if baseline is not None:
+        result['comparison'] = compare(results, baseline['benchmarks'], args.tolerance)
+        regressed = [name for name, item in result['comparison'].items() if item['regressed']]
+        result['regressed'] = regressed
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump({'environment': result['environment'], 'benchmarks': results}, baseline_file, indent=2)
+            baseline_file.write('\n')
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+    if regressed:
+        sys.stderr.write('Regressed: {}\n'.format(', '.join(regressed)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
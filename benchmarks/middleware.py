@@ -0,0 +1,18 @@
+from django.db import connection, reset_queries
+
+
+class QueryCountMiddleware(object):
+    """
+    X-Db-Queries header with the number of queries the request made
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        connection.force_debug_cursor = True
+        reset_queries()
+        response = self.get_response(request)
+        response['X-Db-Queries'] = str(len(connection.queries))
+        connection.force_debug_cursor = False
+        return response
@@ -0,0 +1,35 @@
+"""
+Settings of the service under benchmarks/e2e.py: a database of its own, Devino is the simulator at BENCHMARK_DEVINO_URL
+"""
+import os
+import json
+
+from project.settings import *
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+# JSON of a Django database definition, a throwaway SQLite file by default
+DATABASES = {
+    'default': json.loads(os.environ['BENCHMARK_DATABASE']) if os.environ.get('BENCHMARK_DATABASE') else {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCHMARK_SQLITE', '/tmp/email-service-benchmark.sqlite3'),
+        'OPTIONS': {'timeout': 30},
+    }
+}
+
+MIDDLEWARE = ['benchmarks.middleware.QueryCountMiddleware'] + MIDDLEWARE
+
+DEVINO_URL = os.environ.get('BENCHMARK_DEVINO_URL', 'http://127.0.0.1:8001')
+DEVINO_BACKEND = 'devino'
+# the stack is measured, not the limits that protect Devino
+DEVINO_RATE_LIMITS = {}
+
+DEVINO_SIMULATOR = {
+    'seed': 1,
+    'default': {
+        'latency': {'distribution': 'lognormal', 'median': float(os.environ.get('BENCHMARK_LATENCY', 0.05)),
+                    'sigma': 0.5},
+    },
+    'get_state_detailing': {'result_size': 1000},
+}
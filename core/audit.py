@@ -0,0 +1,192 @@
+import os
+import json
+import base64
+import binascii
+import time
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from email_devino.client import DevinoException
+
+from core import blobs
+from core import consts
+from core import models
+
+logger = logging.getLogger(__name__)
+
+
+def make_record(api_resource, data, answer=None, exception=None, latency=None, dc=None):
+    """
+    Unsaved DevinoCall for an upstream answer or DevinoException
+    """
+    record = models.DevinoCall(
+        api_resource=api_resource,
+        data=data,
+        latency=latency,
+        dc=dc or timezone.now(),
+    )
+
+    if exception is not None:
+        record.code = exception.error.code if exception.error else consts.STATUS_ERROR_API
+        record.description = _truncate(exception.error.description if exception.error else exception.message, 256)
+        record.is_fail = True
+    else:
+        record.code = answer.code
+        record.description = _truncate(answer.description, 256)
+        record.result = answer.result
+    return record
+
+
+def call(api_resource, fn, data=None, audit_data=None):
+    """
+    Call fn(**data) and return (answer, record) with the upstream latency in the record.
+    answer is None when fn raised DevinoException, the record then describes the error.
+    audit_data replaces data in the record when data is not worth keeping as is.
+    """
+    if audit_data is None:
+        audit_data = data
+
+    dc = timezone.now()
+    started = time.time()
+    try:
+        answer = fn(**data) if data is not None else fn()
+    except DevinoException as ex:
+        return None, make_record(api_resource, audit_data, exception=ex, latency=time.time() - started, dc=dc)
+    return answer, make_record(api_resource, audit_data, answer=answer, latency=time.time() - started, dc=dc)
+
+
+def write(records):
+    if settings.DEVINO_AUDIT_MODE == consts.AUDIT_MODE_BUFFERED:
+        writer.write(records)
+    else:
+        bulk_write(records)
+
+
+def bulk_write(records):
+    """
+    Save DevinoCall records with one INSERT, large payloads go to the blob store first
+    """
+    blobs.offload(records)
+    models.DevinoCall.objects.bulk_create(records)
+
+
+def query(api_resource=None, dc_from=None, dc_to=None, is_fail=None, code=None, data_contains=None, cursor=None,
+          limit=100):
+    """
+    DevinoCall records newest first and the cursor of the next page (None on the last one).
+    Pages are taken by keyset on (dc, id), so a deep page costs the same as the first one.
+    """
+    records = models.DevinoCall.objects.order_by('-dc', '-id')
+    if api_resource is not None:
+        records = records.filter(api_resource=api_resource)
+    if dc_from is not None:
+        records = records.filter(dc__gte=dc_from)
+    if dc_to is not None:
+        records = records.filter(dc__lt=dc_to)
+    if is_fail is not None:
+        records = records.filter(is_fail=is_fail)
+    if code is not None:
+        records = records.filter(code=code)
+    if data_contains:
+        records = records.filter(data__contains=data_contains)
+    if cursor is not None:
+        dc, id = cursor
+        records = records.filter(Q(dc__lt=dc) | Q(dc=dc, id__lt=id))
+
+    records = list(records[:limit + 1])
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor(records[-1])
+    return records, next_cursor
+
+
+def encode_cursor(record):
+    position = json.dumps([record.dc.isoformat(), record.id])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(value):
+    """
+    (dc, id) of a cursor, ValueError for a malformed one
+    """
+    try:
+        dc, id = json.loads(base64.urlsafe_b64decode(value.encode()).decode())
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+    dc = parse_datetime(dc) if isinstance(dc, str) else None
+    if dc is None or not isinstance(id, int):
+        raise ValueError('Invalid cursor')
+    return dc, id
+
+
+class BufferedWriter(object):
+    """
+    Collects audit records in memory and saves them in bulk when DEVINO_AUDIT_BUFFER_SIZE records
+    are waiting or every DEVINO_AUDIT_FLUSH_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._records = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+
+    def write(self, records):
+        with self._lock:
+            self._start()
+            self._records.extend(records)
+            is_full = len(self._records) >= settings.DEVINO_AUDIT_BUFFER_SIZE
+        if is_full:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                records, self._records = self._records, []
+            if not records:
+                return
+
+            try:
+                bulk_write(records)
+            except Exception:
+                logger.exception('Failed to save %s audit records', len(records))
+                with self._lock:
+                    # keep them for the next flush, but don't grow without limit while the database is down
+                    self._records[:0] = records
+                    del self._records[:-settings.DEVINO_AUDIT_BUFFER_MAX]
+
+    def _start(self):
+        # a forked worker drops records of its parent and runs its own flusher
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        self._records = []
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.DEVINO_AUDIT_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+def _truncate(value, length):
+    if isinstance(value, str):
+        return value[:length]
+    return value
+
+
+writer = BufferedWriter()
+atexit.register(writer.flush)
@@ -0,0 +1,105 @@
+import json
+import zlib
+import hashlib
+import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core import models
+from core.utils import date_handler
+
+
+def offload(records):
+    """
+    Move data and result of records above DEVINO_AUDIT_BLOB_THRESHOLD bytes into AuditBlob.
+    Identical payloads share one blob, the records keep only its hash and size.
+    """
+    threshold = settings.DEVINO_AUDIT_BLOB_THRESHOLD
+    if threshold is None:
+        return
+
+    contents = {}
+    for record in records:
+        if record.data is not None and not record.data_hash:
+            content = _dumps(record.data)
+            if len(content) > threshold:
+                record.data_hash, record.data_size = _add(contents, content)
+                record.data = None
+        if record.result is not None and not record.result_hash:
+            content = _dumps(record.result)
+            if len(content) > threshold:
+                record.result_hash, record.result_size = _add(contents, content)
+                record.result = None
+    save(contents)
+
+
+def save(contents):
+    """
+    Store {hash: content} skipping the blobs that already exist
+    """
+    existing = set(models.AuditBlob.objects.filter(hash__in=contents).values_list('hash', flat=True))
+    # keep reused blobs away from delete_orphans
+    models.AuditBlob.objects.filter(hash__in=existing).update(dm=timezone.now())
+    for blob_hash, content in contents.items():
+        if blob_hash in existing:
+            continue
+        try:
+            with transaction.atomic():
+                models.AuditBlob.objects.create(hash=blob_hash, size=len(content), content=zlib.compress(content))
+        except IntegrityError:
+            # saved by a concurrent request
+            pass
+
+
+def get(blob_hash):
+    blob = models.AuditBlob.objects.get(hash=blob_hash)
+    return zlib.decompress(bytes(blob.content))
+
+
+def get_data(record):
+    if record.data_hash:
+        return json.loads(get(record.data_hash).decode())
+    return record.data
+
+
+def get_result(record):
+    if record.result_hash:
+        return json.loads(get(record.result_hash).decode())
+    return record.result
+
+
+def delete_orphans(batch_size, now=None):
+    """
+    Delete blobs no record refers to. Recently used blobs are kept,
+    their records may still be waiting in the buffered audit writer.
+    """
+    now = now or timezone.now()
+    used_before = now - datetime.timedelta(seconds=settings.DEVINO_AUDIT_BLOB_ORPHAN_GRACE)
+    orphans = models.AuditBlob.objects.filter(dm__lt=used_before).exclude(
+        hash__in=models.DevinoCall.objects.exclude(data_hash='').values('data_hash'),
+    ).exclude(
+        hash__in=models.DevinoCall.objects.exclude(result_hash='').values('result_hash'),
+    )
+
+    deleted = 0
+    while True:
+        hashes = list(orphans.values_list('hash', flat=True)[:batch_size])
+        if not hashes:
+            break
+        models.AuditBlob.objects.filter(hash__in=hashes).delete()
+        deleted += len(hashes)
+        if len(hashes) < batch_size:
+            break
+    return deleted
+
+
+def _dumps(value):
+    return json.dumps(value, default=date_handler, separators=(',', ':')).encode()
+
+
+def _add(contents, content):
+    blob_hash = hashlib.sha256(content).hexdigest()
+    contents[blob_hash] = content
+    return blob_hash, len(content)
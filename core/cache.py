@@ -0,0 +1,163 @@
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from email_devino import client as devino_client
+from email_devino.client import DevinoException
+
+from core import clients
+from core import consts
+from core import resilience
+from core.exceptions import UpstreamUnavailable
+from core.utils import date_handler
+
+logger = logging.getLogger(__name__)
+
+SENDER_ADDRESSES_KEY = 'devino:sender_addresses'
+SENDER_ADDRESSES_LOCK_KEY = 'devino:sender_addresses:lock'
+
+FINISHED_TASK_STATES = (devino_client.STATE_FINISHED, devino_client.STATE_CANCELED, devino_client.STATE_DELETED,
+                        devino_client.STATE_FAILED)
+
+
+class LRUCache(object):
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, max_size):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_resources = LRUCache()
+
+
+class ResourceCache(object):
+    """
+    Answers of a Devino resource by id, kept in the worker's LRU.
+    Entries are checked against a version in the shared cache,
+    so an invalidation in one worker is seen by all of them.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def _version_key(self, resource_id):
+        return 'devino:{}:{}:version'.format(self.name, resource_id)
+
+    def version(self, resource_id):
+        key = self._version_key(resource_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, settings.DEVINO_RESOURCE_CACHE_TTL)
+            version = cache.get(key)
+        return version
+
+    def get(self, resource_id):
+        entry = _resources.get((self.name, resource_id))
+        if entry is None:
+            return None
+
+        version, expires, value = entry
+        if expires < time.time() or version != cache.get(self._version_key(resource_id)):
+            return None
+        return value
+
+    def set(self, resource_id, value, version):
+        # version must be taken before the upstream call, an invalidation in between makes the entry stale
+        entry = (version, time.time() + settings.DEVINO_RESOURCE_CACHE_TTL, value)
+        _resources.set((self.name, resource_id), entry, settings.DEVINO_RESOURCE_CACHE_SIZE)
+
+    def invalidate(self, resource_id):
+        cache.set(self._version_key(resource_id), uuid.uuid4().hex, settings.DEVINO_RESOURCE_CACHE_TTL)
+        _resources.delete((self.name, resource_id))
+
+
+templates = ResourceCache('template')
+tasks = ResourceCache('task')
+
+
+def fetch_sender_addresses():
+    answer = resilience.call(consts.GET_SENDER_ADDRESSES, clients.get_client().get_sender_addresses)
+    emails = [data['SenderAddress'] for data in answer.result if data['Confirmed'] is True]
+
+    entry = {'emails': emails, 'expires': time.time() + settings.DEVINO_SENDER_ADDRESSES_TTL}
+    cache.set(SENDER_ADDRESSES_KEY, entry,
+              settings.DEVINO_SENDER_ADDRESSES_TTL + settings.DEVINO_SENDER_ADDRESSES_STALE_TTL)
+    return emails
+
+
+def get_sender_addresses():
+    """
+    Confirmed sender addresses. An expired list is still returned while it is refreshed
+    in background, so a slow Devino never leaves the form without choices.
+    """
+    entry = cache.get(SENDER_ADDRESSES_KEY)
+    if entry is None:
+        return fetch_sender_addresses()
+
+    # the lock lets only one worker revalidate
+    if entry['expires'] < time.time() and cache.add(SENDER_ADDRESSES_LOCK_KEY, True, settings.DEVINO_READ_TIMEOUT):
+        threading.Thread(target=_revalidate_sender_addresses, daemon=True).start()
+    return entry['emails']
+
+
+def invalidate_sender_addresses():
+    cache.delete(SENDER_ADDRESSES_KEY)
+
+
+def _revalidate_sender_addresses():
+    try:
+        fetch_sender_addresses()
+    except DevinoException as ex:
+        logger.warning('Sender addresses were not refreshed: %s', ex.message)
+    except UpstreamUnavailable as ex:
+        logger.warning('Sender addresses were not refreshed: %s', ex.detail)
+    finally:
+        cache.delete(SENDER_ADDRESSES_LOCK_KEY)
+        close_old_connections()
+
+
+def request_key(api_resource, data):
+    payload = json.dumps(data, sort_keys=True, default=date_handler)
+    return 'devino:{}:{}'.format(api_resource, hashlib.sha1(payload.encode()).hexdigest())
+
+
+def is_task_finished(id_task):
+    """
+    Whether the tasks cache knows the task as finished. Devino is not asked,
+    an unknown task counts as unfinished.
+    """
+    if not id_task:
+        return False
+
+    answer_data = tasks.get(id_task)
+    result = answer_data['result'] if answer_data else None
+    return isinstance(result, dict) and result.get('State') in FINISHED_TASK_STATES
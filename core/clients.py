@@ -0,0 +1,138 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from email_devino import client as devino_client
+from email_devino.client import DevinoClient
+from email_devino.client import DevinoError
+from email_devino.client import DevinoException
+
+_lock = threading.Lock()
+_clients = {}
+_local = threading.local()
+
+
+class PooledDevinoClient(DevinoClient):
+    """
+    DevinoClient sending requests through a shared keep-alive session
+    """
+
+    def __init__(self, login, password, session, url=devino_client.REST_URL, timeout=None):
+        super(PooledDevinoClient, self).__init__(login, password, url)
+        self.session = session
+        self.timeout = timeout
+
+    def _request(self, path, headers, params=None, json=None, method=devino_client.METHOD_GET):
+        params = dict(params or {}, format='json')
+        request_url = self.url + path
+
+        try:
+            response = self._send(method, request_url, params=params, json=json, headers=headers,
+                                  timeout=getattr(_local, 'timeout', None) or self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as ex:
+            raise DevinoException(
+                message='Ошибка соединения',
+                base_exception=ex,
+            )
+
+        try:
+            answer = response.json()
+        except ValueError:
+            # gateway and proxy errors come with an HTML body or none
+            answer = None
+
+        if 400 <= response.status_code <= 500 and isinstance(answer, dict):
+            error_description = answer
+            error = DevinoError(
+                code=error_description.get('Code'),
+                description=error_description.get('Description'),
+            )
+            raise DevinoException(
+                message='Ошибка отправки {0}-запроса'.format(method),
+                http_status=response.status_code,
+                error=error,
+            )
+
+        if response.status_code >= 400 or answer is None:
+            raise DevinoException(
+                message='Ошибка сервера {0}'.format(response.status_code),
+                http_status=response.status_code,
+            )
+
+        return answer
+
+    def _send(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+
+class ClientMethod(object):
+    """
+    Calls a method of the process-wide client, resolved at call time
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        return getattr(get_client(), self.name)(*args, **kwargs)
+
+
+@contextmanager
+def timeout(value):
+    """
+    Timeout of the requests the thread makes in the block instead of the client's one
+    """
+    previous = getattr(_local, 'timeout', None)
+    _local.timeout = value
+    try:
+        yield
+    finally:
+        _local.timeout = previous
+
+
+def create_session():
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.DEVINO_POOL_SIZE)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def create_client():
+    client_class = PooledDevinoClient
+    if settings.DEVINO_BACKEND == 'simulator':
+        from core.simulator import SimulatedDevinoClient
+        client_class = SimulatedDevinoClient
+
+    return client_class(
+        settings.DEVINO_LOGIN,
+        settings.DEVINO_PASSWORD,
+        session=create_session(),
+        url=settings.DEVINO_URL,
+        timeout=(settings.DEVINO_CONNECT_TIMEOUT, settings.DEVINO_READ_TIMEOUT),
+    )
+
+
+def get_client():
+    # keyed by pid so forked workers never share sockets with their parent
+    pid = os.getpid()
+    client = _clients.get(pid)
+    if client is None:
+        with _lock:
+            client = _clients.get(pid)
+            if client is None:
+                client = create_client()
+                _clients.clear()
+                _clients[pid] = client
+    return client
+
+
+def reset():
+    with _lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
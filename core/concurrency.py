@@ -0,0 +1,112 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+
+from core import consts
+from core import metrics
+from core import ratelimit
+
+
+class Slot(object):
+    # the audit record of the call made in the slot, None when no call was made
+    record = None
+
+
+class AdaptiveLimiter(object):
+    """
+    Limits the calls to Devino a worker process has in flight, the limit follows Devino's health (AIMD):
+    it grows by one per limit of calls completed while it was reached
+    and is cut by DEVINO_CONCURRENCY_BACKOFF on a connection error or a call slower than its latency limit.
+    Requests over the limit wait up to DEVINO_CONCURRENCY_MAX_WAIT seconds for a slot, then get 429.
+    The state is exported as Prometheus gauges by the api_resource of the calls.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.api_resources = [api_resource for api_resource in consts.API if ratelimit.get_bucket(api_resource) == name]
+        self.limit = settings.DEVINO_CONCURRENCY_INITIAL
+        self.in_flight = 0
+        self.queued = 0
+        self._condition = threading.Condition()
+        # gauges are first set by a call, importing the module doesn't open the metric files
+        self._exported = False
+
+    @contextmanager
+    def slot(self, max_wait=None, api_resource=None):
+        self.acquire(max_wait, api_resource)
+        slot = Slot()
+        try:
+            yield slot
+        finally:
+            self.release(slot.record, api_resource)
+
+    def acquire(self, max_wait=None, api_resource=None):
+        if max_wait is None:
+            max_wait = settings.DEVINO_CONCURRENCY_MAX_WAIT
+        queued = metrics.concurrency_queued.labels(api_resource=api_resource or self.name)
+        deadline = time.time() + max_wait
+        with self._condition:
+            if not self._exported:
+                self._export_limit()
+            self.queued += 1
+            queued.inc()
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise Throttled(detail='Too many requests to Devino are in progress.')
+                    self._condition.wait(remaining)
+                self.in_flight += 1
+                metrics.concurrency_in_flight.labels(api_resource=api_resource or self.name).inc()
+            finally:
+                self.queued -= 1
+                queued.dec()
+
+    def release(self, record=None, api_resource=None):
+        if api_resource is None:
+            api_resource = record.api_resource if record is not None else self.name
+        with self._condition:
+            was_full = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            metrics.concurrency_in_flight.labels(api_resource=api_resource).dec()
+            if record is not None:
+                if self.is_overloaded(record):
+                    self.limit = max(settings.DEVINO_CONCURRENCY_MIN, self.limit * settings.DEVINO_CONCURRENCY_BACKOFF)
+                elif was_full:
+                    # an idle worker says nothing about how much more Devino can take
+                    self.limit = min(settings.DEVINO_CONCURRENCY_MAX, self.limit + 1 / self.limit)
+            self._condition.notify(max(int(self.limit) - self.in_flight, 0))
+            self._export_limit()
+
+    def is_overloaded(self, record):
+        latency_limit = settings.DEVINO_CONCURRENCY_LATENCY_LIMITS.get(
+            record.api_resource, settings.DEVINO_CONCURRENCY_LATENCY_LIMIT)
+        # validation errors are answers, internal_error without an answer is a connection error or a 5xx
+        return record.code == consts.STATUS_ERROR_API or (record.latency or 0) > latency_limit
+
+    def _export_limit(self):
+        self._exported = True
+        for api_resource in self.api_resources:
+            metrics.concurrency_limit.labels(api_resource=api_resource).set(self.limit)
+
+    def get_state(self):
+        with self._condition:
+            return {
+                'name': self.name,
+                'pid': os.getpid(),
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+            }
+
+
+limiters = {name: AdaptiveLimiter(name) for name in (consts.RATE_LIMIT_SEND, consts.RATE_LIMIT_BULK,
+                                                     consts.RATE_LIMIT_READ)}
+
+
+def get_limiter(api_resource):
+    return limiters[ratelimit.get_bucket(api_resource)]
@@ -19,7 +19,32 @@ API = [GET_SENDER_ADDRESSES, ADD_SENDER_ADDRESS, DEL_SENDER_ADDRESS, GET_TASKS_L
        EDIT_TASK_STATUS, GET_TEMPLATE, ADD_TEMPLATE, EDIT_TEMPLATE, DEL_TEMPLATE, GET_STATE, GET_STATE_DETAILING,
        SEND_MESSAGE, GET_STATUS_MESSAGE]
 API_CHOICES = [(status, status) for status in API]
+READ_API = [GET_SENDER_ADDRESSES, GET_TASKS_LIST, GET_TASK, GET_TEMPLATE, GET_STATE, GET_STATE_DETAILING,
+            GET_STATUS_MESSAGE]
 
 STATUS_OK = 'ok'
 STATUS_BAD_REQUEST = 'validation_error'
 STATUS_ERROR_API = 'internal_error'
+STATUS_THROTTLED = 'throttled'     # not a Devino code, the call was not made
+STATUS_UNAVAILABLE = 'unavailable'     # not a Devino code, the circuit breaker is open
+
+QUEUE_STATUS_NEW = 'new'
+QUEUE_STATUS_PROCESSING = 'processing'
+QUEUE_STATUS_SENT = 'sent'
+QUEUE_STATUS_FAILED = 'failed'
+
+QUEUE_STATUSES = [QUEUE_STATUS_NEW, QUEUE_STATUS_PROCESSING, QUEUE_STATUS_SENT, QUEUE_STATUS_FAILED]
+QUEUE_STATUS_CHOICES = [(status, status) for status in QUEUE_STATUSES]
+
+AUDIT_MODE_SYNC = 'sync'
+AUDIT_MODE_BUFFERED = 'buffered'
+
+IDEMPOTENCY_STATUS_PENDING = 'pending'
+IDEMPOTENCY_STATUS_DONE = 'done'
+
+IDEMPOTENCY_STATUSES = [IDEMPOTENCY_STATUS_PENDING, IDEMPOTENCY_STATUS_DONE]
+IDEMPOTENCY_STATUS_CHOICES = [(status, status) for status in IDEMPOTENCY_STATUSES]
+
+RATE_LIMIT_SEND = 'send'
+RATE_LIMIT_BULK = 'bulk'
+RATE_LIMIT_READ = 'read'
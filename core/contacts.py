@@ -0,0 +1,148 @@
+import csv
+import codecs
+import hashlib
+
+MAX_ERRORS = 10
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+FALSE_VALUES = ('0', 'false', 'no', 'n')
+
+
+class Deduplicator(object):
+    """
+    Drops repeated (contact group id, included) pairs, a group both included and excluded is an error.
+    Runs in one pass keeping only the flags of seen ids.
+    """
+
+    def __init__(self):
+        self.seen = {}
+        self.received = 0
+        self.duplicates = 0
+
+    def __call__(self, pairs):
+        for id_contact, included in pairs:
+            if self.add(id_contact, included):
+                yield id_contact, included
+
+    def add(self, id_contact, included):
+        """
+        True for the first occurrence of the pair, ValueError when the group came with the other flag
+        """
+        self.received += 1
+        if id_contact not in self.seen:
+            self.seen[id_contact] = included
+            return True
+        if self.seen[id_contact] != included:
+            raise ValueError('contact group {} is both included and excluded'.format(id_contact))
+        self.duplicates += 1
+        return False
+
+    @property
+    def stats(self):
+        return {'received': self.received, 'sent': self.received - self.duplicates, 'duplicates': self.duplicates}
+
+
+class ContactList(object):
+    """
+    contact_list of the JSON body normalized to (id, included) pairs without duplicates
+    """
+
+    def __init__(self, rows):
+        errors = []
+        self.pairs = []
+        deduplicator = Deduplicator()
+        for index, row in enumerate(rows):
+            try:
+                pair = parse_row([str(value) for value in row])
+                if deduplicator.add(*pair):
+                    self.pairs.append(pair)
+            except ValueError as ex:
+                errors.append('Item {}: {}'.format(index, ex))
+                if len(errors) >= MAX_ERRORS:
+                    break
+        if errors:
+            raise ValueError(errors)
+
+        self.stats = deduplicator.stats
+
+    def __iter__(self):
+        return iter(self.pairs)
+
+    def __len__(self):
+        return len(self.pairs)
+
+
+class ContactFile(object):
+    """
+    Uploaded CSV of "contact group id,included" rows, read twice from the upload without keeping the rows:
+    scan() checks every row, iterating gives the normalized (id, included) pairs without duplicates.
+    """
+
+    def __init__(self, uploaded_file):
+        self.file = uploaded_file
+        self.sha256 = None
+        self.stats = None
+
+    def scan(self):
+        """
+        Count and hash the rows, ValueError with the line numbers of the first invalid rows
+        """
+        errors = []
+        digest = hashlib.sha256()
+        deduplicator = Deduplicator()
+        for line, row in self._read(digest):
+            try:
+                deduplicator.add(*parse_row(row))
+            except ValueError as ex:
+                errors.append('Line {}: {}'.format(line, ex))
+                if len(errors) >= MAX_ERRORS:
+                    break
+
+        if errors:
+            raise ValueError(errors)
+        if not deduplicator.received:
+            raise ValueError(['The file has no contacts'])
+        self.sha256 = digest.hexdigest()
+        self.stats = deduplicator.stats
+
+    def __iter__(self):
+        return Deduplicator()(parse_row(row) for line, row in self._read())
+
+    @property
+    def summary(self):
+        # what the audit log keeps instead of the rows
+        return dict(self.stats, name=self.file.name, sha256=self.sha256)
+
+    def _read(self, digest=None):
+        self.file.seek(0)
+        lines = self._lines(digest)
+        for line, row in enumerate(csv.reader(codecs.iterdecode(lines, 'utf-8-sig')), 1):
+            if not row or not ''.join(row).strip():
+                continue
+            if line == 1 and row[0].strip().lower() == 'id':
+                continue
+            yield line, row
+
+    def _lines(self, digest):
+        for line in self.file:
+            if digest is not None:
+                digest.update(line)
+            yield line
+
+
+def parse_row(row):
+    if len(row) > 2:
+        raise ValueError('expected "id,included", got {} columns'.format(len(row)))
+
+    id_contact = row[0].strip()
+    try:
+        id_contact = int(id_contact)
+    except ValueError:
+        raise ValueError('invalid contact group id "{}"'.format(id_contact))
+
+    included = row[1].strip().lower() if len(row) > 1 else ''
+    if included in TRUE_VALUES or included == '':
+        return id_contact, True
+    if included in FALSE_VALUES:
+        return id_contact, False
+    raise ValueError('invalid included value "{}"'.format(row[1]))
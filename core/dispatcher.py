@@ -0,0 +1,165 @@
+import os
+import time
+import socket
+import logging
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction, close_old_connections
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+
+from email_devino.client import DevinoException
+
+from core import audit
+from core import clients
+from core import models
+from core import consts
+from core import ratelimit
+from core import resilience
+from core.exceptions import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+def get_worker_id():
+    return '{}:{}'.format(socket.gethostname(), os.getpid())
+
+
+def release_stale():
+    """
+    Return to the queue messages claimed by a dispatcher that died before finishing them
+    """
+    expired = timezone.now() - datetime.timedelta(seconds=settings.DEVINO_DISPATCHER_LOCK_TIMEOUT)
+    return models.QueuedMessage.objects.filter(
+        status=consts.QUEUE_STATUS_PROCESSING,
+        locked_at__lt=expired,
+    ).update(status=consts.QUEUE_STATUS_NEW, locked_by='', locked_at=None)
+
+
+def claim(worker_id, limit):
+    """
+    Atomically take up to limit new messages for worker_id.
+    The conditional update guarantees a message is never claimed twice,
+    SKIP LOCKED (where supported) keeps concurrent dispatchers from waiting on each other.
+    """
+    lock_kwargs = {}
+    if connection.features.has_select_for_update_skip_locked:
+        lock_kwargs['skip_locked'] = True
+
+    with transaction.atomic():
+        ids = list(
+            models.QueuedMessage.objects.filter(status=consts.QUEUE_STATUS_NEW)
+            .order_by('id')
+            .select_for_update(**lock_kwargs)
+            .values_list('id', flat=True)[:limit]
+        )
+        models.QueuedMessage.objects.filter(id__in=ids, status=consts.QUEUE_STATUS_NEW).update(
+            status=consts.QUEUE_STATUS_PROCESSING,
+            locked_by=worker_id,
+            locked_at=timezone.now(),
+        )
+
+    return list(
+        models.QueuedMessage.objects.filter(
+            id__in=ids,
+            status=consts.QUEUE_STATUS_PROCESSING,
+            locked_by=worker_id,
+        ).order_by('id')
+    )
+
+
+def send(message):
+    message.attempts += 1
+    try:
+        # a bounded wait, a message doesn't stay claimed while the bucket refills
+        ratelimit.acquire(consts.RATE_LIMIT_SEND, settings.DEVINO_RATE_LIMIT_MAX_WAIT)
+    except Throttled as ex:
+        return requeue(message, ex.wait)
+
+    dc = timezone.now()
+    started = time.time()
+    try:
+        answer = resilience.call(consts.SEND_MESSAGE, clients.get_client().send_transactional_message, **message.data)
+    except UpstreamUnavailable as ex:
+        return requeue(message, ex.wait)
+    except DevinoException as ex:
+        record = audit.make_record(consts.SEND_MESSAGE, message.data, exception=ex,
+                                   latency=time.time() - started, dc=dc)
+        # connection errors and 5xx answers are worth another try, validation errors are not
+        if resilience.is_failure(ex) and message.attempts < settings.DEVINO_DISPATCHER_MAX_ATTEMPTS:
+            message.status = consts.QUEUE_STATUS_NEW
+        else:
+            message.status = consts.QUEUE_STATUS_FAILED
+    else:
+        record = audit.make_record(consts.SEND_MESSAGE, message.data, answer=answer,
+                                   latency=time.time() - started, dc=dc)
+        if answer.code == consts.STATUS_OK:
+            message.status = consts.QUEUE_STATUS_SENT
+        elif answer.code == consts.STATUS_ERROR_API and message.attempts < settings.DEVINO_DISPATCHER_MAX_ATTEMPTS:
+            message.status = consts.QUEUE_STATUS_NEW
+        else:
+            message.status = consts.QUEUE_STATUS_FAILED
+
+    audit.write([record])
+    message.code = str(record.code or '')
+    message.description = record.description or ''
+    message.locked_by = ''
+    message.locked_at = None
+    message.save()
+    return message
+
+
+def requeue(message, wait):
+    """
+    Return the message to the queue without losing an attempt, the worker waits
+    instead of claiming messages again right away
+    """
+    message.attempts -= 1
+    message.status = consts.QUEUE_STATUS_NEW
+    message.locked_by = ''
+    message.locked_at = None
+    message.save()
+    if wait:
+        time.sleep(wait)
+    return message
+
+
+def _send_in_thread(message):
+    try:
+        return send(message)
+    except Exception:
+        # one broken message must not stop the loop or keep the rest of the batch claimed,
+        # it is tried again until it runs out of attempts
+        logger.exception('Failed to send queued message %s', message.id)
+        if message.attempts < settings.DEVINO_DISPATCHER_MAX_ATTEMPTS:
+            message.status = consts.QUEUE_STATUS_NEW
+        else:
+            message.status = consts.QUEUE_STATUS_FAILED
+        try:
+            models.QueuedMessage.objects.filter(id=message.id, status=consts.QUEUE_STATUS_PROCESSING).update(
+                status=message.status, attempts=message.attempts, locked_by='', locked_at=None)
+        except Exception:
+            logger.exception('Failed to return queued message %s, release_stale will', message.id)
+        return message
+    finally:
+        close_old_connections()
+
+
+def dispatch(workers, batch_size, poll_interval, once=False, worker_id=None):
+    worker_id = worker_id or get_worker_id()
+    sent = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            release_stale()
+            messages = claim(worker_id, batch_size)
+            if messages:
+                sent += len(list(executor.map(_send_in_thread, messages)))
+            elif once:
+                break
+            else:
+                time.sleep(poll_interval)
+
+    return sent
@@ -0,0 +1,27 @@
+import math
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'The idempotency key was already used for another request.'
+    default_code = 'idempotency_key_reused'
+
+
+class IdempotencyKeyInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this idempotency key is still in progress.'
+    default_code = 'idempotency_key_in_progress'
+
+
+class UpstreamUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Devino is unavailable, please repeat later.'
+    default_code = 'upstream_unavailable'
+
+    def __init__(self, detail=None, code=None, wait=None):
+        super(UpstreamUnavailable, self).__init__(detail, code)
+        # seconds for Retry-After
+        self.wait = math.ceil(wait) if wait is not None else None
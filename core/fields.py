@@ -0,0 +1,72 @@
+import json
+
+from django.db.models import Lookup
+from django.db.models.lookups import Contains
+
+from jsonfield import JSONField as BaseJSONField
+
+from core.utils import date_handler
+
+
+class Decoded(object):
+    # a value psycopg2 already decoded from jsonb, pre_init mustn't load a string of it again
+    def __init__(self, value):
+        self.value = value
+
+
+class JSONField(BaseJSONField):
+    """
+    jsonb column on PostgreSQL, JSON text on other databases.
+    Dates are encoded with date_handler, like the payloads sent to Devino.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('dump_kwargs', {'default': date_handler, 'separators': (',', ':')})
+        super(JSONField, self).__init__(*args, **kwargs)
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'jsonb'
+        return super(JSONField, self).db_type(connection)
+
+    def from_db_value(self, value, expression, connection, context):
+        if connection.vendor == 'postgresql':
+            return Decoded(value)
+        return value
+
+    def pre_init(self, value, obj):
+        if isinstance(value, Decoded):
+            return value.value
+        return super(JSONField, self).pre_init(value, obj)
+
+
+class JSONContains(Lookup):
+    """
+    data__contains={'id_task': 1}: jsonb containment served by the GIN index on PostgreSQL,
+    a text match of every pair on other databases
+    """
+    lookup_name = 'contains'
+
+    def get_prep_lookup(self):
+        return self.rhs
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        return '{} @> %s::jsonb'.format(lhs), lhs_params + [json.dumps(self.rhs, default=date_handler)]
+
+    def as_sql(self, compiler, connection):
+        sql = []
+        params = []
+        for key, value in sorted(self.rhs.items()):
+            pair = json.dumps({key: value}, default=date_handler, separators=(',', ':'))[1:-1]
+            # the pair is followed by another one or ends the object, so "id_task":1 doesn't match "id_task":12
+            pair_sql = []
+            for end in (',', '}'):
+                lookup_sql, lookup_params = Contains(self.lhs, pair + end).as_sql(compiler, connection)
+                pair_sql.append(lookup_sql)
+                params.extend(lookup_params)
+            sql.append('({})'.format(' OR '.join(pair_sql)))
+        return ' AND '.join(sql) or '1 = 1', params
+
+
+JSONField.register_lookup(JSONContains)
@@ -1,9 +1,9 @@
 from django import forms
-from django.conf import settings
-
-from email_devino.client import DevinoClient
 from email_devino.client import DevinoException
 
+from core import cache
+from core.exceptions import UpstreamUnavailable
+
 
 class SendMessage(forms.Form):
     recipient_name = forms.CharField()
@@ -20,17 +20,10 @@ class SendMessage(forms.Form):
         super(SendMessage, self).__init__(*args, **kwargs)
 
         try:
-            answer = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).get_sender_addresses()
-            emails = []
-
-            for data in answer.result:
-                if data['Confirmed'] is True:
-                    emails.append(data['SenderAddress'])
-
-            emails = [(email, email) for email in emails]
-            self.fields['sender_email'].choices = emails
+            emails = cache.get_sender_addresses()
+            self.fields['sender_email'].choices = [(email, email) for email in emails]
 
-        except DevinoException:
+        except (DevinoException, UpstreamUnavailable):
             self.fields['sender_email'].choices.append(
                 ('load_error', 'server is not available, reload the page')
             )
@@ -0,0 +1,119 @@
+import json
+import time
+import hashlib
+import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from core import consts
+from core import models
+from core import exceptions
+from core.utils import date_handler
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+
+def get_key(request, data):
+    """
+    Idempotency-Key header, or user_message_id of the message when DEVINO_IDEMPOTENCY_USER_MESSAGE_ID is on
+    """
+    key = request.META.get(HEADER)
+    if key is not None:
+        key = key.strip()
+        if not key or len(key) > 255:
+            raise serializers.ValidationError({'Idempotency-Key': 'Expected from 1 to 255 characters.'})
+        return key
+
+    if settings.DEVINO_IDEMPOTENCY_USER_MESSAGE_ID and data.get('user_message_id'):
+        return 'user_message_id:{}'.format(data['user_message_id'])[:255]
+    return None
+
+
+def get_request_hash(data):
+    payload = json.dumps(data, sort_keys=True, default=date_handler)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def run(user, key, data, fn):
+    """
+    (response data, status, replayed) of the request with the key.
+    The first request runs fn, the same request repeated later gets its stored answer,
+    a repeat arriving while the first one is running waits for it.
+    """
+    request_hash = get_request_hash(data)
+
+    while True:
+        idempotency_key = _acquire(user, key, request_hash)
+        if idempotency_key is not None:
+            break
+        stored = _wait(user, key, request_hash)
+        if stored is not None:
+            response_data, response_status = stored
+            return response_data, response_status, True
+
+    try:
+        response_data, response_status = fn()
+    except Exception:
+        idempotency_key.delete()
+        raise
+
+    if response_data.get('code') == consts.STATUS_ERROR_API:
+        # connection errors and Devino internal errors are left to the client's retry
+        idempotency_key.delete()
+    else:
+        idempotency_key.status = consts.IDEMPOTENCY_STATUS_DONE
+        idempotency_key.response = response_data
+        idempotency_key.response_status = response_status
+        idempotency_key.save(update_fields=['status', 'response', 'response_status'])
+    return response_data, response_status, False
+
+
+def delete_expired(now=None):
+    now = now or timezone.now()
+    return models.IdempotencyKey.objects.filter(expires__lt=now).delete()[0]
+
+
+def _acquire(user, key, request_hash):
+    """
+    New pending key owned by this request, None when the key is already taken
+    """
+    now = timezone.now()
+    # an expired key, or a pending one left by a request that died, is replaced by the new request
+    abandoned = now - datetime.timedelta(seconds=settings.DEVINO_IDEMPOTENCY_PENDING_TIMEOUT)
+    models.IdempotencyKey.objects.filter(
+        Q(expires__lt=now) | Q(status=consts.IDEMPOTENCY_STATUS_PENDING, dc__lt=abandoned),
+        user=user,
+        key=key,
+    ).delete()
+    try:
+        with transaction.atomic():
+            return models.IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                request_hash=request_hash,
+                expires=now + datetime.timedelta(seconds=settings.DEVINO_IDEMPOTENCY_TTL),
+            )
+    except IntegrityError:
+        return None
+
+
+def _wait(user, key, request_hash):
+    """
+    Stored (response data, status) of the key, None when the key was released and may be taken again
+    """
+    deadline = time.time() + settings.DEVINO_IDEMPOTENCY_WAIT_TIMEOUT
+    while True:
+        idempotency_key = models.IdempotencyKey.objects.filter(user=user, key=key).first()
+        if idempotency_key is None:
+            return None
+        if idempotency_key.request_hash != request_hash:
+            raise exceptions.IdempotencyKeyReused()
+        if idempotency_key.status == consts.IDEMPOTENCY_STATUS_DONE:
+            return idempotency_key.response, idempotency_key.response_status
+        if time.time() >= deadline:
+            raise exceptions.IdempotencyKeyInProgress()
+        time.sleep(settings.DEVINO_IDEMPOTENCY_POLL_INTERVAL)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import dispatcher
+
+
+class Command(BaseCommand):
+    help = 'Deliver messages accepted into the send_message queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.DEVINO_DISPATCHER_WORKERS,
+                            help='Number of concurrent senders')
+        parser.add_argument('--batch-size', type=int, default=settings.DEVINO_DISPATCHER_BATCH_SIZE,
+                            help='Messages claimed per round')
+        parser.add_argument('--poll-interval', type=float, default=settings.DEVINO_DISPATCHER_POLL_INTERVAL,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        sent = dispatcher.dispatch(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+        )
+        self.stdout.write('Processed {} messages'.format(sent))
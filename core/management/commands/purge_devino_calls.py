@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import retention
+
+
+class Command(BaseCommand):
+    help = 'Archive and delete audit records older than the retention policy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.DEVINO_RETENTION_BATCH_SIZE,
+                            help='Records archived and deleted at a time')
+        parser.add_argument('--pause', type=float, default=settings.DEVINO_RETENTION_PAUSE,
+                            help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the records to purge')
+
+    def handle(self, *args, **options):
+        purged = retention.run(
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+        for api_resource, count in sorted(purged.items()):
+            if count:
+                self.stdout.write('{}: {}'.format(api_resource, count))
+        self.stdout.write('{} {} records'.format('Would purge' if options['dry_run'] else 'Purged',
+                                                 sum(purged.values())))
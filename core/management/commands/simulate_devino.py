@@ -0,0 +1,72 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit, parse_qsl
+
+from django.core.management.base import BaseCommand
+
+from core.simulator import Simulator
+
+
+class SimulatorServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, simulator):
+        super(SimulatorServer, self).__init__(address, SimulatorHandler)
+        self.simulator = simulator
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.answer('get')
+
+    def do_POST(self):
+        self.answer('post')
+
+    def do_PUT(self):
+        self.answer('put')
+
+    def do_DELETE(self):
+        self.answer('delete')
+
+    def answer(self, method):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length).decode()) if length else None
+
+        reply = self.server.simulator.handle(method, url.path, dict(parse_qsl(url.query)), body, self.headers)
+        time.sleep(reply.latency)
+        if reply.drop:
+            self.close_connection = True
+            return
+
+        content = json.dumps(reply.body).encode() if reply.body is not None else b''
+        self.send_response(reply.status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Serve the Devino API simulator over HTTP, point DEVINO_URL to it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+
+    def handle(self, *args, **options):
+        server = SimulatorServer((options['host'], options['port']), Simulator())
+        self.stdout.write('Devino simulator at http://{}:{}'.format(*server.server_address))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
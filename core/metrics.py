@@ -0,0 +1,90 @@
+import os
+import time
+import atexit
+from contextlib import contextmanager
+
+from prometheus_client import CollectorRegistry, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+PHASE_VALIDATE = 'validate'
+PHASE_WAIT = 'wait'             # rate limit and concurrency slot
+PHASE_UPSTREAM = 'upstream'
+PHASE_AUDIT = 'audit'
+PHASE_RENDER = 'render'
+
+PHASES = [PHASE_VALIDATE, PHASE_WAIT, PHASE_UPSTREAM, PHASE_AUDIT, PHASE_RENDER]
+
+phase_seconds = Histogram(
+    'devino_request_phase_seconds',
+    'Time requests to the service spend in each phase',
+    ['api_resource', 'code', 'phase'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf')),
+)
+
+# adaptive concurrency limits, summed over the live worker processes; the limit is shared
+# by the api_resources of a rate limit bucket and repeated for each of them
+concurrency_limit = Gauge(
+    'devino_concurrency_limit',
+    'Calls to Devino allowed in flight',
+    ['api_resource'],
+    multiprocess_mode='livesum',
+)
+concurrency_in_flight = Gauge(
+    'devino_concurrency_in_flight',
+    'Calls to Devino in flight',
+    ['api_resource'],
+    multiprocess_mode='livesum',
+)
+concurrency_queued = Gauge(
+    'devino_concurrency_queued',
+    'Requests waiting for a concurrency slot',
+    ['api_resource'],
+    multiprocess_mode='livesum',
+)
+
+
+
+def mark_process_dead():
+    # manage.py commands drop their live gauges too, os.getpid() is the pid of a forked worker
+    if 'prometheus_multiproc_dir' in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+atexit.register(mark_process_dead)
+
+
+class Timing(object):
+    """
+    Phase durations of one request, observed together once the answer code is known
+    """
+
+    def __init__(self, api_resource):
+        self.api_resource = api_resource
+        self.code = None
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.time() - started
+
+    def observe(self, status_code):
+        # the Devino answer code, the HTTP status when Devino wasn't called
+        code = self.code or str(status_code)
+        for name, seconds in self.phases.items():
+            phase_seconds.labels(api_resource=self.api_resource, code=code, phase=name).observe(seconds)
+
+
+def generate():
+    """
+    Metrics in the Prometheus text format. With gunicorn every worker writes its own files
+    to prometheus_multiproc_dir and they are summed up here.
+    """
+    if 'prometheus_multiproc_dir' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
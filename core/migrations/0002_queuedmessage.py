@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 16:58
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', jsonfield.fields.JSONField()),
+                ('status', models.CharField(choices=[('new', 'new'), ('processing', 'processing'), ('sent', 'sent'), ('failed', 'failed')], default='new', max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('locked_by', models.CharField(blank=True, max_length=128)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('code', models.CharField(blank=True, max_length=64)),
+                ('description', models.CharField(blank=True, max_length=256)),
+                ('dc', models.DateTimeField(auto_now_add=True)),
+                ('dm', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='queuedmessage',
+            index_together=set([('status', 'id'), ('status', 'locked_at')]),
+        ),
+    ]
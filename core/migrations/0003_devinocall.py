@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 17:07
+from __future__ import unicode_literals
+
+from django.core.management.color import no_style
+from django.db import migrations, models
+import django.utils.timezone
+import jsonfield.fields
+
+
+def backfill(apps, schema_editor):
+    # one set based statement, ids are kept so the compatibility views match old request ids
+    schema_editor.execute(
+        'INSERT INTO core_devinocall (id, api_resource, data, code, description, result, is_fail, latency, dc) '
+        'SELECT r.id, r.api_resource, r.data, COALESCE(a.code, %s), COALESCE(a.description, %s), a.result, '
+        'COALESCE(a.is_fail, %s), NULL, r.dc '
+        'FROM core_devinorequest r LEFT JOIN core_devinoanswer a ON a.request_id = r.id',
+        ['', '', False],
+    )
+    reset_sequences(apps, schema_editor, 'DevinoCall')
+
+
+def reset_sequences(apps, schema_editor, *model_names):
+    connection = schema_editor.connection
+    models_list = [apps.get_model('core', name) for name in model_names]
+    for sql in connection.ops.sequence_reset_sql(no_style(), models_list):
+        schema_editor.execute(sql)
+
+
+def create_views(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('core', 'DevinoAnswer'))
+    schema_editor.delete_model(apps.get_model('core', 'DevinoRequest'))
+    schema_editor.execute(
+        'CREATE VIEW core_devinorequest AS '
+        'SELECT id, api_resource, data, dc FROM core_devinocall'
+    )
+    schema_editor.execute(
+        'CREATE VIEW core_devinoanswer AS '
+        'SELECT id, code, description, result, is_fail, dc, id AS request_id FROM core_devinocall'
+    )
+
+
+def drop_views(apps, schema_editor):
+    schema_editor.execute('DROP VIEW core_devinoanswer')
+    schema_editor.execute('DROP VIEW core_devinorequest')
+    schema_editor.create_model(apps.get_model('core', 'DevinoRequest'))
+    schema_editor.create_model(apps.get_model('core', 'DevinoAnswer'))
+    schema_editor.execute(
+        'INSERT INTO core_devinorequest (id, api_resource, data, dc) '
+        'SELECT id, api_resource, data, dc FROM core_devinocall'
+    )
+    schema_editor.execute(
+        'INSERT INTO core_devinoanswer (id, code, description, result, is_fail, dc, request_id) '
+        'SELECT id, code, description, result, is_fail, dc, id FROM core_devinocall WHERE code <> %s',
+        [''],
+    )
+    reset_sequences(apps, schema_editor, 'DevinoRequest', 'DevinoAnswer')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_queuedmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DevinoCall',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('api_resource', models.CharField(choices=[('get_addresses_sender', 'get_addresses_sender'), ('add_address_sender', 'add_address_sender'), ('del_address_sender', 'del_address_sender'), ('get_bulk_list', 'get_bulk_list'), ('get_bulk', 'get_bulk'), ('add_bulk', 'add_bulk'), ('edit_bulk', 'edit_bulk'), ('edit_bulk_status', 'edit_bulk_status'), ('get_template', 'get_template'), ('add_template', 'add_template'), ('edit_template', 'edit_template'), ('del_template', 'del_template'), ('get_state', 'get_state'), ('get_state_detailing', 'get_state_detailing'), ('send_message', 'send_message'), ('get_status_message', 'get_status_message')], max_length=64)),
+                ('data', jsonfield.fields.JSONField(blank=True, null=True)),
+                ('code', models.CharField(blank=True, max_length=64)),
+                ('description', models.CharField(blank=True, max_length=256)),
+                ('result', jsonfield.fields.JSONField(blank=True, null=True)),
+                ('is_fail', models.BooleanField(default=False)),
+                ('latency', models.FloatField(blank=True, null=True)),
+                ('dc', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.RunPython(create_views, drop_views),
+        migrations.AlterModelOptions(
+            name='devinoanswer',
+            options={'managed': False},
+        ),
+        migrations.AlterModelOptions(
+            name='devinorequest',
+            options={'managed': False},
+        ),
+    ]
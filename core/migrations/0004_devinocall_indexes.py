@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 17:08
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_devinocall'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='devinocall',
+            index=models.Index(fields=['dc', 'id'], name='core_call_dc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='devinocall',
+            index=models.Index(fields=['api_resource', 'dc', 'id'], name='core_call_resource_dc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='devinocall',
+            index=models.Index(fields=['is_fail', 'dc', 'id'], name='core_call_fail_dc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='devinocall',
+            index=models.Index(fields=['code', 'dc', 'id'], name='core_call_code_dc_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 17:09
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+CREATE_REQUEST_VIEW = 'CREATE VIEW core_devinorequest AS SELECT id, api_resource, data, dc FROM core_devinocall'
+CREATE_ANSWER_VIEW = ('CREATE VIEW core_devinoanswer AS '
+                      'SELECT id, code, description, result, is_fail, dc, id AS request_id FROM core_devinocall')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_devinocall_indexes'),
+    ]
+
+    # sqlite rebuilds core_devinocall to add a column, views over it have to be dropped meanwhile
+    operations = [
+        migrations.RunSQL(['DROP VIEW core_devinoanswer'], [CREATE_ANSWER_VIEW]),
+        migrations.RunSQL(['DROP VIEW core_devinorequest'], [CREATE_REQUEST_VIEW]),
+        migrations.CreateModel(
+            name='AuditBlob',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.PositiveIntegerField()),
+                ('content', models.BinaryField()),
+                ('dm', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='devinocall',
+            name='data_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='devinocall',
+            name='data_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='devinocall',
+            name='result_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='devinocall',
+            name='result_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunSQL([CREATE_REQUEST_VIEW], ['DROP VIEW core_devinorequest']),
+        migrations.RunSQL([CREATE_ANSWER_VIEW], ['DROP VIEW core_devinoanswer']),
+    ]
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 17:12
+from __future__ import unicode_literals
+
+import json
+
+import core.fields
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+
+CREATE_REQUEST_VIEW = 'CREATE VIEW core_devinorequest AS SELECT id, api_resource, data, dc FROM core_devinocall'
+CREATE_ANSWER_VIEW = ('CREATE VIEW core_devinoanswer AS '
+                      'SELECT id, code, description, result, is_fail, dc, id AS request_id FROM core_devinocall')
+
+
+def convert_data(schema_editor, convert):
+    # walks the table by id in batches committed one by one, rows are updated only when convert changes them
+    connection = schema_editor.connection
+    last_id = 0
+    while True:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT id, data FROM core_devinocall WHERE id > %s AND data IS NOT NULL ORDER BY id LIMIT %s',
+                [last_id, BATCH_SIZE],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for id, data in rows:
+                converted = convert(data)
+                if converted != data:
+                    cursor.execute('UPDATE core_devinocall SET data = %s WHERE id = %s', [converted, id])
+        last_id = rows[-1][0]
+
+
+def decode(data):
+    # '"{\"id_task\":1}"' -> '{"id_task":1}', a payload of None was stored as '"null"'
+    value = json.loads(data)
+    if not isinstance(value, str):
+        return data
+    try:
+        value = json.loads(value)
+    except ValueError:
+        return data
+    return json.dumps(value, separators=(',', ':')) if value is not None else None
+
+
+def encode(data):
+    return json.dumps(data)
+
+
+def decode_data(apps, schema_editor):
+    convert_data(schema_editor, decode)
+
+
+def encode_data(apps, schema_editor):
+    convert_data(schema_editor, encode)
+
+
+class Migration(migrations.Migration):
+    # the batches of the data fix-up are committed on their own, decode leaves converted rows as they are,
+    # so a run broken in the fix-up can be repeated.
+    # Changing the column type to jsonb rewrites core_devinocall under an exclusive lock on postgresql:
+    # writes of audit records wait for it, so run it when the service is stopped or quiet.
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_auditblob'),
+    ]
+
+    # views over core_devinocall block changing the column type on postgresql and the table rebuild on sqlite
+    operations = [
+        migrations.RunSQL(['DROP VIEW core_devinoanswer'], [CREATE_ANSWER_VIEW]),
+        migrations.RunSQL(['DROP VIEW core_devinorequest'], [CREATE_REQUEST_VIEW]),
+        migrations.RunPython(decode_data, encode_data),
+        migrations.AlterField(
+            model_name='devinocall',
+            name='data',
+            field=core.fields.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='devinocall',
+            name='result',
+            field=core.fields.JSONField(blank=True, null=True),
+        ),
+        migrations.RunSQL([CREATE_REQUEST_VIEW], ['DROP VIEW core_devinorequest']),
+        migrations.RunSQL([CREATE_ANSWER_VIEW], ['DROP VIEW core_devinoanswer']),
+    ]
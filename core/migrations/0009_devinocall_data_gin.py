@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 18:02
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def create_gin_index(apps, schema_editor):
+    # jsonb_path_ops serves containment on any key, e.g. data @> '{"user_message_id": "..."}'.
+    # Built concurrently, so audit records are written while it is built
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS core_call_data_gin '
+                              'ON core_devinocall USING GIN (data jsonb_path_ops)')
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS core_call_data_gin')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_ratelimitbucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
@@ -2,11 +2,13 @@ from django.db import models
 from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 
 from jsonfield import JSONField
 
 from . import consts
+from . import fields
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -15,16 +17,97 @@ def create_auth_token(sender, instance=None, created=False, **kwargs):
         Token.objects.create(user=instance)
 
 
+class DevinoCall(models.Model):
+    api_resource = models.CharField(max_length=64, choices=consts.API_CHOICES)
+    data = fields.JSONField(null=True, blank=True)
+    code = models.CharField(max_length=64, blank=True)
+    description = models.CharField(max_length=256, blank=True)
+    result = fields.JSONField(null=True, blank=True)
+    is_fail = models.BooleanField(default=False)
+    latency = models.FloatField(null=True, blank=True)     # seconds of the upstream call
+    dc = models.DateTimeField(default=timezone.now)         # time of the request, not of the insert
+    # data and result above DEVINO_AUDIT_BLOB_THRESHOLD bytes are kept in AuditBlob
+    data_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    data_size = models.PositiveIntegerField(null=True, blank=True)
+    result_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    result_size = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        # every filter of the audit log query is followed by the (dc, id) keyset of its pagination
+        indexes = [
+            models.Index(fields=['dc', 'id'], name='core_call_dc_idx'),
+            models.Index(fields=['api_resource', 'dc', 'id'], name='core_call_resource_dc_idx'),
+            models.Index(fields=['is_fail', 'dc', 'id'], name='core_call_fail_dc_idx'),
+            models.Index(fields=['code', 'dc', 'id'], name='core_call_code_dc_idx'),
+        ]
+
+
+class AuditBlob(models.Model):
+    hash = models.CharField(max_length=64, primary_key=True)    # sha256 of the uncompressed content
+    size = models.PositiveIntegerField()
+    content = models.BinaryField()                              # zlib compressed
+    dm = models.DateTimeField(default=timezone.now)             # last time a record referred to the blob
+
+
+# Read-only views over DevinoCall for consumers of the former request/answer tables
+
+
 class DevinoRequest(models.Model):
     api_resource = models.CharField(max_length=64, choices=consts.API_CHOICES)
-    data = JSONField(null=True, blank=True)
+    data = fields.JSONField(null=True, blank=True)
     dc = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        managed = False
+
 
 class DevinoAnswer(models.Model):
     code = models.CharField(max_length=64)
     description = models.CharField(max_length=256)
-    result = JSONField(null=True, blank=True)
-    request = models.OneToOneField(DevinoRequest, related_name='devino_answer')
+    result = fields.JSONField(null=True, blank=True)
+    request = models.OneToOneField(DevinoRequest, related_name='devino_answer', on_delete=models.DO_NOTHING)
     is_fail = models.BooleanField(default=False)
     dc = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = False
+
+
+class QueuedMessage(models.Model):
+    data = JSONField()
+    status = models.CharField(max_length=16, choices=consts.QUEUE_STATUS_CHOICES, default=consts.QUEUE_STATUS_NEW)
+    attempts = models.PositiveIntegerField(default=0)
+    locked_by = models.CharField(max_length=128, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    code = models.CharField(max_length=64, blank=True)
+    description = models.CharField(max_length=256, blank=True)
+    dc = models.DateTimeField(auto_now_add=True)
+    dm = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        index_together = [
+            ('status', 'id'),
+            ('status', 'locked_at'),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=16, choices=consts.IDEMPOTENCY_STATUS_CHOICES,
+                              default=consts.IDEMPOTENCY_STATUS_PENDING)
+    response = fields.JSONField(null=True, blank=True)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    expires = models.DateTimeField(db_index=True)
+    dc = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [('user', 'key')]
+
+
+class RateLimitBucket(models.Model):
+    name = models.CharField(max_length=32, primary_key=True)
+    tokens = models.FloatField()
+    updated = models.FloatField()                   # unix time of the last refill
+    version = models.PositiveIntegerField(default=0)
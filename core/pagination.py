@@ -0,0 +1,135 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+
+from core import audit
+from core import concurrency
+from core import consts
+from core import ratelimit
+from core import resilience
+from core.exceptions import UpstreamUnavailable
+
+
+class Pages(object):
+    """
+    Iterates over the rows of a Devino list call page by page: fn(range_start=..., range_end=..., **data)
+    for consecutive windows of page_size. While a page is handled the next DEVINO_STREAM_PREFETCH pages
+    of the api_resource are fetched in the background, so at most that many pages more are kept in memory.
+    Iteration stops after a short page or a failed call.
+
+    The whole traversal is one audit record: the data with the page size, the code of the last call,
+    the summed latency and {'pages': ..., 'rows': ...} as the result.
+    """
+
+    def __init__(self, api_resource, fn, data, page_size, max_wait=None):
+        self.api_resource = api_resource
+        self.fn = resilience.wrap(api_resource, fn)
+        self.data = data
+        self.page_size = page_size
+        self.max_wait = max_wait
+        self.prefetch = settings.DEVINO_STREAM_PREFETCH.get(api_resource, 1)
+
+        self.record = None
+        self.done = False
+        self._number = 0
+        self._futures = deque()
+        self._executor = None
+        self._dc = timezone.now()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.done:
+            raise StopIteration
+
+        try:
+            if self._futures:
+                answer, page_record = self._futures.popleft().result()
+            else:
+                answer, page_record = self.fetch(self._next_number())
+        except (Throttled, UpstreamUnavailable) as ex:
+            if self.record is None:
+                # nothing was called yet, the request fails like any other
+                raise
+            self.close()
+            self.record.code = consts.STATUS_THROTTLED if isinstance(ex, Throttled) else consts.STATUS_UNAVAILABLE
+            self.record.description = str(ex.detail)
+            self.record.is_fail = True
+            raise StopIteration
+
+        rows = self.add(answer, page_record)
+        if rows is None:
+            self.close()
+            raise StopIteration
+
+        if len(rows) < self.page_size:
+            self.close()
+        else:
+            self.prefetch_pages()
+        return rows
+
+    def fetch(self, number):
+        """
+        (answer, record) of the page with the number counted from 0, answer is None on DevinoException
+        """
+        data = dict(self.data, range_start=number * self.page_size + 1, range_end=(number + 1) * self.page_size)
+        ratelimit.acquire(ratelimit.get_bucket(self.api_resource), self.max_wait)
+        with concurrency.get_limiter(self.api_resource).slot(api_resource=self.api_resource) as slot:
+            answer, record = audit.call(self.api_resource, self.fn, data)
+            slot.record = record
+        return answer, record
+
+    def fetch_in_thread(self, number):
+        # the rate limiter, the breaker and the limiter use the database in the prefetch thread
+        try:
+            return self.fetch(number)
+        finally:
+            close_old_connections()
+
+    def add(self, answer, page_record):
+        """
+        Count the page in the audit record, its rows or None when the call failed
+        """
+        if self.record is None:
+            self.record = page_record
+            self.record.data = dict(self.data, page_size=self.page_size)
+            self.record.dc = self._dc
+            self.record.latency = 0
+            self.record.result = {'pages': 0, 'rows': 0}
+
+        self.record.latency += page_record.latency
+        self.record.code = page_record.code
+        self.record.description = page_record.description
+        self.record.is_fail = page_record.is_fail
+        if answer is None or answer.code != consts.STATUS_OK:
+            return None
+
+        rows = answer.result or []
+        self.record.result['pages'] += 1
+        self.record.result['rows'] += len(rows)
+        return rows
+
+    def prefetch_pages(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.prefetch)
+        while len(self._futures) < self.prefetch:
+            self._futures.append(self._executor.submit(self.fetch_in_thread, self._next_number()))
+
+    def close(self):
+        # pages fetched ahead of a short one are dropped, calls in flight finish in the background
+        self.done = True
+        for future in self._futures:
+            future.cancel()
+        self._futures.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _next_number(self):
+        number = self._number
+        self._number += 1
+        return number
@@ -0,0 +1,126 @@
+import time
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import Throttled
+
+from core import consts
+from core import models
+
+
+def get_bucket(api_resource):
+    if api_resource == consts.SEND_MESSAGE:
+        return consts.RATE_LIMIT_SEND
+    if api_resource in consts.READ_API:
+        return consts.RATE_LIMIT_READ
+    return consts.RATE_LIMIT_BULK
+
+
+def refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + max(now - updated, 0) * rate)
+
+
+class LocalBackend(object):
+    """
+    Buckets of the process, for tests and single process setups
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, name, rate, burst, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(name, (burst, now))
+            tokens = refill(tokens, updated, now, rate, burst)
+            if tokens >= 1:
+                self._buckets[name] = (tokens - 1, now)
+                return 0
+            self._buckets[name] = (tokens, now)
+            return (1 - tokens) / rate
+
+
+class DatabaseBackend(object):
+    """
+    Buckets shared by all workers and hosts in RateLimitBucket rows.
+    A row is changed only if its version is still the one read, a concurrent change makes the take retry.
+    """
+    attempts = 10
+
+    def take(self, name, rate, burst, now):
+        for _ in range(self.attempts):
+            bucket = self._get(name, burst, now)
+            tokens = refill(bucket.tokens, bucket.updated, now, rate, burst)
+            if tokens < 1:
+                return (1 - tokens) / rate
+
+            updated = models.RateLimitBucket.objects.filter(name=name, version=bucket.version).update(
+                tokens=tokens - 1,
+                # hosts' clocks may differ a little, the refill time never goes back
+                updated=max(now, bucket.updated),
+                version=bucket.version + 1,
+            )
+            if updated:
+                return 0
+        # too busy to agree on the state, the caller waits a token's time
+        return 1 / rate
+
+    def _get(self, name, burst, now):
+        bucket = models.RateLimitBucket.objects.filter(name=name).first()
+        if bucket is not None:
+            return bucket
+        try:
+            with transaction.atomic():
+                return models.RateLimitBucket.objects.create(name=name, tokens=burst, updated=now)
+        except IntegrityError:
+            return models.RateLimitBucket.objects.get(name=name)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    path = settings.DEVINO_RATE_LIMIT_BACKEND
+    with _backends_lock:
+        if path not in _backends:
+            _backends[path] = import_string(path)()
+        return _backends[path]
+
+
+def acquire(bucket, max_wait=None):
+    """
+    Take a token of the bucket waiting up to max_wait seconds for it (None waits as long as needed).
+    Throttled (429) is raised when the token can't be had in time, max_wait=0 fails fast.
+    """
+    limit = settings.DEVINO_RATE_LIMITS.get(bucket)
+    if limit is None:
+        return
+
+    backend = get_backend()
+    deadline = None if max_wait is None else time.time() + max_wait
+    while True:
+        now = time.time()
+        wait = backend.take(bucket, limit['rate'], limit['burst'], now)
+        if not wait:
+            return
+        if deadline is not None and now + wait > deadline:
+            raise Throttled(wait=wait)
+        time.sleep(wait)
+
+
+def get_max_wait(request):
+    """
+    Seconds the request is willing to wait for a token: the X-Rate-Limit-Wait header
+    up to DEVINO_RATE_LIMIT_MAX_WAIT, 0 fails fast
+    """
+    max_wait = settings.DEVINO_RATE_LIMIT_MAX_WAIT
+    value = request.META.get('HTTP_X_RATE_LIMIT_WAIT')
+    if value is None:
+        return max_wait
+    try:
+        return min(max(float(value), 0), max_wait)
+    except ValueError:
+        return max_wait
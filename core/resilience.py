@@ -0,0 +1,154 @@
+import time
+import random
+import logging
+import threading
+import functools
+
+from django.conf import settings
+from django.core.cache import cache
+
+from email_devino.client import DevinoException
+
+from core import clients
+from core import consts
+from core import ratelimit
+from core.exceptions import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+MAX_TRANSITIONS = 10
+
+
+def get_timeout(api_resource):
+    return settings.DEVINO_TIMEOUTS.get(api_resource, (settings.DEVINO_CONNECT_TIMEOUT, settings.DEVINO_READ_TIMEOUT))
+
+
+def is_failure(ex):
+    # the call didn't reach Devino or Devino broke, validation errors say nothing about its health
+    return ex.error is None or (ex.http_status or 0) >= 500
+
+
+def get_backoff(attempt):
+    # full jitter keeps the retries of many workers from coming back in step
+    return random.uniform(0, min(settings.DEVINO_RETRY_BACKOFF_MAX, settings.DEVINO_RETRY_BACKOFF * 2 ** attempt))
+
+
+def call(api_resource, fn, *args, **kwargs):
+    """
+    fn(*args, **kwargs) with the timeout of api_resource behind the circuit breaker of its bucket.
+    Reads failed by a connection error or a 5xx answer are retried with backoff,
+    UpstreamUnavailable (503) is raised without a call while the breaker is open.
+    """
+    breaker = get_breaker(api_resource)
+    attempts = settings.DEVINO_RETRY_ATTEMPTS if api_resource in consts.READ_API else 1
+
+    for attempt in range(attempts):
+        is_probe = breaker.before_call()
+        try:
+            with clients.timeout(get_timeout(api_resource)):
+                answer = fn(*args, **kwargs)
+        except DevinoException as ex:
+            failed = is_failure(ex)
+            breaker.record(failed, is_probe)
+            if not failed or attempt + 1 == attempts:
+                raise
+            logger.info('Retrying %s after %s', api_resource, ex.message)
+            time.sleep(get_backoff(attempt))
+        else:
+            breaker.record(False, is_probe)
+            return answer
+
+
+def wrap(api_resource, fn):
+    return functools.partial(call, api_resource, fn)
+
+
+class CircuitBreaker(object):
+    """
+    Opens when DEVINO_BREAKER_ERROR_RATE of the calls a worker made in DEVINO_BREAKER_WINDOW seconds failed.
+    The state is kept in the shared cache, so all workers fail fast while it is open.
+    After DEVINO_BREAKER_COOL_DOWN seconds one call is let through (half open) and its result closes
+    or opens the breaker again.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.key = 'breaker:{}'.format(name)
+        self.probe_key = 'breaker:{}:probe'.format(name)
+        self._lock = threading.Lock()
+        self._reset_window(time.time())
+
+    def get_state(self):
+        state = cache.get(self.key)
+        if state is None:
+            state = {'name': self.name, 'state': STATE_CLOSED, 'since': None, 'until': None, 'transitions': []}
+        return state
+
+    def before_call(self):
+        """
+        UpstreamUnavailable while the breaker is open, True if the call is the probe of a half open breaker
+        """
+        state = self.get_state()
+        if state['state'] == STATE_CLOSED:
+            return False
+
+        now = time.time()
+        if state['state'] == STATE_OPEN and now < state['until']:
+            raise UpstreamUnavailable(wait=state['until'] - now)
+
+        # a probe that never finished lets another one through after a cool-down
+        if not cache.add(self.probe_key, True, settings.DEVINO_BREAKER_COOL_DOWN):
+            raise UpstreamUnavailable(wait=1)
+        if state['state'] == STATE_OPEN:
+            self._set_state(STATE_HALF_OPEN, now)
+        return True
+
+    def record(self, failed, is_probe=False):
+        now = time.time()
+        if is_probe:
+            self._set_state(STATE_OPEN if failed else STATE_CLOSED, now)
+            cache.delete(self.probe_key)
+            return
+
+        with self._lock:
+            if now - self._window_start >= settings.DEVINO_BREAKER_WINDOW:
+                self._reset_window(now)
+            self._calls += 1
+            self._errors += failed
+            trip = (self._calls >= settings.DEVINO_BREAKER_MIN_CALLS and
+                    self._errors >= self._calls * settings.DEVINO_BREAKER_ERROR_RATE)
+            if trip:
+                self._reset_window(now)
+
+        if trip and self.get_state()['state'] == STATE_CLOSED:
+            self._set_state(STATE_OPEN, now)
+
+    def _reset_window(self, now):
+        self._window_start = now
+        self._calls = 0
+        self._errors = 0
+
+    def _set_state(self, value, now):
+        state = self.get_state()
+        transitions = state['transitions'] + [{'from': state['state'], 'to': value, 'at': now}]
+        cache.set(self.key, {
+            'name': self.name,
+            'state': value,
+            'since': now,
+            'until': now + settings.DEVINO_BREAKER_COOL_DOWN if value == STATE_OPEN else None,
+            'transitions': transitions[-MAX_TRANSITIONS:],
+        }, settings.DEVINO_BREAKER_STATE_TTL)
+        logger.warning('Circuit breaker %s: %s -> %s', self.name, state['state'], value)
+
+
+breakers = {name: CircuitBreaker(name) for name in (consts.RATE_LIMIT_SEND, consts.RATE_LIMIT_BULK,
+                                                    consts.RATE_LIMIT_READ)}
+
+
+def get_breaker(api_resource):
+    # a breaker per rate limit bucket, slow reports don't stop sending
+    return breakers[ratelimit.get_bucket(api_resource)]
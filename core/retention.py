@@ -0,0 +1,108 @@
+import os
+import gzip
+import json
+import time
+import datetime
+import logging
+from itertools import groupby
+
+from django.conf import settings
+from django.utils import timezone
+
+from core import blobs
+from core import consts
+from core import idempotency
+from core import models
+from core.utils import date_handler
+
+logger = logging.getLogger(__name__)
+
+
+def get_retention_days(api_resource):
+    """
+    Days DevinoCall records of api_resource are kept, None keeps them forever
+    """
+    return settings.DEVINO_RETENTION_POLICY.get(api_resource, settings.DEVINO_RETENTION_DAYS)
+
+
+def get_archive_path(api_resource, day):
+    return os.path.join(settings.DEVINO_RETENTION_ARCHIVE_DIR, api_resource, '{}.ndjson.gz'.format(day.isoformat()))
+
+
+def archive(records):
+    """
+    Append records to gzipped NDJSON files partitioned by api_resource and day.
+    Each call adds a new gzip member, concatenated members read back as one file.
+    """
+    def partition(record):
+        return record.api_resource, record.dc.date()
+
+    for (api_resource, day), partition_records in groupby(sorted(records, key=partition), key=partition):
+        path = get_archive_path(api_resource, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as archive_file:
+            with gzip.GzipFile(fileobj=archive_file, mode='wb') as gzip_file:
+                for record in partition_records:
+                    gzip_file.write(json.dumps(serialize(record), default=date_handler).encode())
+                    gzip_file.write(b'\n')
+            archive_file.flush()
+            # records are deleted right after, they must be on disk by then
+            os.fsync(archive_file.fileno())
+
+
+def serialize(record):
+    return {
+        'id': record.id,
+        'api_resource': record.api_resource,
+        'data': blobs.get_data(record),
+        'code': record.code,
+        'description': record.description,
+        'result': blobs.get_result(record),
+        'is_fail': record.is_fail,
+        'latency': record.latency,
+        'dc': record.dc,
+    }
+
+
+def purge(api_resource, cutoff, batch_size, pause=0, dry_run=False):
+    """
+    Archive and delete records of api_resource older than cutoff, batch_size rows at a time.
+    Every batch is deleted in its own short statement, so live traffic never waits on a long lock.
+    Records are archived at least once: if the process dies between archive and delete
+    the batch is archived again on the next run, the id tells duplicates apart.
+    """
+    records = models.DevinoCall.objects.filter(api_resource=api_resource, dc__lt=cutoff)
+    if dry_run:
+        return records.count()
+
+    purged = 0
+    while True:
+        batch = list(records.order_by('dc', 'id')[:batch_size])
+        if not batch:
+            break
+
+        archive(batch)
+        models.DevinoCall.objects.filter(id__in=[record.id for record in batch]).delete()
+        purged += len(batch)
+        logger.info('Purged %s %s records', purged, api_resource)
+
+        if len(batch) < batch_size:
+            break
+        time.sleep(pause)
+    return purged
+
+
+def run(batch_size, pause=0, dry_run=False, now=None):
+    now = now or timezone.now()
+    purged = {}
+    for api_resource in consts.API:
+        days = get_retention_days(api_resource)
+        if days is None:
+            continue
+        cutoff = now - datetime.timedelta(days=days)
+        purged[api_resource] = purge(api_resource, cutoff, batch_size, pause=pause, dry_run=dry_run)
+
+    if not dry_run:
+        blobs.delete_orphans(batch_size, now=now)
+        idempotency.delete_expired(now=now)
+    return purged
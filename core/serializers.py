@@ -1,5 +1,10 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from core import audit
+from core import consts
+from core import contacts
+
 
 class SenderAddress(serializers.Serializer):
     address = serializers.EmailField()
@@ -10,6 +15,12 @@ class GetTasks(serializers.Serializer):
     range_end = serializers.IntegerField(default=100)
 
 
+class StreamTasks(serializers.Serializer):
+    state = serializers.IntegerField(default=None)
+    name = serializers.CharField(default=None)     # part of the name, case insensitive
+    page_size = serializers.IntegerField(default=100, min_value=1, max_value=settings.DEVINO_STREAM_PAGE_MAX_SIZE)
+
+
 class GetTask(serializers.Serializer):
     id_task = serializers.IntegerField()
 
@@ -28,11 +39,36 @@ class AddTask(serializers.Serializer):
     template_id = serializers.CharField(default="")
     duplicates = serializers.NullBooleanField(default=None)
 
+    def validate_contact_list(self, value):
+        if value is None:
+            return value
+        try:
+            return contacts.ContactList(value)
+        except ValueError as ex:
+            raise serializers.ValidationError(ex.args[0])
+
 
 class EditTask(AddTask):
     id_task = serializers.IntegerField()
 
 
+class AddTaskFile(AddTask):
+    contact_list = None
+    contact_file = serializers.FileField(source='contact_list')
+
+    def validate_contact_file(self, value):
+        contact_file = contacts.ContactFile(value)
+        try:
+            contact_file.scan()
+        except ValueError as ex:
+            raise serializers.ValidationError(ex.args[0])
+        return contact_file
+
+
+class EditTaskFile(AddTaskFile):
+    id_task = serializers.IntegerField()
+
+
 class EditTaskStatus(GetTask):
     task_state = serializers.CharField()
 
@@ -73,6 +109,14 @@ class GetStateDetailing(serializers.Serializer):
     range_end = serializers.IntegerField(default=100)
 
 
+class StreamStateDetailing(serializers.Serializer):
+    id_task = serializers.IntegerField(default=None)
+    start = serializers.DateField(default=None)
+    end = serializers.DateField(default=None)
+    state = serializers.CharField(default=None)
+    page_size = serializers.IntegerField(default=100, min_value=1, max_value=settings.DEVINO_STREAM_PAGE_MAX_SIZE)
+
+
 class SendMessage(serializers.Serializer):
     sender_email = serializers.EmailField()
     sender_name = serializers.CharField()
@@ -85,5 +129,52 @@ class SendMessage(serializers.Serializer):
     template_id = serializers.CharField(default=None)
 
 
+class SendMessages(serializers.Serializer):
+    messages = SendMessage(many=True, allow_empty=False)
+
+    def validate_messages(self, value):
+        if len(value) > settings.DEVINO_BATCH_MAX_SIZE:
+            raise serializers.ValidationError(
+                'Ensure this field has no more than {} elements.'.format(settings.DEVINO_BATCH_MAX_SIZE))
+        return value
+
+
 class GetStatusMessages(serializers.Serializer):
     id_messages = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+
+
+class GetQueuedMessage(serializers.Serializer):
+    id = serializers.IntegerField()
+
+
+class GetDevinoCall(serializers.Serializer):
+    id = serializers.IntegerField()
+
+
+class GetDevinoCalls(serializers.Serializer):
+    api_resource = serializers.ChoiceField(choices=consts.API_CHOICES, default=None)
+    dc_from = serializers.DateTimeField(default=None)
+    dc_to = serializers.DateTimeField(default=None)
+    is_fail = serializers.NullBooleanField(default=None)
+    code = serializers.CharField(default=None)
+    user_message_id = serializers.CharField(default=None)
+    id_task = serializers.IntegerField(default=None)
+    cursor = serializers.CharField(default=None)
+    limit = serializers.IntegerField(default=100, min_value=1, max_value=settings.DEVINO_AUDIT_PAGE_MAX_SIZE)
+
+    def validate_cursor(self, value):
+        if value is None:
+            return value
+        try:
+            return audit.decode_cursor(value)
+        except ValueError as ex:
+            raise serializers.ValidationError(str(ex))
+
+    def validate(self, attrs):
+        # keys of the request payload, looked up with the GIN index on postgresql
+        attrs['data_contains'] = {}
+        for key in ('user_message_id', 'id_task'):
+            value = attrs.pop(key)
+            if value is not None:
+                attrs['data_contains'][key] = value
+        return attrs
@@ -0,0 +1,207 @@
+import re
+import time
+import uuid
+import random
+import itertools
+from urllib.parse import unquote
+
+import requests
+from django.conf import settings
+
+from email_devino import client as devino_client
+
+from core import consts
+from core.clients import PooledDevinoClient
+
+ERROR_CODES = {400: consts.STATUS_BAD_REQUEST, 500: consts.STATUS_ERROR_API}
+
+ROUTES = [
+    (devino_client.METHOD_GET, r'/UserSettings/SenderAddresses', consts.GET_SENDER_ADDRESSES),
+    (devino_client.METHOD_POST, r'/UserSettings/SenderAddresses', consts.ADD_SENDER_ADDRESS),
+    (devino_client.METHOD_DELETE, r'/UserSettings/SenderAddresses/(?P<address>[^/]+)', consts.DEL_SENDER_ADDRESS),
+    (devino_client.METHOD_GET, r'/Tasks', consts.GET_TASKS_LIST),
+    (devino_client.METHOD_GET, r'/Tasks/(?P<id>\d+)', consts.GET_TASK),
+    (devino_client.METHOD_POST, r'/Tasks', consts.ADD_TASK),
+    (devino_client.METHOD_PUT, r'/Tasks/(?P<id>\d+)', consts.EDIT_TASK),
+    (devino_client.METHOD_PUT, r'/Tasks/(?P<id>\d+)/State', consts.EDIT_TASK_STATUS),
+    (devino_client.METHOD_GET, r'/Templates/(?P<id>\d+)', consts.GET_TEMPLATE),
+    (devino_client.METHOD_POST, r'/Templates', consts.ADD_TEMPLATE),
+    (devino_client.METHOD_PUT, r'/Templates/(?P<id>\d+)', consts.EDIT_TEMPLATE),
+    (devino_client.METHOD_DELETE, r'/Templates/(?P<id>\d+)', consts.DEL_TEMPLATE),
+    (devino_client.METHOD_GET, r'/Statistics', consts.GET_STATE),
+    (devino_client.METHOD_GET, r'/Statistics/Messages', consts.GET_STATE_DETAILING),
+    (devino_client.METHOD_POST, r'/Messages', consts.SEND_MESSAGE),
+    (devino_client.METHOD_GET, r'/Messages/(?P<ids>[^/]+)', consts.GET_STATUS_MESSAGE),
+]
+ROUTES = [(method, re.compile(pattern + '$'), api_resource) for method, pattern, api_resource in ROUTES]
+
+
+class Reply(object):
+    def __init__(self, api_resource, latency, status_code=200, body=None, drop=False):
+        self.api_resource = api_resource
+        self.latency = latency
+        self.status_code = status_code
+        self.body = body
+        # the connection is broken instead of answering
+        self.drop = drop
+
+
+class SimulatedResponse(object):
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        if self.body is None:
+            raise ValueError('No JSON body')
+        return self.body
+
+
+class Simulator(object):
+    """
+    Answers Devino API requests like Devino would, with the latency, errors and result sizes
+    of DEVINO_SIMULATOR: the 'default' profile updated by the profile of the api_resource.
+    """
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else settings.DEVINO_SIMULATOR
+        self.random = random.Random(self.config.get('seed'))
+        self._ids = itertools.count(1)
+
+    def get_profile(self, api_resource):
+        profile = dict(self.config.get('default', {}))
+        profile.update(self.config.get(api_resource, {}))
+        return profile
+
+    def handle(self, method, path, params=None, json=None, headers=None):
+        for route_method, pattern, api_resource in ROUTES:
+            match = pattern.search(path)
+            if route_method == method and match:
+                break
+        else:
+            return Reply(None, 0, 404, {'Code': 'not_found', 'Description': 'Unknown path {}'.format(path)})
+
+        profile = self.get_profile(api_resource)
+        latency = self.get_latency(profile.get('latency'))
+        chance = self.random.random()
+        if chance < profile.get('connection_error_rate', 0):
+            return Reply(api_resource, latency, drop=True)
+        if chance < profile.get('connection_error_rate', 0) + profile.get('error_rate', 0):
+            status_code = profile.get('error_status', 500)
+            body = None
+            if status_code in ERROR_CODES:
+                body = {'Code': ERROR_CODES[status_code], 'Description': 'Simulated error'}
+            return Reply(api_resource, latency, status_code, body)
+
+        answer = getattr(self, api_resource)
+        result = answer(profile, params or {}, json or {}, headers or {}, **match.groupdict())
+        return Reply(api_resource, latency, body={'Code': consts.STATUS_OK, 'Description': 'ok', 'Result': result})
+
+    def get_latency(self, latency):
+        """
+        Seconds of a call by the latency profile:
+        {'distribution': 'constant', 'value': s}, {'distribution': 'uniform', 'low': s, 'high': s},
+        {'distribution': 'lognormal', 'median': s, 'sigma': x} or {'distribution': 'exponential', 'mean': s}
+        """
+        if not latency:
+            return 0
+        distribution = latency['distribution']
+        if distribution == 'constant':
+            return latency['value']
+        if distribution == 'uniform':
+            return self.random.uniform(latency['low'], latency['high'])
+        if distribution == 'lognormal':
+            # median of a lognormal distribution is exp(mu)
+            return latency['median'] * self.random.lognormvariate(0, latency['sigma'])
+        if distribution == 'exponential':
+            return self.random.expovariate(1 / latency['mean'])
+        raise ValueError('Unknown latency distribution {}'.format(distribution))
+
+    def get_range(self, profile, headers):
+        # items of a "Range: items=1-100" request that exist, the last page is short
+        start, end = 1, 100
+        match = re.match(r'items=(\d+)-(\d+)', headers.get('Range', ''))
+        if match:
+            start, end = int(match.group(1)), int(match.group(2))
+        return range(start, min(end, profile.get('result_size', 100)) + 1)
+
+    def get_addresses_sender(self, profile, params, json, headers):
+        return [{'SenderAddress': 'sender{}@example.com'.format(number), 'Confirmed': True}
+                for number in range(1, profile.get('result_size', 3) + 1)]
+
+    def add_address_sender(self, profile, params, json, headers):
+        return json.get('SenderAddress')
+
+    def del_address_sender(self, profile, params, json, headers, address):
+        return unquote(address)
+
+    def get_bulk_list(self, profile, params, json, headers):
+        return [self.make_task(id_task) for id_task in self.get_range(profile, headers)]
+
+    def get_bulk(self, profile, params, json, headers, id):
+        return self.make_task(int(id))
+
+    def add_bulk(self, profile, params, json, headers):
+        return next(self._ids)
+
+    def edit_bulk(self, profile, params, json, headers, id):
+        return int(id)
+
+    def edit_bulk_status(self, profile, params, json, headers, id):
+        return int(id)
+
+    def get_template(self, profile, params, json, headers, id):
+        return {'Id': int(id), 'Name': 'Template {}'.format(id), 'Subject': 'Subject', 'Text': self.make_text(profile)}
+
+    def add_template(self, profile, params, json, headers):
+        return next(self._ids)
+
+    def edit_template(self, profile, params, json, headers, id):
+        return int(id)
+
+    def del_template(self, profile, params, json, headers, id):
+        return int(id)
+
+    def get_state(self, profile, params, json, headers):
+        total = profile.get('result_size', 100)
+        return {'Sent': total, 'Delivered': total - total // 10, 'Opened': total // 2, 'Clicked': total // 10}
+
+    def get_state_detailing(self, profile, params, json, headers):
+        return [{'Id': number, 'Address': 'recipient{}@example.com'.format(number), 'State': 'Delivered',
+                 'TaskId': params.get('TaskId')} for number in self.get_range(profile, headers)]
+
+    def send_message(self, profile, params, json, headers):
+        return [uuid.uuid4().hex]
+
+    def get_status_message(self, profile, params, json, headers, ids):
+        return [{'MessageId': id_message, 'State': 'Delivered'} for id_message in unquote(ids).split(',')]
+
+    def make_task(self, id_task):
+        return {'Id': id_task, 'Name': 'Task {}'.format(id_task), 'State': devino_client.STATE_FINISHED}
+
+    def make_text(self, profile):
+        return 'x' * profile.get('text_size', 100)
+
+
+class SimulatedDevinoClient(PooledDevinoClient):
+    """
+    PooledDevinoClient answered by the in-process simulator instead of Devino,
+    latency longer than the read timeout ends with a timeout like a real call
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(SimulatedDevinoClient, self).__init__(*args, **kwargs)
+        self.simulator = Simulator()
+
+    def _send(self, method, url, params=None, json=None, headers=None, timeout=None):
+        reply = self.simulator.handle(method, url[len(self.url):], params, json, headers)
+
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and reply.latency > read_timeout:
+            time.sleep(read_timeout)
+            raise requests.ReadTimeout('Simulated read timeout')
+        time.sleep(reply.latency)
+
+        if reply.drop:
+            raise requests.ConnectionError('Simulated connection error')
+        return SimulatedResponse(reply.status_code, reply.body)
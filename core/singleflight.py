@@ -0,0 +1,86 @@
+import time
+import uuid
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_lock = threading.Lock()
+_calls = {}
+
+
+def do(key, fn):
+    """
+    Run fn once for all concurrent callers with the same key and give every caller its result.
+    Threads of the process wait on the leader's call. With DEVINO_SINGLEFLIGHT_CACHE
+    other processes wait for the leader to publish the result in that shared cache.
+    """
+    with _lock:
+        call = _calls.get(key)
+        is_leader = call is None
+        if is_leader:
+            call = Call()
+            _calls[key] = call
+
+    if not is_leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _do_shared(key, fn) if settings.DEVINO_SINGLEFLIGHT_CACHE else fn()
+        return call.result
+    except Exception as ex:
+        call.error = ex
+        raise
+    finally:
+        with _lock:
+            del _calls[key]
+        call.done.set()
+
+
+def _do_shared(key, fn):
+    cache = caches[settings.DEVINO_SINGLEFLIGHT_CACHE]
+    lock_key = 'singleflight:{}'.format(key)
+    token = uuid.uuid4().hex
+
+    if cache.add(lock_key, token, settings.DEVINO_SINGLEFLIGHT_TIMEOUT):
+        try:
+            result = fn()
+            cache.set(_result_key(token), result, settings.DEVINO_SINGLEFLIGHT_RESULT_TTL)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    leader_token = cache.get(lock_key)
+    if leader_token is not None:
+        result = _wait(cache, lock_key, leader_token)
+        if result is not None:
+            return result
+    return fn()
+
+
+def _wait(cache, lock_key, token):
+    deadline = time.time() + settings.DEVINO_SINGLEFLIGHT_TIMEOUT
+    while time.time() < deadline:
+        result = cache.get(_result_key(token))
+        if result is not None:
+            return result
+        if cache.get(lock_key) != token:
+            # the leader has finished or died, its result may have been published just now
+            return cache.get(_result_key(token))
+        time.sleep(settings.DEVINO_SINGLEFLIGHT_POLL_INTERVAL)
+    return None
+
+
+def _result_key(token):
+    return 'singleflight:result:{}'.format(token)
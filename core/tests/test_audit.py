@@ -0,0 +1,123 @@
+from django.test import TestCase, mock, override_settings
+
+from email_devino.client import ApiAnswer
+from email_devino.client import DevinoError, DevinoException
+
+from .. import audit
+from .. import consts
+from .. import models
+
+ANSWER_SUCCESS = ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': [1]})
+
+
+class MakeRecord(TestCase):
+    def test_answer(self):
+        record = audit.make_record(consts.GET_TASK, {'id_task': 1}, answer=ANSWER_SUCCESS)
+
+        self.assertEqual(record.api_resource, consts.GET_TASK)
+        self.assertEqual(record.data, {'id_task': 1})
+        self.assertEqual(record.code, 'ok')
+        self.assertEqual(record.result, [1])
+        self.assertFalse(record.is_fail)
+
+    def test_exception(self):
+        exception = DevinoException(message='test', http_status=400,
+                                    error=DevinoError(code='validation_error', description='error'))
+
+        record = audit.make_record(consts.GET_TASK, {'id_task': 1}, exception=exception)
+
+        self.assertEqual(record.code, 'validation_error')
+        self.assertEqual(record.description, 'error')
+        self.assertTrue(record.is_fail)
+
+    def test_connection_error(self):
+        record = audit.make_record(consts.GET_TASK, None, exception=DevinoException(message='x' * 300))
+
+        self.assertEqual(record.code, consts.STATUS_ERROR_API)
+        self.assertEqual(record.description, 'x' * 256)
+
+
+class Call(TestCase):
+    def test_answer(self):
+        fn = mock.Mock(return_value=ANSWER_SUCCESS)
+
+        answer, record = audit.call(consts.GET_TASK, fn, {'id_task': 1})
+
+        fn.assert_called_once_with(id_task=1)
+        self.assertIs(answer, ANSWER_SUCCESS)
+        self.assertEqual(record.code, 'ok')
+        self.assertGreaterEqual(record.latency, 0)
+
+    def test_exception(self):
+        fn = mock.Mock(side_effect=DevinoException(message='connection error'))
+
+        answer, record = audit.call(consts.GET_SENDER_ADDRESSES, fn)
+
+        fn.assert_called_once_with()
+        self.assertIsNone(answer)
+        self.assertTrue(record.is_fail)
+        self.assertIsNotNone(record.latency)
+
+
+class BulkWrite(TestCase):
+    def test_bulk_write(self):
+        records = [audit.make_record(consts.GET_TASK, {'id_task': id_task}, answer=ANSWER_SUCCESS)
+                   for id_task in range(3)]
+
+        audit.bulk_write(records)
+
+        self.assertEqual(models.DevinoCall.objects.count(), 3)
+        # compatibility views
+        for devino_request in models.DevinoRequest.objects.all():
+            self.assertEqual(devino_request.devino_answer.code, 'ok')
+
+
+@mock.patch('core.audit.threading.Thread')
+@override_settings(DEVINO_AUDIT_MODE=consts.AUDIT_MODE_BUFFERED, DEVINO_AUDIT_BUFFER_SIZE=3)
+class BufferedWriter(TestCase):
+    def setUp(self):
+        self.writer = audit.BufferedWriter()
+        patcher = mock.patch('core.audit.writer', self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_records(self, count):
+        return [audit.make_record(consts.GET_TASK, {'id_task': 1}, answer=ANSWER_SUCCESS) for _ in range(count)]
+
+    def test_flush_by_size(self, mock_thread):
+        audit.write(self.make_records(2))
+        self.assertFalse(models.DevinoCall.objects.exists())
+        self.assertEqual(mock_thread.call_count, 1)
+
+        audit.write(self.make_records(1))
+        self.assertEqual(models.DevinoCall.objects.count(), 3)
+
+    def test_flush(self, mock_thread):
+        audit.write(self.make_records(1))
+
+        self.writer.flush()
+        self.writer.flush()
+
+        self.assertEqual(models.DevinoCall.objects.count(), 1)
+
+    @override_settings(DEVINO_AUDIT_BUFFER_MAX=2)
+    def test_flush_error(self, mock_thread):
+        audit.write(self.make_records(2))
+
+        with mock.patch('core.audit.bulk_write', side_effect=Exception('database is down')):
+            with self.assertLogs('core.audit', 'ERROR'):
+                audit.write(self.make_records(1))
+        self.assertFalse(models.DevinoCall.objects.exists())
+
+        self.writer.flush()
+        self.assertEqual(models.DevinoCall.objects.count(), 2)
+
+    def test_fork(self, mock_thread):
+        audit.write(self.make_records(1))
+
+        with mock.patch('core.audit.os.getpid', return_value=-1):
+            audit.write(self.make_records(1))
+        self.writer.flush()
+
+        self.assertEqual(mock_thread.call_count, 2)
+        self.assertEqual(models.DevinoCall.objects.count(), 1)
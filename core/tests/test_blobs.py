@@ -0,0 +1,62 @@
+import json
+import datetime
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from email_devino.client import ApiAnswer
+
+from .. import audit
+from .. import blobs
+from .. import consts
+from .. import models
+
+CONTACT_LIST = [['test{}@test.test'.format(i), 'name {}'.format(i)] for i in range(100)]
+
+
+@override_settings(DEVINO_AUDIT_BLOB_THRESHOLD=1000)
+class Offload(TestCase):
+    def make_record(self, data, result=None):
+        answer = ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': result})
+        return audit.make_record(consts.ADD_TASK, data, answer=answer)
+
+    def test_offload(self):
+        result = list(range(1000))
+        record = self.make_record({'contact_list': CONTACT_LIST}, result=result)
+
+        audit.bulk_write([record])
+
+        record = models.DevinoCall.objects.get()
+        self.assertIsNone(record.data)
+        self.assertIsNone(record.result)
+        self.assertEqual(len(record.data_hash), 64)
+        self.assertEqual(blobs.get_data(record), {'contact_list': CONTACT_LIST})
+        self.assertEqual(blobs.get_result(record), result)
+        self.assertEqual(record.result_size, len(json.dumps(result, separators=(',', ':'))))
+
+    def test_small(self):
+        audit.bulk_write([self.make_record({'id_task': 1}, result=[1])])
+
+        record = models.DevinoCall.objects.get()
+        self.assertEqual(record.data, {'id_task': 1})
+        self.assertEqual(record.data_hash, '')
+        self.assertEqual(blobs.get_result(record), [1])
+        self.assertFalse(models.AuditBlob.objects.exists())
+
+    def test_identical(self):
+        audit.bulk_write([self.make_record({'contact_list': CONTACT_LIST})])
+        audit.bulk_write([self.make_record({'contact_list': CONTACT_LIST}) for _ in range(2)])
+
+        self.assertEqual(models.DevinoCall.objects.count(), 3)
+        self.assertEqual(models.AuditBlob.objects.count(), 1)
+
+    def test_delete_orphans(self):
+        audit.bulk_write([self.make_record({'contact_list': CONTACT_LIST})])
+        audit.bulk_write([self.make_record({'contact_list': CONTACT_LIST[:50]})])
+        models.DevinoCall.objects.filter(id=models.DevinoCall.objects.first().id).delete()
+
+        self.assertEqual(blobs.delete_orphans(10), 0)
+
+        deleted = blobs.delete_orphans(10, now=timezone.now() + datetime.timedelta(days=2))
+        self.assertEqual(deleted, 1)
+        self.assertTrue(blobs.get_data(models.DevinoCall.objects.get()))
@@ -0,0 +1,139 @@
+import time
+
+from django.core.cache import cache as django_cache
+from django.test import TestCase, mock, override_settings
+
+from email_devino.client import ApiAnswer
+from email_devino.client import DevinoException
+
+from .. import cache
+
+ANSWER_SENDER_ADDRESSES = ApiAnswer.create({'Code': 'ok', 'Result': [
+    {'SenderAddress': 'test@test.test', 'Confirmed': True},
+    {'SenderAddress': 'new@test.test', 'Confirmed': False},
+]})
+
+
+class SenderAddresses(TestCase):
+    @mock.patch('core.clients.PooledDevinoClient.get_sender_addresses')
+    def test_get_cached(self, mock_obj):
+        mock_obj.return_value = ANSWER_SENDER_ADDRESSES
+
+        self.assertEqual(cache.get_sender_addresses(), ['test@test.test'])
+        self.assertEqual(cache.get_sender_addresses(), ['test@test.test'])
+        self.assertEqual(mock_obj.call_count, 1)
+
+    @mock.patch('core.clients.PooledDevinoClient.get_sender_addresses')
+    def test_invalidate(self, mock_obj):
+        mock_obj.return_value = ANSWER_SENDER_ADDRESSES
+
+        cache.get_sender_addresses()
+        cache.invalidate_sender_addresses()
+        cache.get_sender_addresses()
+
+        self.assertEqual(mock_obj.call_count, 2)
+
+    @mock.patch('core.cache.threading.Thread')
+    @mock.patch('core.clients.PooledDevinoClient.get_sender_addresses')
+    def test_get_stale(self, mock_obj, mock_thread):
+        mock_obj.side_effect = DevinoException(message='timeout')
+        django_cache.set(cache.SENDER_ADDRESSES_KEY, {'emails': ['old@test.test'], 'expires': time.time() - 1})
+
+        self.assertEqual(cache.get_sender_addresses(), ['old@test.test'])
+        self.assertEqual(cache.get_sender_addresses(), ['old@test.test'])
+        self.assertFalse(mock_obj.called)
+        # only the first reader starts a refresh
+        self.assertEqual(mock_thread.call_count, 1)
+
+    @mock.patch('core.clients.PooledDevinoClient.get_sender_addresses')
+    def test_revalidate_error(self, mock_obj):
+        mock_obj.side_effect = DevinoException(message='timeout')
+        django_cache.set(cache.SENDER_ADDRESSES_KEY, {'emails': ['old@test.test'], 'expires': time.time() - 1})
+        django_cache.add(cache.SENDER_ADDRESSES_LOCK_KEY, True)
+
+        with self.assertLogs('core.cache', 'WARNING'):
+            cache._revalidate_sender_addresses()
+
+        self.assertEqual(django_cache.get(cache.SENDER_ADDRESSES_KEY)['emails'], ['old@test.test'])
+        self.assertIsNone(django_cache.get(cache.SENDER_ADDRESSES_LOCK_KEY))
+
+
+class ResourceCache(TestCase):
+    def setUp(self):
+        cache._resources.clear()
+        self.cache = cache.ResourceCache('test')
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get(1))
+
+        self.cache.set(1, {'code': 'ok'}, self.cache.version(1))
+
+        self.assertEqual(self.cache.get(1), {'code': 'ok'})
+        self.assertIsNone(self.cache.get(2))
+
+    def test_invalidate(self):
+        self.cache.set(1, {'code': 'ok'}, self.cache.version(1))
+
+        self.cache.invalidate(1)
+
+        self.assertIsNone(self.cache.get(1))
+
+    def test_invalidate_other_worker(self):
+        self.cache.set(1, {'code': 'ok'}, self.cache.version(1))
+
+        # another worker only changes the shared version
+        django_cache.set(self.cache._version_key(1), 'other')
+
+        self.assertIsNone(self.cache.get(1))
+
+    def test_invalidate_during_request(self):
+        version = self.cache.version(1)
+        self.cache.invalidate(1)
+        self.cache.set(1, {'code': 'ok'}, version)
+
+        self.assertIsNone(self.cache.get(1))
+
+    @override_settings(DEVINO_RESOURCE_CACHE_SIZE=2)
+    def test_lru(self):
+        for resource_id in (1, 2):
+            self.cache.set(resource_id, resource_id, self.cache.version(resource_id))
+        self.cache.get(1)
+        self.cache.set(3, 3, self.cache.version(3))
+
+        self.assertEqual(self.cache.get(1), 1)
+        self.assertIsNone(self.cache.get(2))
+        self.assertEqual(self.cache.get(3), 3)
+
+    @override_settings(DEVINO_RESOURCE_CACHE_TTL=-1)
+    def test_expired(self):
+        self.cache.set(1, {'code': 'ok'}, self.cache.version(1))
+
+        self.assertIsNone(self.cache.get(1))
+
+
+class TaskFinished(TestCase):
+    def setUp(self):
+        cache._resources.clear()
+
+    def test_finished(self):
+        cache.tasks.set(1, {'code': 'ok', 'result': {'Id': 1, 'State': 5}}, cache.tasks.version(1))
+
+        self.assertTrue(cache.is_task_finished(1))
+
+    def test_started(self):
+        cache.tasks.set(1, {'code': 'ok', 'result': {'Id': 1, 'State': 2}}, cache.tasks.version(1))
+
+        self.assertFalse(cache.is_task_finished(1))
+
+    @mock.patch('core.clients.PooledDevinoClient.get_task')
+    def test_unknown(self, mock_obj):
+        self.assertFalse(cache.is_task_finished(1))
+        self.assertFalse(cache.is_task_finished(None))
+        # Devino is not asked
+        mock_obj.assert_not_called()
+
+    def test_request_key(self):
+        self.assertEqual(cache.request_key('get_state', {'id_task': 1, 'start': None}),
+                         cache.request_key('get_state', {'start': None, 'id_task': 1}))
+        self.assertNotEqual(cache.request_key('get_state', {'id_task': 1}),
+                            cache.request_key('get_state_detailing', {'id_task': 1}))
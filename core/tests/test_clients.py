@@ -0,0 +1,100 @@
+import requests
+
+from django.test import SimpleTestCase, mock, override_settings
+
+from email_devino.client import DevinoException
+
+from .. import clients
+
+
+class Registry(SimpleTestCase):
+    def setUp(self):
+        clients.reset()
+
+    def tearDown(self):
+        clients.reset()
+
+    @override_settings(DEVINO_POOL_SIZE=3, DEVINO_CONNECT_TIMEOUT=1, DEVINO_READ_TIMEOUT=2)
+    def test_get_client(self):
+        client = clients.get_client()
+
+        self.assertIs(clients.get_client(), client)
+        self.assertEqual(client.timeout, (1, 2))
+        self.assertEqual(client.session.get_adapter('https://test.test')._pool_maxsize, 3)
+
+    def test_get_client_after_fork(self):
+        client = clients.get_client()
+
+        with mock.patch('core.clients.os.getpid', return_value=-1):
+            self.assertIsNot(clients.get_client(), client)
+
+    @mock.patch('core.clients.PooledDevinoClient.get_tasks')
+    def test_client_method(self, mock_obj):
+        clients.ClientMethod('get_tasks')(range_start=1, range_end=10)
+
+        mock_obj.assert_called_once_with(range_start=1, range_end=10)
+
+
+class PooledDevinoClient(SimpleTestCase):
+    def setUp(self):
+        self.session = mock.Mock()
+        self.client = clients.PooledDevinoClient('login', 'password', session=self.session, timeout=(1, 2))
+
+    def test_request_success(self):
+        self.session.request.return_value = mock.Mock(status_code=200, json=lambda: {'Code': 'ok', 'Result': [1]})
+
+        answer = self.client.get_tasks(range_start=1, range_end=10)
+
+        self.assertEqual(answer.code, 'ok')
+        self.assertEqual(answer.result, [1])
+        args, kwargs = self.session.request.call_args
+        self.assertEqual(args[0], 'get')
+        self.assertEqual(kwargs['headers']['Range'], 'items=1-10')
+        self.assertEqual(kwargs['params'], {'format': 'json'})
+        self.assertEqual(kwargs['timeout'], (1, 2))
+
+    def test_request_error(self):
+        self.session.request.return_value = mock.Mock(
+            status_code=400, json=lambda: {'Code': 'validation_error', 'Description': 'error'})
+
+        with self.assertRaises(DevinoException) as context:
+            self.client.get_task(id_task=1)
+
+        self.assertEqual(context.exception.http_status, 400)
+        self.assertEqual(context.exception.error.code, 'validation_error')
+
+    def test_request_timeout(self):
+        self.session.request.side_effect = requests.ReadTimeout()
+
+        with self.assertRaises(DevinoException) as context:
+            self.client.get_task(id_task=1)
+
+        self.assertIsNone(context.exception.error)
+
+    def test_request_gateway_error(self):
+        self.session.request.return_value = mock.Mock(status_code=502, json=mock.Mock(side_effect=ValueError))
+
+        with self.assertRaises(DevinoException) as context:
+            self.client.get_task(id_task=1)
+
+        self.assertEqual(context.exception.http_status, 502)
+        self.assertIsNone(context.exception.error)
+
+    def test_request_html_error(self):
+        self.session.request.return_value = mock.Mock(status_code=500, json=mock.Mock(side_effect=ValueError))
+
+        with self.assertRaises(DevinoException) as context:
+            self.client.get_task(id_task=1)
+
+        self.assertEqual(context.exception.http_status, 500)
+        self.assertIsNone(context.exception.error)
+
+    def test_request_timeout_override(self):
+        self.session.request.return_value = mock.Mock(status_code=200, json=lambda: {'Code': 'ok', 'Result': []})
+
+        with clients.timeout((3, 4)):
+            self.client.get_task(id_task=1)
+        self.assertEqual(self.session.request.call_args[1]['timeout'], (3, 4))
+
+        self.client.get_task(id_task=1)
+        self.assertEqual(self.session.request.call_args[1]['timeout'], (1, 2))
@@ -0,0 +1,122 @@
+import threading
+
+from django.test import SimpleTestCase, mock, override_settings
+from prometheus_client import REGISTRY
+from rest_framework.exceptions import Throttled
+
+from .. import consts
+from .. import concurrency
+from .. import metrics
+from .. import models
+
+
+def make_record(latency=0.1, code=consts.STATUS_OK):
+    return models.DevinoCall(api_resource=consts.GET_TASK, code=code, latency=latency)
+
+
+@override_settings(DEVINO_CONCURRENCY_INITIAL=2, DEVINO_CONCURRENCY_MIN=1, DEVINO_CONCURRENCY_MAX=3,
+                   DEVINO_CONCURRENCY_BACKOFF=0.5, DEVINO_CONCURRENCY_LATENCY_LIMIT=1,
+                   DEVINO_CONCURRENCY_LATENCY_LIMITS={consts.GET_STATE_DETAILING: 10})
+class AdaptiveLimiter(SimpleTestCase):
+    def setUp(self):
+        self.limiter = concurrency.AdaptiveLimiter('read')
+
+    def fill(self):
+        for _ in range(int(self.limiter.limit)):
+            self.limiter.acquire(0)
+
+    def test_limit(self):
+        self.fill()
+
+        with self.assertRaises(Throttled):
+            self.limiter.acquire(0)
+        self.assertEqual(self.limiter.get_state()['in_flight'], 2)
+        self.assertEqual(self.limiter.get_state()['queued'], 0)
+
+    def test_increase(self):
+        self.fill()
+        self.limiter.release(make_record())
+        self.assertEqual(self.limiter.limit, 2.5)
+
+        # calls below the limit don't raise it
+        self.limiter.release(make_record())
+        self.assertEqual(self.limiter.limit, 2.5)
+
+        for _ in range(10):
+            self.fill()
+            for _ in range(int(self.limiter.limit)):
+                self.limiter.release(make_record())
+        self.assertEqual(self.limiter.limit, 3)
+
+    def test_decrease(self):
+        for record in (make_record(latency=2), make_record(code=consts.STATUS_ERROR_API), make_record(latency=2)):
+            self.limiter.acquire(0)
+            self.limiter.release(record)
+
+        self.assertEqual(self.limiter.limit, 1)
+
+    def test_latency_limits(self):
+        self.limiter.acquire(0)
+        self.limiter.release(models.DevinoCall(api_resource=consts.GET_STATE_DETAILING, code='ok', latency=5))
+
+        self.assertEqual(self.limiter.limit, 2)
+
+    def test_no_record(self):
+        self.fill()
+        self.limiter.release()
+
+        self.assertEqual(self.limiter.limit, 2)
+        self.assertEqual(self.limiter.in_flight, 1)
+
+    def test_queue(self):
+        self.fill()
+        queued = threading.Event()
+        acquired = []
+
+        def wait(timeout=None):
+            queued.set()
+            return real_wait(timeout)
+
+        real_wait = self.limiter._condition.wait
+        with mock.patch.object(self.limiter._condition, 'wait', side_effect=wait):
+            thread = threading.Thread(target=lambda: acquired.append(self.limiter.acquire(5)))
+            thread.start()
+            queued.wait(1)
+            self.assertEqual(self.limiter.get_state()['queued'], 1)
+
+            self.limiter.release(make_record())
+            thread.join(1)
+
+        self.assertEqual(acquired, [None])
+        self.assertEqual(self.limiter.get_state()['queued'], 0)
+        self.assertEqual(self.limiter.get_state()['in_flight'], 2)
+
+    def test_slot(self):
+        with self.limiter.slot() as slot:
+            self.assertEqual(self.limiter.in_flight, 1)
+            slot.record = make_record(latency=2)
+
+        self.assertEqual(self.limiter.in_flight, 0)
+        self.assertEqual(self.limiter.limit, 1)
+
+    def test_gauges(self):
+        def get_value(name, api_resource=consts.GET_TASK):
+            return REGISTRY.get_sample_value(name, {'api_resource': api_resource}) or 0
+
+        in_flight = get_value('devino_concurrency_in_flight')
+
+        with self.limiter.slot(api_resource=consts.GET_TASK) as slot:
+            self.assertEqual(get_value('devino_concurrency_in_flight'), in_flight + 1)
+            self.assertEqual(get_value('devino_concurrency_limit'), 2)
+            self.assertEqual(get_value('devino_concurrency_limit', consts.GET_STATE_DETAILING), 2)
+            slot.record = make_record(latency=2)
+
+        self.assertEqual(get_value('devino_concurrency_in_flight'), in_flight)
+        self.assertEqual(get_value('devino_concurrency_queued'), 0)
+        self.assertEqual(get_value('devino_concurrency_limit'), 1)
+
+    @mock.patch.object(metrics.concurrency_limit, 'labels')
+    def test_no_gauges_on_init(self, mock_obj):
+        concurrency.AdaptiveLimiter('read')
+
+        self.assertFalse(mock_obj.called)
@@ -0,0 +1,79 @@
+import hashlib
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from .. import contacts
+
+
+class ContactFile(TestCase):
+    def test_scan(self):
+        content = '\ufeffid;x\n1,true\n"2",False\n3\n'.encode()
+        contact_file = contacts.ContactFile(SimpleUploadedFile('contacts.csv', content))
+
+        with self.assertRaises(ValueError) as context:
+            contact_file.scan()
+        self.assertEqual(context.exception.args[0], ['Line 1: invalid contact group id "id;x"'])
+
+        contact_file = contacts.ContactFile(SimpleUploadedFile('contacts.csv', content.replace(b';x', b'')))
+        contact_file.scan()
+
+        self.assertEqual(contact_file.stats, {'received': 3, 'sent': 3, 'duplicates': 0})
+        self.assertEqual(contact_file.sha256, hashlib.sha256(content.replace(b';x', b'')).hexdigest())
+        self.assertEqual(list(contact_file), [(1, True), (2, False), (3, True)])
+        # the file is read again for every pass
+        self.assertEqual(list(contact_file), [(1, True), (2, False), (3, True)])
+
+    def test_duplicates(self):
+        contact_file = contacts.ContactFile(SimpleUploadedFile('contacts.csv', b'1,true\n 1 ,yes\n2\n1\n'))
+
+        contact_file.scan()
+
+        self.assertEqual(contact_file.stats, {'received': 4, 'sent': 2, 'duplicates': 2})
+        self.assertEqual(list(contact_file), [(1, True), (2, True)])
+
+    def test_conflict(self):
+        contact_file = contacts.ContactFile(SimpleUploadedFile('contacts.csv', b'5,true\n5,false\n'))
+
+        with self.assertRaises(ValueError) as context:
+            contact_file.scan()
+        self.assertEqual(context.exception.args[0], ['Line 2: contact group 5 is both included and excluded'])
+
+    def test_max_errors(self):
+        content = b'x\n' * (contacts.MAX_ERRORS + 5)
+        contact_file = contacts.ContactFile(SimpleUploadedFile('contacts.csv', content))
+
+        with self.assertRaises(ValueError) as context:
+            contact_file.scan()
+        self.assertEqual(len(context.exception.args[0]), contacts.MAX_ERRORS)
+
+    def test_empty(self):
+        contact_file = contacts.ContactFile(SimpleUploadedFile('contacts.csv', b'id,included\n\n'))
+
+        with self.assertRaises(ValueError):
+            contact_file.scan()
+
+    def test_parse_row(self):
+        self.assertEqual(contacts.parse_row([' 12 ', ' Yes ']), (12, True))
+        with self.assertRaises(ValueError):
+            contacts.parse_row(['1', 'true', 'extra'])
+        with self.assertRaises(ValueError):
+            contacts.parse_row(['1', 'maybe'])
+
+
+class ContactList(TestCase):
+    def test_normalize(self):
+        contact_list = contacts.ContactList([[' 559446 ', 'TRUE'], [559446, True], ['559447', False], [559447, 'no']])
+
+        self.assertEqual(list(contact_list), [(559446, True), (559447, False)])
+        self.assertEqual(contact_list.stats, {'received': 4, 'sent': 2, 'duplicates': 2})
+
+    def test_conflict(self):
+        with self.assertRaises(ValueError) as context:
+            contacts.ContactList([[5, True], [' 5 ', 'no']])
+        self.assertEqual(context.exception.args[0], ['Item 1: contact group 5 is both included and excluded'])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError) as context:
+            contacts.ContactList([[1, True], ['x', True]])
+        self.assertEqual(context.exception.args[0], ['Item 1: invalid contact group id "x"'])
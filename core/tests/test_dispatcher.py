@@ -0,0 +1,185 @@
+import datetime
+
+from django.conf import settings
+from django.test import TestCase, mock, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+
+from email_devino.client import DevinoError, DevinoException
+from email_devino.client import ApiAnswer
+
+from .. import models
+from .. import consts
+from .. import dispatcher
+
+ANSWER_SUCCESS = ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': ['message-id']})
+DATA = {'sender_email': 'test@test.test', 'sender_name': 'test name',
+        'recipient_email': 'othertest@test.test', 'recipient_name': 'test rec name',
+        'subject': 'test subj', 'text': 'test text', 'user_message_id': None, 'user_campaign_id': None,
+        'template_id': None}
+
+
+class Claim(TestCase):
+    def test_claim(self):
+        first = models.QueuedMessage.objects.create(data=DATA)
+        second = models.QueuedMessage.objects.create(data=DATA)
+        models.QueuedMessage.objects.create(data=DATA, status=consts.QUEUE_STATUS_SENT)
+
+        claimed = dispatcher.claim('node-1', 10)
+
+        self.assertEqual([message.id for message in claimed], [first.id, second.id])
+        self.assertEqual(
+            models.QueuedMessage.objects.filter(status=consts.QUEUE_STATUS_PROCESSING, locked_by='node-1').count(), 2)
+        self.assertEqual(dispatcher.claim('node-2', 10), [])
+
+    def test_claim_limit(self):
+        first = models.QueuedMessage.objects.create(data=DATA)
+        second = models.QueuedMessage.objects.create(data=DATA)
+
+        self.assertEqual([message.id for message in dispatcher.claim('node-1', 1)], [first.id])
+        self.assertEqual([message.id for message in dispatcher.claim('node-2', 1)], [second.id])
+
+    @override_settings(DEVINO_DISPATCHER_LOCK_TIMEOUT=60)
+    def test_release_stale(self):
+        stale = models.QueuedMessage.objects.create(
+            data=DATA, status=consts.QUEUE_STATUS_PROCESSING, locked_by='dead-node',
+            locked_at=timezone.now() - datetime.timedelta(seconds=120),
+        )
+        models.QueuedMessage.objects.create(
+            data=DATA, status=consts.QUEUE_STATUS_PROCESSING, locked_by='live-node', locked_at=timezone.now(),
+        )
+
+        self.assertEqual(dispatcher.release_stale(), 1)
+        self.assertEqual([message.id for message in dispatcher.claim('node-1', 10)], [stale.id])
+
+
+class Send(TestCase):
+    @mock.patch('core.clients.PooledDevinoClient.send_transactional_message')
+    def test_send_success(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        models.QueuedMessage.objects.create(data=DATA)
+        message = dispatcher.claim('node-1', 1)[0]
+
+        dispatcher.send(message)
+
+        message.refresh_from_db()
+        mock_obj.assert_called_once_with(**DATA)
+        self.assertEqual(message.status, consts.QUEUE_STATUS_SENT)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.locked_by, '')
+        self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.SEND_MESSAGE)
+        self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
+
+    @mock.patch('core.clients.PooledDevinoClient.send_transactional_message')
+    def test_send_error(self, mock_obj):
+        mock_obj.side_effect = DevinoException(
+            message='test',
+            http_status=400,
+            error=DevinoError(
+                code='validation_error',
+                description='error'
+            ),
+        )
+        message = models.QueuedMessage.objects.create(data=DATA)
+
+        dispatcher.send(message)
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_FAILED)
+        self.assertEqual(message.code, 'validation_error')
+        self.assertTrue(models.DevinoAnswer.objects.get().is_fail)
+
+    @override_settings(DEVINO_DISPATCHER_MAX_ATTEMPTS=2)
+    @mock.patch('core.clients.PooledDevinoClient.send_transactional_message')
+    def test_send_connection_error_retry(self, mock_obj):
+        mock_obj.side_effect = DevinoException(message='connection error')
+        message = models.QueuedMessage.objects.create(data=DATA)
+
+        dispatcher.send(message)
+        message.refresh_from_db()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_NEW)
+
+        dispatcher.send(message)
+        message.refresh_from_db()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_FAILED)
+        self.assertEqual(message.attempts, 2)
+
+    @override_settings(DEVINO_DISPATCHER_MAX_ATTEMPTS=2)
+    @mock.patch('core.clients.PooledDevinoClient.send_transactional_message')
+    def test_send_server_error_retry(self, mock_obj):
+        mock_obj.side_effect = DevinoException(
+            message='test',
+            http_status=500,
+            error=DevinoError(
+                code='internal_error',
+                description='error'
+            ),
+        )
+        message = models.QueuedMessage.objects.create(data=DATA)
+
+        dispatcher.send(message)
+        message.refresh_from_db()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_NEW)
+
+        dispatcher.send(message)
+        message.refresh_from_db()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_FAILED)
+        self.assertEqual(message.code, 'internal_error')
+
+    @override_settings(DEVINO_DISPATCHER_MAX_ATTEMPTS=2)
+    @mock.patch('core.clients.PooledDevinoClient.send_transactional_message')
+    def test_send_answer_error(self, mock_obj):
+        mock_obj.return_value = ApiAnswer.create({'Code': 'internal_error', 'Description': 'error', 'Result': []})
+        message = models.QueuedMessage.objects.create(data=DATA)
+
+        dispatcher.send(message)
+        message.refresh_from_db()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_NEW)
+
+        dispatcher.send(message)
+        message.refresh_from_db()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_FAILED)
+        self.assertEqual(message.code, 'internal_error')
+
+        mock_obj.return_value = ApiAnswer.create({'Code': 'validation_error', 'Description': 'error', 'Result': []})
+        message = models.QueuedMessage.objects.create(data=DATA)
+        dispatcher.send(message)
+        message.refresh_from_db()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_FAILED)
+
+    @mock.patch('core.dispatcher.time.sleep')
+    @mock.patch('core.ratelimit.acquire', side_effect=Throttled(wait=2))
+    def test_send_throttled(self, mock_acquire, mock_sleep):
+        models.QueuedMessage.objects.create(data=DATA)
+        message = dispatcher.claim('node-1', 1)[0]
+
+        dispatcher.send(message)
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_NEW)
+        self.assertEqual(message.attempts, 0)
+        mock_sleep.assert_called_once_with(2)
+        mock_acquire.assert_called_once_with(consts.RATE_LIMIT_SEND, settings.DEVINO_RATE_LIMIT_MAX_WAIT)
+
+
+class SendInThread(TestCase):
+    @override_settings(DEVINO_DISPATCHER_MAX_ATTEMPTS=2)
+    @mock.patch('core.dispatcher.close_old_connections')
+    @mock.patch('core.clients.PooledDevinoClient.send_transactional_message')
+    def test_unexpected_error(self, mock_obj, mock_close):
+        mock_obj.side_effect = RuntimeError('broken')
+        models.QueuedMessage.objects.create(data=DATA)
+
+        # not raised to the dispatch loop, the message goes back to the queue
+        with self.assertLogs('core.dispatcher', 'ERROR'):
+            dispatcher._send_in_thread(dispatcher.claim('node-1', 1)[0])
+        message = models.QueuedMessage.objects.get()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_NEW)
+        self.assertEqual(message.locked_by, '')
+        self.assertEqual(message.attempts, 1)
+
+        with self.assertLogs('core.dispatcher', 'ERROR'):
+            dispatcher._send_in_thread(dispatcher.claim('node-1', 1)[0])
+        message.refresh_from_db()
+        self.assertEqual(message.status, consts.QUEUE_STATUS_FAILED)
+        self.assertEqual(mock_close.call_count, 2)
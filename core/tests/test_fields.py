@@ -0,0 +1,29 @@
+from django.test import TestCase, mock
+
+from .. import consts
+from .. import models
+
+
+class JSONField(TestCase):
+    def load(self, result, vendor):
+        # the record as Model.from_db builds it from a row with the result
+        field = models.DevinoCall._meta.get_field('result')
+        value = field.from_db_value(result, None, mock.Mock(vendor=vendor), {})
+        return models.DevinoCall.from_db('default', ['id', 'result'], [1, value])
+
+    def test_postgresql_string(self):
+        # jsonb is decoded by psycopg2, a scalar string is the value itself
+        self.assertEqual(self.load('sender@example.com', 'postgresql').result, 'sender@example.com')
+        self.assertEqual(self.load('12345', 'postgresql').result, '12345')
+        self.assertEqual(self.load({'id_task': 1}, 'postgresql').result, {'id_task': 1})
+
+    def test_text(self):
+        self.assertEqual(self.load('"sender@example.com"', 'sqlite').result, 'sender@example.com')
+        self.assertEqual(self.load('"12345"', 'sqlite').result, '12345')
+        self.assertEqual(self.load('{"id_task":1}', 'sqlite').result, {'id_task': 1})
+
+    def test_save(self):
+        call = models.DevinoCall.objects.create(api_resource=consts.ADD_SENDER_ADDRESS, code=consts.STATUS_OK,
+                                                result='sender@example.com')
+
+        self.assertEqual(models.DevinoCall.objects.get(id=call.id).result, 'sender@example.com')
@@ -6,6 +6,7 @@ from rest_framework.reverse import reverse
 from email_devino.client import DevinoError, DevinoException
 
 from .. import forms
+from ..exceptions import UpstreamUnavailable
 
 
 class SendMessage(TestCase):
@@ -16,7 +17,7 @@ class SendMessage(TestCase):
             password='Test passwd'
         )
 
-    @mock.patch('core.forms.DevinoClient.get_sender_addresses')
+    @mock.patch('core.clients.PooledDevinoClient.get_sender_addresses')
     def test_bad_answer_devino(self, mock_obj):
         mock_obj.side_effect = DevinoException(
             message='test',
@@ -29,3 +30,11 @@ class SendMessage(TestCase):
         form = forms.SendMessage()
 
         self.assertIn(('load_error', 'server is not available, reload the page'), form.fields['sender_email'].choices)
+
+    @mock.patch('core.cache.get_sender_addresses')
+    def test_upstream_unavailable(self, mock_obj):
+        mock_obj.side_effect = UpstreamUnavailable(wait=10)
+
+        form = forms.SendMessage()
+
+        self.assertIn(('load_error', 'server is not available, reload the page'), form.fields['sender_email'].choices)
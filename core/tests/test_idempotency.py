@@ -0,0 +1,103 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase, mock, override_settings
+from django.utils import timezone
+
+from .. import consts
+from .. import models
+from .. import exceptions
+from .. import idempotency
+
+DATA = {'recipient_email': 'test@test.test'}
+ANSWER = {'code': 'ok', 'description': 'ok', 'result': ['message-id']}
+
+
+class Run(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='Test user', password='Test passwd')
+        self.fn = mock.Mock(return_value=(ANSWER, 200))
+
+    def test_replay(self):
+        first = idempotency.run(self.user, 'key', DATA, self.fn)
+        second = idempotency.run(self.user, 'key', DATA, self.fn)
+
+        self.assertEqual(first, (ANSWER, 200, False))
+        self.assertEqual(second, (ANSWER, 200, True))
+        self.assertEqual(self.fn.call_count, 1)
+
+    def test_user_scope(self):
+        other_user = User.objects.create(username='Other user', password='Test passwd')
+
+        idempotency.run(self.user, 'key', DATA, self.fn)
+        idempotency.run(other_user, 'key', DATA, self.fn)
+
+        self.assertEqual(self.fn.call_count, 2)
+
+    def test_reused(self):
+        idempotency.run(self.user, 'key', DATA, self.fn)
+
+        with self.assertRaises(exceptions.IdempotencyKeyReused):
+            idempotency.run(self.user, 'key', {'recipient_email': 'other@test.test'}, self.fn)
+
+    def test_retryable_error(self):
+        self.fn.return_value = ({'code': consts.STATUS_ERROR_API, 'description': 'connection error'}, 400)
+
+        idempotency.run(self.user, 'key', DATA, self.fn)
+        idempotency.run(self.user, 'key', DATA, self.fn)
+
+        self.assertEqual(self.fn.call_count, 2)
+        self.assertFalse(models.IdempotencyKey.objects.exists())
+
+    def test_exception(self):
+        self.fn.side_effect = Exception('error')
+
+        with self.assertRaises(Exception):
+            idempotency.run(self.user, 'key', DATA, self.fn)
+        self.assertFalse(models.IdempotencyKey.objects.exists())
+
+    def test_expired(self):
+        idempotency.run(self.user, 'key', DATA, self.fn)
+        models.IdempotencyKey.objects.update(expires=timezone.now() - datetime.timedelta(seconds=1))
+
+        idempotency.run(self.user, 'key', DATA, self.fn)
+
+        self.assertEqual(self.fn.call_count, 2)
+
+    @mock.patch('core.idempotency.time.sleep')
+    def test_wait(self, mock_sleep):
+        pending = models.IdempotencyKey.objects.create(user=self.user, key='key',
+                                                       request_hash=idempotency.get_request_hash(DATA),
+                                                       expires=timezone.now() + datetime.timedelta(days=1))
+
+        def finish(seconds):
+            # the first request finishes while the repeat waits for it
+            pending.status = consts.IDEMPOTENCY_STATUS_DONE
+            pending.response = ANSWER
+            pending.response_status = 200
+            pending.save()
+        mock_sleep.side_effect = finish
+
+        result = idempotency.run(self.user, 'key', DATA, self.fn)
+
+        self.assertEqual(result, (ANSWER, 200, True))
+        self.assertFalse(self.fn.called)
+
+    @override_settings(DEVINO_IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_in_progress(self):
+        models.IdempotencyKey.objects.create(user=self.user, key='key',
+                                             request_hash=idempotency.get_request_hash(DATA),
+                                             expires=timezone.now() + datetime.timedelta(days=1))
+
+        with self.assertRaises(exceptions.IdempotencyKeyInProgress):
+            idempotency.run(self.user, 'key', DATA, self.fn)
+
+    def test_abandoned(self):
+        models.IdempotencyKey.objects.create(user=self.user, key='key',
+                                             request_hash=idempotency.get_request_hash(DATA),
+                                             expires=timezone.now() + datetime.timedelta(days=1))
+        models.IdempotencyKey.objects.update(dc=timezone.now() - datetime.timedelta(hours=1))
+
+        idempotency.run(self.user, 'key', DATA, self.fn)
+
+        self.assertEqual(self.fn.call_count, 1)
@@ -0,0 +1,87 @@
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, mock
+from prometheus_client import REGISTRY
+
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from email_devino.client import ApiAnswer
+
+from .. import consts
+from .. import metrics
+
+ANSWER_SUCCESS = ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': []})
+
+
+def get_count(api_resource, code, phase):
+    labels = {'api_resource': api_resource, 'code': code, 'phase': phase}
+    return REGISTRY.get_sample_value('devino_request_phase_seconds_count', labels) or 0
+
+
+class Phases(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            username='Test user',
+            password='Test passwd'
+        )
+
+    def count_phases(self, api_resource, code):
+        return {phase: get_count(api_resource, code, phase) for phase in metrics.PHASES}
+
+    @mock.patch('core.views.rest.GetTask.api_resource_lib')
+    def test_rest(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_login(user=self.user)
+        before = self.count_phases(consts.GET_TASK, 'ok')
+        before_invalid = self.count_phases(consts.GET_TASK, '400')
+
+        self.client.get(reverse('get_task'), data={'id_task': 1})
+        self.client.get(reverse('get_task'), data={'id_task': 'x'})
+
+        after = self.count_phases(consts.GET_TASK, 'ok')
+        after_invalid = self.count_phases(consts.GET_TASK, '400')
+        self.assertEqual({phase: after[phase] - before[phase] for phase in metrics.PHASES},
+                         {'validate': 1, 'wait': 1, 'upstream': 1, 'audit': 1, 'render': 1})
+        self.assertEqual({phase: after_invalid[phase] - before_invalid[phase] for phase in metrics.PHASES},
+                         {'validate': 1, 'wait': 0, 'upstream': 0, 'audit': 0, 'render': 1})
+
+    @mock.patch('core.clients.PooledDevinoClient.get_sender_addresses')
+    @mock.patch('core.clients.PooledDevinoClient.send_transactional_message')
+    def test_ui(self, mock_obj_send, mock_obj_get):
+        mock_obj_get.return_value = ApiAnswer.create({'Result': [{'SenderAddress': 'test@test.test',
+                                                                  'Confirmed': True}]})
+        mock_obj_send.return_value = ANSWER_SUCCESS
+        self.client.force_login(user=self.user)
+        data = {'sender_email': 'test@test.test', 'sender_name': 'test name',
+                'recipient_email': 'othertest@test.test', 'recipient_name': 'test rec name',
+                'subject': 'test subj', 'text': 'test text'}
+        before = self.count_phases(consts.SEND_MESSAGE, 'ok')
+
+        self.client.post(reverse('send_message_interface'), data)
+
+        after = self.count_phases(consts.SEND_MESSAGE, 'ok')
+        self.assertEqual({phase: after[phase] - before[phase] for phase in metrics.PHASES},
+                         {'validate': 1, 'wait': 1, 'upstream': 1, 'audit': 1, 'render': 0})
+
+
+class Endpoint(TestCase):
+    def test_get(self):
+        metrics.Timing(consts.GET_STATE).observe(status.HTTP_200_OK)
+        timing = metrics.Timing(consts.GET_STATE)
+        with timing.phase(metrics.PHASE_VALIDATE):
+            pass
+        timing.observe(status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('devino_request_phase_seconds_count{api_resource="get_state",code="400",phase="validate"}',
+                      response.content.decode())
+
+    def test_multiprocess(self):
+        with tempfile.TemporaryDirectory() as path:
+            with mock.patch.dict(os.environ, {'prometheus_multiproc_dir': path}):
+                self.assertEqual(metrics.generate(), b'')
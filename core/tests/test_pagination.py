@@ -0,0 +1,113 @@
+import threading
+
+from django.test import SimpleTestCase, mock, override_settings
+from rest_framework.exceptions import Throttled
+
+from email_devino.client import ApiAnswer, DevinoError, DevinoException
+
+from .. import consts
+from .. import pagination
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_rows(total):
+    def fn(range_start, range_end, **kwargs):
+        rows = [{'Id': number} for number in range(range_start, min(range_end, total) + 1)]
+        return ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': rows})
+    return mock.Mock(side_effect=fn)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DEVINO_STREAM_PREFETCH={consts.GET_STATE_DETAILING: 2})
+@mock.patch('core.ratelimit.acquire')
+class Pages(SimpleTestCase):
+    def test_pages(self, mock_acquire):
+        fn = make_rows(250)
+        pages = pagination.Pages(consts.GET_STATE_DETAILING, fn, {'id_task': 1}, 100)
+
+        result = list(pages)
+
+        self.assertEqual([len(page) for page in result], [100, 100, 50])
+        self.assertEqual([row['Id'] for page in result for row in page], list(range(1, 251)))
+        self.assertEqual(pages.record.data, {'id_task': 1, 'page_size': 100})
+        self.assertEqual(pages.record.code, consts.STATUS_OK)
+        self.assertEqual(pages.record.result, {'pages': 3, 'rows': 250})
+        self.assertFalse(pages.record.is_fail)
+        fn.assert_any_call(id_task=1, range_start=201, range_end=300)
+
+    def test_full_last_page(self, mock_acquire):
+        pages = pagination.Pages(consts.GET_STATE_DETAILING, make_rows(200), {}, 100)
+
+        self.assertEqual([len(page) for page in pages], [100, 100, 0])
+        self.assertEqual(pages.record.result, {'pages': 3, 'rows': 200})
+
+    def test_prefetch(self, mock_acquire):
+        fetched = []
+        release = threading.Event()
+        rows = make_rows(1000)
+
+        def fn(range_start, range_end):
+            fetched.append(range_start)
+            if range_start > 1:
+                release.wait(5)
+            return rows(range_start=range_start, range_end=range_end)
+
+        pages = pagination.Pages(consts.GET_STATE_DETAILING, fn, {}, 100)
+        self.addCleanup(pages.close)
+        next(pages)
+
+        # the next two pages are requested while the first one is handled, not more
+        for _ in range(100):
+            if len(fetched) == 3:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(sorted(fetched), [1, 101, 201])
+        release.set()
+        self.assertEqual(next(pages)[0]['Id'], 101)
+
+    @mock.patch('core.pagination.close_old_connections')
+    def test_prefetch_connections(self, mock_close, mock_acquire):
+        pages = pagination.Pages(consts.GET_STATE_DETAILING, make_rows(250), {}, 100)
+
+        list(pages)
+
+        # the first page is fetched by the request thread, the next two by prefetch threads
+        self.assertGreaterEqual(mock_close.call_count, 2)
+
+    def test_error(self, mock_acquire):
+        rows = make_rows(1000)
+
+        def fn(range_start, range_end):
+            if range_start > 100:
+                raise DevinoException(message='test', http_status=400,
+                                      error=DevinoError(code='validation_error', description='error'))
+            return rows(range_start=range_start, range_end=range_end)
+
+        pages = pagination.Pages(consts.GET_STATE_DETAILING, fn, {}, 100)
+
+        self.assertEqual([len(page) for page in pages], [100])
+        self.assertEqual(pages.record.code, 'validation_error')
+        self.assertEqual(pages.record.result, {'pages': 1, 'rows': 100})
+        self.assertTrue(pages.record.is_fail)
+
+    def test_throttled(self, mock_acquire):
+        pages = pagination.Pages(consts.GET_STATE_DETAILING, make_rows(1000), {}, 100)
+        mock_acquire.side_effect = Throttled(wait=1)
+
+        # before the first call the request fails as a whole
+        with self.assertRaises(Throttled):
+            next(pages)
+        self.assertIsNone(pages.record)
+
+        calls = []
+
+        def acquire(bucket, max_wait):
+            calls.append(bucket)
+            if len(calls) > 1:
+                raise Throttled(wait=1)
+        mock_acquire.side_effect = acquire
+        pages = pagination.Pages(consts.GET_STATE_DETAILING, make_rows(1000), {}, 100)
+
+        self.assertEqual([len(page) for page in pages], [100])
+        self.assertEqual(pages.record.code, consts.STATUS_THROTTLED)
+        self.assertTrue(pages.record.is_fail)
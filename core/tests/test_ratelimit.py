@@ -0,0 +1,95 @@
+from django.test import TestCase, mock, override_settings
+from rest_framework.exceptions import Throttled
+
+from .. import consts
+from .. import models
+from .. import ratelimit
+
+LIMITS = {consts.RATE_LIMIT_SEND: {'rate': 2, 'burst': 2}}
+
+
+class Backend(object):
+    def test_burst(self):
+        self.assertEqual(self.backend.take('send', 2, 2, 100), 0)
+        self.assertEqual(self.backend.take('send', 2, 2, 100), 0)
+        self.assertEqual(self.backend.take('send', 2, 2, 100), 0.5)
+
+    def test_refill(self):
+        for _ in range(2):
+            self.backend.take('send', 2, 2, 100)
+
+        self.assertEqual(self.backend.take('send', 2, 2, 100.25), 0.25)
+        self.assertEqual(self.backend.take('send', 2, 2, 100.5), 0)
+        # no more than burst tokens pile up
+        self.assertEqual(self.backend.take('send', 2, 2, 200), 0)
+        self.assertEqual(self.backend.take('send', 2, 2, 200), 0)
+        self.assertGreater(self.backend.take('send', 2, 2, 200), 0)
+
+    def test_buckets(self):
+        for _ in range(2):
+            self.backend.take('send', 2, 2, 100)
+
+        self.assertEqual(self.backend.take('read', 2, 2, 100), 0)
+
+
+class LocalBackend(Backend, TestCase):
+    def setUp(self):
+        self.backend = ratelimit.LocalBackend()
+
+
+class DatabaseBackend(Backend, TestCase):
+    def setUp(self):
+        self.backend = ratelimit.DatabaseBackend()
+
+    def test_conflict(self):
+        self.backend.take('send', 2, 2, 100)
+        bucket = models.RateLimitBucket.objects.get()
+        stale = models.RateLimitBucket(name='send', tokens=bucket.tokens, updated=bucket.updated,
+                                       version=bucket.version)
+        # another worker takes a token between the read and the update
+        real_get = self.backend._get
+
+        def get(name, burst, now):
+            if not hasattr(get, 'called'):
+                get.called = True
+                models.RateLimitBucket.objects.filter(name=name).update(tokens=0, version=bucket.version + 1)
+                return stale
+            return real_get(name, burst, now)
+
+        with mock.patch.object(self.backend, '_get', side_effect=get):
+            self.assertEqual(self.backend.take('send', 2, 2, 100), 0.5)
+
+
+@override_settings(DEVINO_RATE_LIMITS=LIMITS, DEVINO_RATE_LIMIT_BACKEND='core.ratelimit.DatabaseBackend')
+class Acquire(TestCase):
+    @mock.patch('core.ratelimit.time')
+    def test_wait(self, mock_time):
+        clock = [100]
+        mock_time.time.side_effect = lambda: clock[0]
+        mock_time.sleep.side_effect = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+
+        for _ in range(3):
+            ratelimit.acquire(consts.RATE_LIMIT_SEND, max_wait=1)
+
+        mock_time.sleep.assert_called_once_with(0.5)
+
+    @mock.patch('core.ratelimit.time')
+    def test_fail_fast(self, mock_time):
+        mock_time.time.return_value = 100
+        for _ in range(2):
+            ratelimit.acquire(consts.RATE_LIMIT_SEND, max_wait=0)
+
+        with self.assertRaises(Throttled) as context:
+            ratelimit.acquire(consts.RATE_LIMIT_SEND, max_wait=0)
+        self.assertEqual(context.exception.wait, 1)     # rounded up to seconds for Retry-After
+        self.assertFalse(mock_time.sleep.called)
+
+    def test_unlimited(self):
+        for _ in range(10):
+            ratelimit.acquire(consts.RATE_LIMIT_READ, max_wait=0)
+        self.assertFalse(models.RateLimitBucket.objects.exists())
+
+    def test_get_bucket(self):
+        self.assertEqual(ratelimit.get_bucket(consts.SEND_MESSAGE), consts.RATE_LIMIT_SEND)
+        self.assertEqual(ratelimit.get_bucket(consts.GET_TASK), consts.RATE_LIMIT_READ)
+        self.assertEqual(ratelimit.get_bucket(consts.ADD_TASK), consts.RATE_LIMIT_BULK)
@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, mock, override_settings
+
+from email_devino.client import DevinoError
+from email_devino.client import DevinoException
+
+from .. import consts
+from .. import resilience
+from ..exceptions import UpstreamUnavailable
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+CONNECTION_ERROR = DevinoException(message='connection error')
+VALIDATION_ERROR = DevinoException(message='test', http_status=400,
+                                   error=DevinoError(code='validation_error', description='error'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DEVINO_RETRY_ATTEMPTS=3, DEVINO_BREAKER_MIN_CALLS=4,
+                   DEVINO_BREAKER_ERROR_RATE=0.5, DEVINO_BREAKER_WINDOW=30, DEVINO_BREAKER_COOL_DOWN=10)
+class Call(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        for breaker in resilience.breakers.values():
+            breaker._reset_window(0)
+        patcher = mock.patch('core.resilience.time.sleep')
+        self.mock_sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retry_read(self):
+        fn = mock.Mock(side_effect=[CONNECTION_ERROR, CONNECTION_ERROR, 'answer'])
+
+        self.assertEqual(resilience.call(consts.GET_TASK, fn, 1), 'answer')
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(self.mock_sleep.call_count, 2)
+
+    def test_retry_gives_up(self):
+        fn = mock.Mock(side_effect=CONNECTION_ERROR)
+
+        with self.assertRaises(DevinoException):
+            resilience.call(consts.GET_TASK, fn, 1)
+        self.assertEqual(fn.call_count, 3)
+
+    def test_no_retry(self):
+        fn = mock.Mock(side_effect=VALIDATION_ERROR)
+        with self.assertRaises(DevinoException):
+            resilience.call(consts.GET_TASK, fn, 1)
+        self.assertEqual(fn.call_count, 1)
+
+        # sending twice may deliver the message twice
+        fn = mock.Mock(side_effect=CONNECTION_ERROR)
+        with self.assertRaises(DevinoException):
+            resilience.call(consts.SEND_MESSAGE, fn)
+        self.assertEqual(fn.call_count, 1)
+
+    @override_settings(DEVINO_RETRY_BACKOFF=1, DEVINO_RETRY_BACKOFF_MAX=3)
+    def test_backoff(self):
+        with mock.patch('core.resilience.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([resilience.get_backoff(attempt) for attempt in range(4)], [1, 2, 3, 3])
+
+    @override_settings(DEVINO_TIMEOUTS={consts.GET_STATE_DETAILING: (1, 60)})
+    def test_timeout(self):
+        timeouts = []
+        fn = mock.Mock(side_effect=lambda: timeouts.append(resilience.clients._local.timeout))
+
+        resilience.call(consts.GET_STATE_DETAILING, fn)
+        resilience.call(consts.GET_TASK, fn)
+
+        self.assertEqual(timeouts, [(1, 60), (5, 30)])
+        self.assertIsNone(resilience.clients._local.timeout)
+
+    def test_open(self):
+        fn = mock.Mock(side_effect=CONNECTION_ERROR)
+        for _ in range(4):
+            with self.assertRaises(DevinoException):
+                resilience.call(consts.SEND_MESSAGE, fn)
+
+        with self.assertRaises(UpstreamUnavailable) as context:
+            resilience.call(consts.SEND_MESSAGE, fn)
+        self.assertEqual(context.exception.wait, 10)
+        self.assertEqual(fn.call_count, 4)
+        # other buckets keep working
+        self.assertEqual(resilience.call(consts.GET_TASK, mock.Mock(return_value='answer')), 'answer')
+
+    @override_settings(DEVINO_BREAKER_STATE_TTL=60)
+    def test_state_ttl(self):
+        with mock.patch('core.resilience.cache.set') as mock_set:
+            resilience.breakers[consts.RATE_LIMIT_SEND]._set_state(resilience.STATE_OPEN, 100)
+
+        # never kept without expiry, a full cache table drops such entries in key order
+        self.assertEqual(mock_set.call_args[0][2], 60)
+
+    def test_error_rate(self):
+        fn = mock.Mock(side_effect=[CONNECTION_ERROR, 'answer', VALIDATION_ERROR, 'answer', 'answer'])
+        for _ in range(5):
+            try:
+                resilience.call(consts.SEND_MESSAGE, fn)
+            except DevinoException:
+                pass
+
+        self.assertEqual(resilience.breakers[consts.RATE_LIMIT_SEND].get_state()['state'], resilience.STATE_CLOSED)
+
+    @mock.patch('core.resilience.time.time')
+    def test_probe(self, mock_time):
+        mock_time.return_value = 100
+        breaker = resilience.breakers[consts.RATE_LIMIT_SEND]
+        fn = mock.Mock(side_effect=CONNECTION_ERROR)
+        for _ in range(4):
+            with self.assertRaises(DevinoException):
+                resilience.call(consts.SEND_MESSAGE, fn)
+
+        # the probe fails and the breaker opens again
+        mock_time.return_value = 110
+        with self.assertRaises(DevinoException):
+            resilience.call(consts.SEND_MESSAGE, fn)
+        self.assertEqual(breaker.get_state()['until'], 120)
+
+        mock_time.return_value = 120
+        fn.side_effect = None
+        fn.return_value = 'answer'
+        self.assertEqual(resilience.call(consts.SEND_MESSAGE, fn), 'answer')
+
+        state = breaker.get_state()
+        self.assertEqual(state['state'], resilience.STATE_CLOSED)
+        self.assertEqual([(transition['from'], transition['to']) for transition in state['transitions']], [
+            ('closed', 'open'),
+            ('open', 'half_open'),
+            ('half_open', 'open'),
+            ('open', 'half_open'),
+            ('half_open', 'closed'),
+        ])
+
+    @mock.patch('core.resilience.time.time', return_value=100)
+    def test_probe_in_progress(self, mock_time):
+        breaker = resilience.breakers[consts.RATE_LIMIT_SEND]
+        breaker._set_state(resilience.STATE_OPEN, 90)
+
+        self.assertTrue(breaker.before_call())
+        with self.assertRaises(UpstreamUnavailable):
+            breaker.before_call()
@@ -1,8 +1,10 @@
 import json
+import time
 import datetime
 import pytz
 
-from django.test import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import mock, override_settings
 from django.contrib.auth.models import User
 
 from rest_framework.test import APITestCase
@@ -10,11 +12,14 @@ from rest_framework import status
 from rest_framework.reverse import reverse
 
 from email_devino.client import DevinoError
+from email_devino.client import DevinoException
 from email_devino.client import ApiAnswer
 
+from core import audit
 from core import models
 from core import consts
-from core.views import rest
+from core import concurrency
+from core import resilience
 from core.utils import date_handler
 
 ANSWER_SUCCESS = ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': []})
@@ -22,6 +27,9 @@ ANSWER_VALIDATION_ERROR = ApiAnswer.create({'Code': 'validation_error', 'Descrip
                                             'Result': []})
 ANSWER_INTERNAL_ERROR = ApiAnswer.create({'Code': 'internal_error', 'Description': 'internal_error',
                                           'Result': []})
+ANSWER_TASK_STARTED = {'code': 'ok', 'description': 'ok', 'result': {'Id': 1, 'State': 2}}
+ANSWER_TASK_FINISHED = {'code': 'ok', 'description': 'ok', 'result': {'Id': 1, 'State': 5}}
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
 
 
 class AuthMixin(object):
@@ -59,13 +67,13 @@ class GetSenderAddresses(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.GET_SENDER_ADDRESSES)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), None)
+        self.assertEqual(models.DevinoRequest.objects.get().data, None)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
     @mock.patch('core.views.rest.GetSenderAddresses.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -80,10 +88,44 @@ class GetSenderAddresses(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.GET_SENDER_ADDRESSES)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), None)
+        self.assertEqual(models.DevinoRequest.objects.get().data, None)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertTrue(models.DevinoAnswer.objects.get().is_fail)
 
+    @mock.patch('core.views.rest.GetSenderAddresses.api_resource_lib')
+    def test_get_connection_error(self, mock_obj):
+        mock_obj.side_effect = DevinoException(message='connection error')
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'code': consts.STATUS_ERROR_API, 'description': 'connection error'})
+        self.assertTrue(models.DevinoAnswer.objects.get().is_fail)
+
+    @mock.patch('core.views.rest.GetSenderAddresses.api_resource_lib')
+    def test_get_unavailable(self, mock_obj):
+        resilience.breakers[consts.RATE_LIMIT_READ]._set_state(resilience.STATE_OPEN, time.time())
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertFalse(mock_obj.called)
+        self.assertFalse(models.DevinoCall.objects.exists())
+
+    @mock.patch('core.views.rest.GetSenderAddresses.api_resource_lib')
+    def test_get_too_many_in_flight(self, mock_obj):
+        self.client.force_authenticate(user=self.user)
+
+        with mock.patch.object(concurrency.limiters[consts.RATE_LIMIT_READ], 'limit', 0), \
+                self.settings(DEVINO_CONCURRENCY_MAX_WAIT=0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(mock_obj.called)
+
     @mock.patch('core.views.rest.GetSenderAddresses.api_resource_lib')
     def test_get_validation_error(self, mock_obj):
         mock_obj.return_value = ANSWER_VALIDATION_ERROR
@@ -133,13 +175,23 @@ class AddSenderAddress(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.ADD_SENDER_ADDRESS)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
+    @mock.patch('core.views.rest.cache.invalidate_sender_addresses')
+    @mock.patch('core.views.rest.AddSenderAddress.api_resource_lib')
+    def test_add_invalidate_cache(self, mock_obj, mock_invalidate):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        self.client.post(self.url, data={'address': 'test@test.text'})
+
+        self.assertTrue(mock_invalidate.called)
+
     @mock.patch('core.views.rest.AddSenderAddress.api_resource_lib')
     def test_add_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -185,13 +237,27 @@ class DelSenderAddress(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.DEL_SENDER_ADDRESS)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
+    @mock.patch('core.views.rest.cache.invalidate_sender_addresses')
+    @mock.patch('core.views.rest.DelSenderAddress.api_resource_lib')
+    def test_del_invalidate_cache(self, mock_obj, mock_invalidate):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        self.client.delete(self.url, data={'address': 'test@test.text'})
+        self.assertTrue(mock_invalidate.called)
+
+        mock_invalidate.reset_mock()
+        mock_obj.return_value = ANSWER_VALIDATION_ERROR
+        self.client.delete(self.url, data={'address': 'test@test.text'})
+        self.assertFalse(mock_invalidate.called)
+
     @mock.patch('core.views.rest.DelSenderAddress.api_resource_lib')
     def test_del_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -226,6 +292,16 @@ class GetTasks(AuthMixin, APITestCase):
         self.assertEqual(response_put.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
         self.assertEqual(response_delete.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @mock.patch('core.views.rest.GetTasks.api_resource_lib')
+    def test_get_queries(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.url)
+
+        # rate limit bucket select and update, breaker state and the audit record; coalescing adds none
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
     @mock.patch('core.views.rest.GetTasks.api_resource_lib')
     def test_get_success(self, mock_obj):
         mock_obj.return_value = ANSWER_SUCCESS
@@ -237,13 +313,13 @@ class GetTasks(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.GET_TASKS_LIST)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
     @mock.patch('core.views.rest.GetTasks.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -258,6 +334,54 @@ class GetTasks(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+def get_tasks_rows(total):
+    def get_tasks(range_start, range_end):
+        rows = [{'Id': number, 'Name': 'Task {}'.format(number), 'State': 5 if number % 2 else 2}
+                for number in range(range_start, min(range_end, total) + 1)]
+        return ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': rows})
+    return get_tasks
+
+
+# pages are fetched ahead in threads, the test database can't be written from them
+@override_settings(CACHES=LOCMEM_CACHES, DEVINO_RATE_LIMIT_BACKEND='core.ratelimit.LocalBackend',
+                   DEVINO_STREAM_PREFETCH={consts.GET_TASKS_LIST: 3})
+class StreamTasks(AuthMixin, APITestCase):
+    def setUp(self):
+        self.url = reverse('stream_tasks')
+        self.user = User.objects.create(
+            username='Test user',
+            password='Test passwd'
+        )
+
+    def read_lines(self, response):
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    @mock.patch('core.views.rest.StreamTasks.api_resource_lib')
+    def test_get_success(self, mock_obj):
+        mock_obj.side_effect = get_tasks_rows(450)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['Id'] for row in self.read_lines(response)], list(range(1, 451)))
+        # pages after the short one may have been fetched ahead, not more than the prefetch
+        self.assertLessEqual(mock_obj.call_count, 8)
+        self.assertEqual(models.DevinoCall.objects.get().result, {'pages': 5, 'rows': 450})
+
+    @mock.patch('core.views.rest.StreamTasks.api_resource_lib')
+    def test_get_filter(self, mock_obj):
+        mock_obj.side_effect = get_tasks_rows(250)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'state': 2, 'name': 'TASK 12', 'page_size': 50})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['Id'] for row in self.read_lines(response)], [12, 120, 122, 124, 126, 128])
+        # the filter isn't sent to Devino
+        mock_obj.assert_any_call(range_start=1, range_end=50)
+
+
 class GetTask(AuthMixin, APITestCase):
     def setUp(self):
         self.url = reverse('get_task')
@@ -288,13 +412,25 @@ class GetTask(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.GET_TASK)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
+    @mock.patch('core.views.rest.GetTask.api_resource_lib')
+    def test_get_cache(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        response_miss = self.client.get(self.url, data={'id_task': 1})
+        response_hit = self.client.get(self.url, data={'id_task': 1})
+
+        self.assertEqual(response_miss['X-Cache'], 'MISS')
+        self.assertEqual(response_hit['X-Cache'], 'HIT')
+        self.assertEqual(mock_obj.call_count, 1)
+
     @mock.patch('core.views.rest.GetTask.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -348,13 +484,13 @@ class AddTask(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.ADD_TASK)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
     @mock.patch('core.views.rest.AddTask.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -373,6 +509,54 @@ class AddTask(AuthMixin, APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @mock.patch('core.views.rest.AddTask.api_resource_lib')
+    def test_post_contact_file(self, mock_obj):
+        contact_lists = []
+        mock_obj.side_effect = lambda contact_list, **kwargs: contact_lists.append(list(contact_list)) or ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        contact_file = SimpleUploadedFile('contacts.csv', b'id,included\n559446,true\n559447, no\n\n559448\n')
+        data = {'name': 'test', 'sender_email': 'test@test.test', 'sender_name': 'test name',
+                'subject': 'test subj', 'text': 'test text', 'contact_file': contact_file}
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(contact_lists, [[(559446, True), (559447, False), (559448, True)]])
+        audit_data = models.DevinoRequest.objects.get().data
+        self.assertIsNone(audit_data['contact_list'])
+        self.assertEqual(audit_data['contact_file']['name'], 'contacts.csv')
+        self.assertEqual(audit_data['contact_file']['received'], 3)
+        self.assertEqual(response.data['contact_list'], {'received': 3, 'sent': 3, 'duplicates': 0})
+
+    @mock.patch('core.views.rest.AddTask.api_resource_lib')
+    def test_post_contact_list_duplicates(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        data = {'name': 'test', 'sender_email': 'test@test.test', 'sender_name': 'test name',
+                'subject': 'test subj', 'text': 'test text',
+                'contact_list': [[559446, True], [' 559446', 'true'], [559447, False]]}
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['contact_list'], {'received': 3, 'sent': 2, 'duplicates': 1})
+        self.assertEqual(list(mock_obj.call_args[1]['contact_list']), [(559446, True), (559447, False)])
+        self.assertEqual(models.DevinoRequest.objects.get().data['contact_list'], [[559446, True], [559447, False]])
+
+    @mock.patch('core.views.rest.AddTask.api_resource_lib')
+    def test_post_contact_file_invalid(self, mock_obj):
+        self.client.force_authenticate(user=self.user)
+
+        contact_file = SimpleUploadedFile('contacts.csv', b'559446,true\nabc,true\n559447,maybe\n')
+        data = {'name': 'test', 'sender_email': 'test@test.test', 'sender_name': 'test name',
+                'subject': 'test subj', 'text': 'test text', 'contact_file': contact_file}
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data['contact_file']), 2)
+        self.assertFalse(mock_obj.called)
+        self.assertFalse(models.DevinoRequest.objects.exists())
+
 
 class EditTask(AuthMixin, APITestCase):
     def setUp(self):
@@ -412,13 +596,13 @@ class EditTask(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.EDIT_TASK)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
     @mock.patch('core.views.rest.EditTask.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -437,6 +621,21 @@ class EditTask(AuthMixin, APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @mock.patch('core.views.rest.EditTask.api_resource_lib')
+    def test_put_contact_file(self, mock_obj):
+        contact_lists = []
+        mock_obj.side_effect = lambda contact_list, **kwargs: contact_lists.append(list(contact_list)) or ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        contact_file = SimpleUploadedFile('contacts.csv', b'559446,1\n')
+        data = {'id_task': 1, 'name': 'test', 'sender_email': 'test@test.test', 'sender_name': 'test name',
+                'subject': 'test subj', 'text': 'test text', 'contact_file': contact_file}
+        response = self.client.put(self.url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_obj.call_args[1]['id_task'], 1)
+        self.assertEqual(contact_lists, [[(559446, True)]])
+
 
 class EditTaskStatus(AuthMixin, APITestCase):
     def setUp(self):
@@ -469,13 +668,28 @@ class EditTaskStatus(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.EDIT_TASK_STATUS)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
+    @mock.patch('core.views.rest.GetTask.api_resource_lib')
+    @mock.patch('core.views.rest.EditTaskStatus.api_resource_lib')
+    def test_put_invalidate_cache(self, mock_obj, mock_obj_get):
+        mock_obj.return_value = ANSWER_SUCCESS
+        mock_obj_get.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+        get_url = reverse('get_task')
+
+        self.client.get(get_url, data={'id_task': 1})
+        self.client.put(self.url, {'id_task': 1, 'task_state': 3})
+        response = self.client.get(get_url, data={'id_task': 1})
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(mock_obj_get.call_count, 2)
+
     @mock.patch('core.views.rest.EditTaskStatus.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -521,13 +735,40 @@ class GetTemplate(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.GET_TEMPLATE)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
+    @mock.patch('core.views.rest.GetTemplate.api_resource_lib')
+    def test_get_cache(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        response_miss = self.client.get(self.url, data={'id_template': 1})
+        response_hit = self.client.get(self.url, data={'id_template': 1})
+        response_other = self.client.get(self.url, data={'id_template': 2})
+
+        self.assertEqual(response_miss['X-Cache'], 'MISS')
+        self.assertEqual(response_hit['X-Cache'], 'HIT')
+        self.assertEqual(response_other['X-Cache'], 'MISS')
+        self.assertEqual(response_hit.data, response_miss.data)
+        self.assertEqual(mock_obj.call_count, 2)
+        self.assertEqual(models.DevinoRequest.objects.count(), 2)
+
+    @mock.patch('core.views.rest.GetTemplate.api_resource_lib')
+    def test_get_cache_error(self, mock_obj):
+        mock_obj.return_value = ANSWER_INTERNAL_ERROR
+        self.client.force_authenticate(user=self.user)
+
+        self.client.get(self.url, data={'id_template': 1})
+        response = self.client.get(self.url, data={'id_template': 1})
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(mock_obj.call_count, 2)
+
     @mock.patch('core.views.rest.GetTemplate.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -575,13 +816,13 @@ class AddTemplate(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.ADD_TEMPLATE)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
     @mock.patch('core.views.rest.AddTemplate.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -631,13 +872,29 @@ class EditTemplate(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.EDIT_TEMPLATE)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
+    @mock.patch('core.views.rest.GetTemplate.api_resource_lib')
+    @mock.patch('core.views.rest.EditTemplate.api_resource_lib')
+    def test_put_invalidate_cache(self, mock_obj, mock_obj_get):
+        mock_obj.return_value = ANSWER_SUCCESS
+        mock_obj_get.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+        get_url = reverse('get_template')
+
+        self.client.get(get_url, data={'id_template': 1})
+        data = {'id_template': 1, 'name': 'test', 'text': 'test text'}
+        self.client.put(self.url, data)
+        response = self.client.get(get_url, data={'id_template': 1})
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(mock_obj_get.call_count, 2)
+
     @mock.patch('core.views.rest.EditTemplate.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -685,13 +942,13 @@ class DelTemplate(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.DEL_TEMPLATE)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
     @mock.patch('core.views.rest.DelTemplate.api_resource_lib')
     def test_del_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -714,6 +971,9 @@ class GetState(AuthMixin, APITestCase):
             username='Test user',
             password='Test passwd'
         )
+        patcher = mock.patch('core.cache.tasks.get', return_value=ANSWER_TASK_STARTED)
+        self.mock_get_task = patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_methods(self):
         self.client.force_authenticate(user=self.user)
@@ -739,13 +999,63 @@ class GetState(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.GET_STATE)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
+    @mock.patch('core.views.rest.GetState.api_resource_lib')
+    def test_get_cache_finished(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.mock_get_task.return_value = ANSWER_TASK_FINISHED
+        self.client.force_authenticate(user=self.user)
+
+        with mock.patch('core.views.rest.django_cache.set') as mock_set:
+            response = self.client.get(self.url, data={'id_task': 1})
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIsNone(mock_set.call_args[0][2])
+
+    @mock.patch('core.views.rest.GetState.api_resource_lib')
+    def test_get_cache_started(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        with mock.patch('core.views.rest.django_cache.set') as mock_set:
+            self.client.get(self.url, data={'id_task': 1})
+
+        self.assertEqual(mock_set.call_args[0][2], 30)
+
+    @mock.patch('core.views.rest.GetState.api_resource_lib')
+    def test_get_cache(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        response_miss = self.client.get(self.url, data={'id_task': 1})
+        response_hit = self.client.get(self.url, data={'id_task': 1})
+        response_other = self.client.get(self.url, data={'id_task': 1, 'start': '2017-08-01', 'end': '2017-08-02'})
+
+        self.assertEqual(response_miss['X-Cache'], 'MISS')
+        self.assertEqual(response_hit['X-Cache'], 'HIT')
+        self.assertEqual(response_other['X-Cache'], 'MISS')
+        self.assertEqual(mock_obj.call_count, 2)
+        self.assertEqual(models.DevinoAnswer.objects.count(), 2)
+
+    @mock.patch('core.clients.PooledDevinoClient.get_task')
+    @mock.patch('core.views.rest.GetState.api_resource_lib')
+    def test_get_one_call(self, mock_obj, mock_get_task):
+        self.mock_get_task.return_value = None
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        self.client.get(self.url, data={'id_task': 5})
+
+        # every call to Devino is audited, the state of the task isn't asked separately
+        mock_get_task.assert_not_called()
+        self.assertEqual(models.DevinoCall.objects.count(), 1)
+
     @mock.patch('core.views.rest.GetState.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -768,6 +1078,9 @@ class GetStateDetailing(AuthMixin, APITestCase):
             username='Test user',
             password='Test passwd'
         )
+        patcher = mock.patch('core.cache.tasks.get', return_value=ANSWER_TASK_STARTED)
+        self.mock_get_task = patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_methods(self):
         self.client.force_authenticate(user=self.user)
@@ -796,13 +1109,27 @@ class GetStateDetailing(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.GET_STATE_DETAILING)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
+    @mock.patch('core.views.rest.GetStateDetailing.api_resource_lib')
+    def test_get_cache(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.mock_get_task.return_value = ANSWER_TASK_FINISHED
+        self.client.force_authenticate(user=self.user)
+
+        self.client.get(self.url, data={'id_task': 1, 'range_start': 1, 'range_end': 100})
+        response_hit = self.client.get(self.url, data={'id_task': 1, 'range_start': 1, 'range_end': 100})
+        response_other = self.client.get(self.url, data={'id_task': 1, 'range_start': 101, 'range_end': 200})
+
+        self.assertEqual(response_hit['X-Cache'], 'HIT')
+        self.assertEqual(response_other['X-Cache'], 'MISS')
+        self.assertEqual(mock_obj.call_count, 2)
+
     @mock.patch('core.views.rest.GetStateDetailing.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -818,6 +1145,102 @@ class GetStateDetailing(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+def get_state_detailing_rows(total):
+    def get_state_detailing(range_start, range_end, **kwargs):
+        rows = [{'Id': number, 'State': 'Delivered'} for number in range(range_start, min(range_end, total) + 1)]
+        return ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': rows})
+    return get_state_detailing
+
+
+# pages are fetched ahead in threads, the test database can't be written from them
+@override_settings(CACHES=LOCMEM_CACHES, DEVINO_RATE_LIMIT_BACKEND='core.ratelimit.LocalBackend')
+class StreamStateDetailing(AuthMixin, APITestCase):
+    def setUp(self):
+        self.url = reverse('stream_state_detailing')
+        self.user = User.objects.create(
+            username='Test user',
+            password='Test passwd'
+        )
+
+    def read_lines(self, response):
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_methods(self):
+        self.client.force_authenticate(user=self.user)
+
+        response_post = self.client.post(self.url)
+
+        self.assertEqual(response_post.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @mock.patch('core.views.rest.StreamStateDetailing.api_resource_lib')
+    def test_get_success(self, mock_obj):
+        mock_obj.side_effect = get_state_detailing_rows(250)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'id_task': 1, 'page_size': 100})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([row['Id'] for row in self.read_lines(response)], list(range(1, 251)))
+        self.assertEqual(mock_obj.call_count, 3)
+        mock_obj.assert_called_with(id_task=1, start=None, end=None, state=None, range_start=201, range_end=300)
+
+        # the whole traversal is one audit record
+        record = models.DevinoCall.objects.get()
+        self.assertEqual(record.api_resource, consts.GET_STATE_DETAILING)
+        self.assertEqual(record.data, {'id_task': 1, 'start': None, 'end': None, 'state': None, 'page_size': 100})
+        self.assertEqual(record.result, {'pages': 3, 'rows': 250})
+        self.assertFalse(record.is_fail)
+
+    @mock.patch('core.views.rest.StreamStateDetailing.api_resource_lib')
+    def test_get_error(self, mock_obj):
+        mock_obj.side_effect = DevinoException(
+            message='test',
+            http_status=400,
+            error=DevinoError(
+                code='validation_error',
+                description='error'
+            ),
+        )
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'id_task': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'code': 'validation_error', 'description': 'error'})
+        self.assertTrue(models.DevinoCall.objects.get().is_fail)
+
+    @mock.patch('core.views.rest.StreamStateDetailing.api_resource_lib')
+    def test_get_broken(self, mock_obj):
+        rows = get_state_detailing_rows(1000)
+
+        def get_state_detailing(range_start, range_end, **kwargs):
+            if range_start > 10:
+                raise DevinoException(message='test', http_status=400,
+                                           error=DevinoError(code='validation_error', description='error'))
+            return rows(range_start, range_end)
+
+        mock_obj.side_effect = get_state_detailing
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'id_task': 1, 'page_size': 10})
+        lines = self.read_lines(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(lines), 11)
+        self.assertEqual(lines[-1], {'code': 'validation_error', 'description': 'error'})
+        record = models.DevinoCall.objects.get()
+        self.assertEqual(record.result, {'pages': 1, 'rows': 10})
+        self.assertTrue(record.is_fail)
+
+    def test_get_bad_request(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'page_size': 0})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class SendMessage(AuthMixin, APITestCase):
     def setUp(self):
         self.url = reverse('send_message')
@@ -852,13 +1275,13 @@ class SendMessage(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.SEND_MESSAGE)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
     @mock.patch('core.views.rest.SendMessage.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -877,6 +1300,210 @@ class SendMessage(AuthMixin, APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @override_settings(DEVINO_SEND_MESSAGE_QUEUE=True)
+    @mock.patch('core.views.rest.SendMessage.api_resource_lib')
+    def test_post_queue(self, mock_obj):
+        self.client.force_authenticate(user=self.user)
+
+        data = {'sender_email': 'test@test.test', 'sender_name': 'test name',
+                'recipient_email': 'othertest@test.test', 'recipient_name': 'test rec name',
+                'subject': 'test subj', 'text': 'test text', 'user_message_id': '123ew3', 'user_campaign_id': '124ew4',
+                'template_id': '1234'}
+
+        response = self.client.post(self.url, data=data)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(mock_obj.called)
+        self.assertFalse(models.DevinoRequest.objects.exists())
+        message = models.QueuedMessage.objects.get()
+        self.assertEqual(response.data, {'id': message.id, 'status': consts.QUEUE_STATUS_NEW})
+        self.assertEqual(message.data, data)
+
+    @override_settings(DEVINO_SEND_MESSAGE_QUEUE=True)
+    def test_post_queue_validation_error(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(self.url, data={'sender_email': 'test@test.test'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.QueuedMessage.objects.exists())
+
+
+
+    @mock.patch('core.views.rest.SendMessage.api_resource_lib')
+    def test_post_idempotency_key(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        data = {'sender_email': 'test@test.test', 'sender_name': 'test name', 'recipient_email': 'othertest@test.test',
+                'recipient_name': 'test rec name', 'subject': 'test subj', 'text': 'test text'}
+        response = self.client.post(self.url, data, HTTP_IDEMPOTENCY_KEY='message-1')
+        response_retry = self.client.post(self.url, data, HTTP_IDEMPOTENCY_KEY='message-1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response_retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(response_retry.data, response.data)
+        self.assertEqual(response_retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(mock_obj.call_count, 1)
+        self.assertEqual(models.DevinoRequest.objects.count(), 1)
+
+    @override_settings(DEVINO_IDEMPOTENCY_USER_MESSAGE_ID=True)
+    @mock.patch('core.views.rest.SendMessage.api_resource_lib')
+    def test_post_user_message_id(self, mock_obj):
+        mock_obj.return_value = ANSWER_SUCCESS
+        self.client.force_authenticate(user=self.user)
+
+        data = {'sender_email': 'test@test.test', 'sender_name': 'test name', 'recipient_email': 'othertest@test.test',
+                'recipient_name': 'test rec name', 'subject': 'test subj', 'text': 'test text',
+                'user_message_id': '1'}
+        self.client.post(self.url, data)
+        self.client.post(self.url, data)
+        response = self.client.post(self.url, dict(data, text='other text'))
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(mock_obj.call_count, 1)
+
+
+# messages of a batch take tokens from threads, which the in-memory sqlite test database can't serve
+@override_settings(DEVINO_RATE_LIMIT_BACKEND='core.ratelimit.LocalBackend')
+class SendMessages(AuthMixin, APITestCase):
+    def setUp(self):
+        self.url = reverse('send_messages')
+        self.user = User.objects.create(
+            username='Test user',
+            password='Test passwd'
+        )
+        self.message = {'sender_email': 'test@test.test', 'sender_name': 'test name',
+                        'recipient_email': 'othertest@test.test', 'recipient_name': 'test rec name',
+                        'subject': 'test subj', 'text': 'test text', 'user_message_id': '123ew3',
+                        'user_campaign_id': '124ew4', 'template_id': '1234'}
+
+    def test_methods(self):
+        self.client.force_authenticate(user=self.user)
+
+        response_get = self.client.get(self.url)
+        response_put = self.client.put(self.url)
+        response_delete = self.client.delete(self.url)
+
+        self.assertEqual(response_get.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(response_put.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(response_delete.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @mock.patch('core.views.rest.SendMessages.api_resource_lib')
+    def test_post_success(self, mock_obj):
+        error = DevinoException(
+            message='test',
+            http_status=400,
+            error=DevinoError(
+                code='validation_error',
+                description='error'
+            ),
+        )
+
+        def send(**kwargs):
+            if kwargs['recipient_name'] == 'bad':
+                raise error
+            return ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': [kwargs['recipient_name']]})
+
+        mock_obj.side_effect = send
+        self.client.force_authenticate(user=self.user)
+
+        names = ['first', 'bad', 'third']
+        data = {'messages': [dict(self.message, recipient_name=name) for name in names]}
+        response = self.client.post(self.url, data=data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['result'], [
+            {'code': 'ok', 'description': 'ok', 'result': ['first']},
+            {'code': 'validation_error', 'description': 'error'},
+            {'code': 'ok', 'description': 'ok', 'result': ['third']},
+        ])
+        self.assertEqual(models.DevinoRequest.objects.filter(api_resource=consts.SEND_MESSAGE).count(), 3)
+        self.assertEqual(
+            [devino_request.data['recipient_name']
+             for devino_request in models.DevinoRequest.objects.order_by('id')],
+            names
+        )
+        self.assertEqual(
+            list(models.DevinoAnswer.objects.order_by('request_id').values_list('is_fail', flat=True)),
+            [False, True, False]
+        )
+
+    @mock.patch('core.views.rest.SendMessages.api_resource_lib')
+    def test_post_validation_error(self, mock_obj):
+        self.client.force_authenticate(user=self.user)
+
+        data = {'messages': [self.message, {'sender_email': 'test@test.test'}]}
+        response = self.client.post(self.url, data=data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(mock_obj.called)
+        self.assertFalse(models.DevinoRequest.objects.exists())
+
+    @override_settings(DEVINO_BATCH_MAX_SIZE=1)
+    def test_post_too_many(self):
+        self.client.force_authenticate(user=self.user)
+
+        data = {'messages': [self.message, self.message]}
+        response = self.client.post(self.url, data=data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_empty(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(self.url, data={'messages': []}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @mock.patch('core.views.rest.close_old_connections')
+    @mock.patch('core.views.rest.SendMessages.api_resource_lib')
+    def test_post_unexpected_error(self, mock_obj, mock_close):
+        def send(**kwargs):
+            if kwargs['recipient_name'] == 'broken':
+                raise RuntimeError('broken')
+            return ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': [kwargs['recipient_name']]})
+
+        mock_obj.side_effect = send
+        self.client.force_authenticate(user=self.user)
+
+        data = {'messages': [dict(self.message, recipient_name=name) for name in ['first', 'broken', 'third']]}
+        with self.assertLogs('core.views.rest', 'ERROR'):
+            response = self.client.post(self.url, data=data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['result'][1]['code'], consts.STATUS_ERROR_API)
+        # the messages that were sent keep their audit records
+        self.assertEqual(models.DevinoCall.objects.count(), 2)
+        self.assertEqual(mock_close.call_count, 3)
+
+
+class GetQueuedMessage(AuthMixin, APITestCase):
+    def setUp(self):
+        self.url = reverse('get_queued_message')
+        self.user = User.objects.create(
+            username='Test user',
+            password='Test passwd'
+        )
+
+    def test_get_success(self):
+        message = models.QueuedMessage.objects.create(data={}, status=consts.QUEUE_STATUS_SENT, attempts=1,
+                                                      code='ok', description='ok')
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'id': message.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'id': message.id, 'status': consts.QUEUE_STATUS_SENT, 'attempts': 1,
+                                         'code': 'ok', 'description': 'ok'})
+
+    def test_get_not_found(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'id': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 
 class GetStatusMessages(AuthMixin, APITestCase):
     def setUp(self):
@@ -908,13 +1535,13 @@ class GetStatusMessages(AuthMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.GET_STATUS_MESSAGE)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
 
     @mock.patch('core.views.rest.GetStatusMessages.api_resource_lib')
     def test_get_error(self, mock_obj):
-        mock_obj.side_effect = rest.DevinoException(
+        mock_obj.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
@@ -928,3 +1555,147 @@ class GetStatusMessages(AuthMixin, APITestCase):
         response = self.client.get(self.url, data=data)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GetDevinoCalls(AuthMixin, APITestCase):
+    def setUp(self):
+        self.url = reverse('get_devino_calls')
+        self.user = User.objects.create(
+            username='Test user',
+            password='Test passwd'
+        )
+        dc = datetime.datetime(2017, 7, 1, tzinfo=pytz.utc)
+        self.calls = [
+            models.DevinoCall.objects.create(api_resource=consts.SEND_MESSAGE, code='ok', dc=dc),
+            models.DevinoCall.objects.create(api_resource=consts.SEND_MESSAGE, code='validation_error', is_fail=True,
+                                             dc=dc),
+            models.DevinoCall.objects.create(api_resource=consts.GET_TASK, code='ok',
+                                             dc=dc + datetime.timedelta(days=1)),
+        ]
+
+    def test_get(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['result']],
+                         [self.calls[2].id, self.calls[1].id, self.calls[0].id])
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_filters(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'api_resource': consts.SEND_MESSAGE, 'is_fail': 'true'})
+        self.assertEqual([item['id'] for item in response.data['result']], [self.calls[1].id])
+
+        response = self.client.get(self.url, data={'code': 'ok', 'dc_to': '2017-07-02T00:00:00Z'})
+        self.assertEqual([item['id'] for item in response.data['result']], [self.calls[0].id])
+
+    def test_data_filters(self):
+        models.DevinoCall.objects.filter(id=self.calls[0].id).update(data={'user_message_id': 'a1'})
+        models.DevinoCall.objects.filter(id=self.calls[2].id).update(data={'id_task': 12, 'state': 1})
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'user_message_id': 'a1'})
+        self.assertEqual([item['id'] for item in response.data['result']], [self.calls[0].id])
+        self.assertEqual(response.data['result'][0]['data'], {'user_message_id': 'a1'})
+
+        response = self.client.get(self.url, data={'id_task': 12})
+        self.assertEqual([item['id'] for item in response.data['result']], [self.calls[2].id])
+
+        response = self.client.get(self.url, data={'id_task': 1})
+        self.assertEqual(response.data['result'], [])
+
+    def test_cursor(self):
+        self.client.force_authenticate(user=self.user)
+
+        ids = []
+        data = {'limit': 2}
+        while True:
+            response = self.client.get(self.url, data=data)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['result'])
+            if response.data['next_cursor'] is None:
+                break
+            data['cursor'] = response.data['next_cursor']
+
+        self.assertEqual(ids, [self.calls[2].id, self.calls[1].id, self.calls[0].id])
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'cursor': 'invalid'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cursor', response.data)
+
+
+@override_settings(DEVINO_AUDIT_BLOB_THRESHOLD=10)
+class GetDevinoCall(AuthMixin, APITestCase):
+    def setUp(self):
+        self.url = reverse('get_devino_call')
+        self.user = User.objects.create(
+            username='Test user',
+            password='Test passwd'
+        )
+
+    def test_get(self):
+        self.client.force_authenticate(user=self.user)
+        data = {'contact_list': [['test@test.test', 'test name']]}
+        audit.bulk_write([audit.make_record(consts.ADD_TASK, data, answer=ANSWER_SUCCESS)])
+        record = models.DevinoCall.objects.get()
+
+        response_list = self.client.get(reverse('get_devino_calls'))
+        response = self.client.get(self.url, data={'id': record.id})
+
+        self.assertIsNone(response_list.data['result'][0]['data'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'], data)
+        self.assertEqual(response.data['data_hash'], record.data_hash)
+
+    def test_not_found(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url, data={'id': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class GetCircuitBreakers(AuthMixin, APITestCase):
+    def setUp(self):
+        self.url = reverse('get_circuit_breakers')
+        self.user = User.objects.create(
+            username='Test user',
+            password='Test passwd'
+        )
+
+    def test_get(self):
+        self.client.force_authenticate(user=self.user)
+        resilience.breakers[consts.RATE_LIMIT_SEND]._set_state(resilience.STATE_OPEN, 100)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        states = {state['name']: state for state in response.data['result']}
+        self.assertEqual(states[consts.RATE_LIMIT_READ]['state'], resilience.STATE_CLOSED)
+        self.assertEqual(states[consts.RATE_LIMIT_SEND]['state'], resilience.STATE_OPEN)
+        self.assertEqual(states[consts.RATE_LIMIT_SEND]['transitions'], [{'from': 'closed', 'to': 'open', 'at': 100}])
+
+
+class GetConcurrencyLimits(AuthMixin, APITestCase):
+    def setUp(self):
+        self.url = reverse('get_concurrency_limits')
+        self.user = User.objects.create(
+            username='Test user',
+            password='Test passwd'
+        )
+
+    def test_get(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([state['name'] for state in response.data['result']], ['bulk', 'read', 'send'])
+        self.assertEqual(set(response.data['result'][0]), {'name', 'pid', 'limit', 'in_flight', 'queued'})
@@ -0,0 +1,74 @@
+import io
+import os
+import gzip
+import json
+import shutil
+import datetime
+import tempfile
+
+import pytz
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import consts
+from .. import models
+from .. import retention
+
+NOW = datetime.datetime(2017, 8, 1, tzinfo=pytz.utc)
+
+
+class Retention(TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        patcher = override_settings(
+            DEVINO_RETENTION_ARCHIVE_DIR=self.archive_dir,
+            DEVINO_RETENTION_DAYS=30,
+            DEVINO_RETENTION_POLICY={consts.GET_STATE: 1, consts.SEND_MESSAGE: None},
+        )
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def create(self, api_resource, days):
+        return models.DevinoCall.objects.create(api_resource=api_resource, code='ok',
+                                                dc=NOW - datetime.timedelta(days=days))
+
+    def read_archive(self, api_resource, day):
+        with gzip.open(retention.get_archive_path(api_resource, day), 'rt') as archive_file:
+            return [json.loads(line) for line in archive_file]
+
+    def test_policy(self):
+        old_state = self.create(consts.GET_STATE, 2)
+        self.create(consts.GET_STATE, 0)
+        self.create(consts.GET_TASK, 2)
+        self.create(consts.SEND_MESSAGE, 100)
+
+        purged = retention.run(batch_size=10, now=NOW)
+
+        self.assertEqual(purged[consts.GET_STATE], 1)
+        self.assertEqual(purged[consts.GET_TASK], 0)
+        self.assertNotIn(consts.SEND_MESSAGE, purged)
+        self.assertFalse(models.DevinoCall.objects.filter(id=old_state.id).exists())
+        self.assertEqual(models.DevinoCall.objects.count(), 3)
+
+        archived = self.read_archive(consts.GET_STATE, old_state.dc.date())
+        self.assertEqual([record['id'] for record in archived], [old_state.id])
+
+    def test_batches(self):
+        records = [self.create(consts.GET_TASK, 40) for _ in range(5)]
+
+        purged = retention.purge(consts.GET_TASK, NOW, batch_size=2)
+
+        self.assertEqual(purged, 5)
+        self.assertFalse(models.DevinoCall.objects.exists())
+        # every batch appends a gzip member to the same day file
+        archived = self.read_archive(consts.GET_TASK, records[0].dc.date())
+        self.assertEqual([record['id'] for record in archived], [record.id for record in records])
+
+    def test_dry_run(self):
+        self.create(consts.GET_TASK, 40)
+
+        call_command('purge_devino_calls', '--dry-run', stdout=io.StringIO())
+
+        self.assertEqual(models.DevinoCall.objects.count(), 1)
+        self.assertEqual(os.listdir(self.archive_dir), [])
@@ -0,0 +1,140 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, mock, override_settings
+
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from email_devino.client import DevinoException
+
+from .. import clients
+from .. import consts
+from .. import simulator
+from ..management.commands.simulate_devino import SimulatorServer
+
+NO_LATENCY = {'seed': 1, 'default': {}, 'get_state_detailing': {'result_size': 150}}
+
+
+def create_client(config=NO_LATENCY, timeout=(1, 2)):
+    client = simulator.SimulatedDevinoClient('login', 'password', session=None, timeout=timeout)
+    client.simulator = simulator.Simulator(config)
+    return client
+
+
+class Simulator(SimpleTestCase):
+    def test_methods(self):
+        client = create_client()
+
+        self.assertEqual(client.send_transactional_message('a@test.test', 'a', 'b@test.test', 'b', 'subj', 'text')
+                         .code, consts.STATUS_OK)
+        self.assertEqual(client.add_task('name', 'a@test.test', 'a', 'subj', 'text', contact_list=[(1, True)]).result,
+                         1)
+        self.assertEqual(client.get_task(5).result['Id'], 5)
+        self.assertEqual(client.edit_task_status(5, 2).result, 5)
+        self.assertEqual(len(client.get_sender_addresses().result), 3)
+        self.assertEqual(client.del_sender_address('a@test.test').result, 'a@test.test')
+        self.assertEqual([message['MessageId'] for message in client.get_status_transactional_message(['1', '2'])
+                          .result], ['1', '2'])
+
+    def test_range(self):
+        client = create_client()
+
+        self.assertEqual(len(client.get_state_detailing(id_task=1, range_start=1, range_end=100).result), 100)
+        # the last page is short
+        page = client.get_state_detailing(id_task=1, range_start=101, range_end=200).result
+        self.assertEqual([page[0]['Id'], page[-1]['Id']], [101, 150])
+        self.assertEqual(client.get_state_detailing(id_task=1, range_start=201, range_end=300).result, [])
+
+    def test_errors(self):
+        client = create_client({'default': {'error_rate': 1, 'error_status': 400}})
+        with self.assertRaises(DevinoException) as context:
+            client.get_task(1)
+        self.assertEqual(context.exception.error.code, consts.STATUS_BAD_REQUEST)
+
+        client = create_client({'default': {'error_rate': 1, 'error_status': 503}})
+        with self.assertRaises(DevinoException) as context:
+            client.get_task(1)
+        self.assertEqual(context.exception.http_status, 503)
+        self.assertIsNone(context.exception.error)
+
+        client = create_client({'default': {'connection_error_rate': 1}})
+        with self.assertRaises(DevinoException) as context:
+            client.get_task(1)
+        self.assertIsNone(context.exception.error)
+
+    def test_error_rate(self):
+        client = create_client({'seed': 1, 'default': {'error_rate': 0.3}})
+        errors = 0
+        for _ in range(1000):
+            try:
+                client.get_task(1)
+            except DevinoException:
+                errors += 1
+
+        self.assertAlmostEqual(errors / 1000, 0.3, delta=0.05)
+
+    @mock.patch('core.simulator.time.sleep')
+    def test_latency(self, mock_sleep):
+        client = create_client({'default': {'latency': {'distribution': 'constant', 'value': 0.5}},
+                                'get_bulk': {'latency': {'distribution': 'constant', 'value': 3}}})
+
+        client.get_template(1)
+        mock_sleep.assert_called_once_with(0.5)
+
+        with self.assertRaises(DevinoException) as context:
+            client.get_task(1)
+        self.assertIsNone(context.exception.error)
+        mock_sleep.assert_called_with(2)
+
+    def test_distributions(self):
+        latency = simulator.Simulator({'seed': 1}).get_latency
+        samples = sorted(latency({'distribution': 'lognormal', 'median': 0.1, 'sigma': 0.5}) for _ in range(1001))
+
+        self.assertAlmostEqual(samples[500], 0.1, delta=0.01)
+        self.assertTrue(0.2 <= latency({'distribution': 'uniform', 'low': 0.2, 'high': 0.3}) <= 0.3)
+        self.assertGreater(latency({'distribution': 'exponential', 'mean': 0.1}), 0)
+        self.assertEqual(latency(None), 0)
+        with self.assertRaises(ValueError):
+            latency({'distribution': 'normal'})
+
+    def test_http(self):
+        server = SimulatorServer(('127.0.0.1', 0), simulator.Simulator(NO_LATENCY))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        client = clients.PooledDevinoClient('login', 'password', session=clients.create_session(),
+                                            url='http://127.0.0.1:{}'.format(server.server_address[1]))
+        self.addCleanup(client.session.close)
+
+        self.assertEqual(len(client.get_state_detailing(id_task=1, range_start=101, range_end=200).result), 50)
+        self.assertEqual(client.send_transactional_message('a@test.test', 'a', 'b@test.test', 'b', 'subj', 'text')
+                         .code, consts.STATUS_OK)
+
+        server.simulator = simulator.Simulator({'default': {'connection_error_rate': 1}})
+        with self.assertRaises(DevinoException) as context:
+            client.get_task(1)
+        self.assertIsNone(context.exception.error)
+
+
+@override_settings(DEVINO_BACKEND='simulator', DEVINO_SIMULATOR=NO_LATENCY)
+class Backend(TestCase):
+    def setUp(self):
+        clients.reset()
+        self.addCleanup(clients.reset)
+        self.user = User.objects.create(
+            username='Test user',
+            password='Test passwd'
+        )
+
+    def test_rest(self):
+        self.client.force_login(user=self.user)
+
+        response = self.client.get(reverse('get_state_detailing'),
+                                   data={'id_task': 1, 'range_start': 1, 'range_end': 10})
+
+        self.assertIsInstance(clients.get_client(), simulator.SimulatedDevinoClient)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['result']), 10)
@@ -0,0 +1,107 @@
+import threading
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, mock, override_settings
+
+from .. import singleflight
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DEVINO_SINGLEFLIGHT_CACHE='default', DEVINO_SINGLEFLIGHT_TIMEOUT=1,
+                   DEVINO_SINGLEFLIGHT_POLL_INTERVAL=0.01)
+class Do(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def run_concurrently(self, fn, count):
+        waiting = threading.Semaphore(0)
+        results = []
+
+        class CountingEvent(threading.Event):
+            def wait(self, timeout=None):
+                waiting.release()
+                return super(CountingEvent, self).wait(timeout)
+
+        class Call(singleflight.Call):
+            def __init__(self):
+                super(Call, self).__init__()
+                self.done = CountingEvent()
+
+        def leader_fn():
+            # answer only when every follower waits for this call
+            for _ in range(count - 1):
+                waiting.acquire(timeout=1)
+            return fn()
+
+        def run(call_fn):
+            try:
+                results.append(singleflight.do('key', call_fn))
+            except Exception as ex:
+                results.append(ex)
+
+        with mock.patch('core.singleflight.Call', Call):
+            threads = [threading.Thread(target=run, args=(leader_fn, ))]
+            threads[0].start()
+            while not singleflight._calls:
+                pass
+            for _ in range(count - 1):
+                threads.append(threading.Thread(target=run, args=(fn, )))
+                threads[-1].start()
+            for thread in threads:
+                thread.join(2)
+        return results
+
+    def test_threads(self):
+        fn = mock.Mock(return_value=({'code': 'ok'}, 200))
+
+        results = self.run_concurrently(fn, 5)
+
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(results, [({'code': 'ok'}, 200)] * 5)
+        self.assertEqual(singleflight._calls, {})
+
+    def test_threads_error(self):
+        fn = mock.Mock(side_effect=ValueError('error'))
+
+        results = self.run_concurrently(fn, 3)
+
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    def test_other_worker_result(self):
+        cache.set('singleflight:key', 'token')
+        cache.set(singleflight._result_key('token'), ({'code': 'ok'}, 200))
+        fn = mock.Mock()
+
+        self.assertEqual(singleflight.do('key', fn), ({'code': 'ok'}, 200))
+        self.assertFalse(fn.called)
+
+    def test_other_worker_died(self):
+        cache.set('singleflight:key', 'token')
+        fn = mock.Mock(return_value=({'code': 'ok'}, 200))
+
+        with mock.patch('core.singleflight.time.sleep', side_effect=lambda _: cache.delete('singleflight:key')):
+            self.assertEqual(singleflight.do('key', fn), ({'code': 'ok'}, 200))
+        self.assertEqual(fn.call_count, 1)
+
+    def test_sequential(self):
+        fn = mock.Mock(return_value=({'code': 'ok'}, 200))
+
+        singleflight.do('key', fn)
+        singleflight.do('key', fn)
+
+        self.assertEqual(fn.call_count, 2)
+        self.assertIsNone(cache.get('singleflight:key'))
+
+
+@override_settings(DEVINO_SINGLEFLIGHT_CACHE=None)
+class InProcess(TestCase):
+    def test_no_queries(self):
+        fn = mock.Mock(return_value=({'code': 'ok'}, 200))
+
+        # the database cache is not touched without a shared singleflight cache
+        with self.assertNumQueries(0):
+            self.assertEqual(singleflight.do('key', fn), ({'code': 'ok'}, 200))
+        self.assertEqual(fn.call_count, 1)
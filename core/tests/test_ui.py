@@ -1,5 +1,3 @@
-import json
-
 from django.test import TestCase, mock
 from django.contrib.auth.models import User
 
@@ -7,11 +5,11 @@ from rest_framework import status
 from rest_framework.reverse import reverse
 
 from email_devino.client import DevinoError
+from email_devino.client import DevinoException
 from email_devino.client import ApiAnswer
 
 from .. import models
 from .. import consts
-from ..views import rest
 
 ANSWER_SUCCESS = ApiAnswer.create({'Code': 'ok', 'Description': 'ok', 'Result': []})
 
@@ -30,8 +28,8 @@ class UiSendMessage(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_302_FOUND)
 
-    @mock.patch('core.views.ui.DevinoClient.get_sender_addresses')
-    @mock.patch('core.views.ui.DevinoClient.send_transactional_message')
+    @mock.patch('core.clients.PooledDevinoClient.get_sender_addresses')
+    @mock.patch('core.clients.PooledDevinoClient.send_transactional_message')
     def test_post_success(self, mock_obj_send, mock_obj_get):
         mock_obj_get.return_value = ApiAnswer.create({'Result': [{'SenderAddress': 'test@test.test',
                                                                   'Confirmed': True}]})
@@ -47,17 +45,17 @@ class UiSendMessage(TestCase):
 
         self.assertTrue(models.DevinoRequest.objects.exists())
         self.assertEqual(models.DevinoRequest.objects.get().api_resource, consts.SEND_MESSAGE)
-        self.assertEqual(json.loads(models.DevinoRequest.objects.get().data), data)
+        self.assertEqual(models.DevinoRequest.objects.get().data, data)
         self.assertTrue(models.DevinoAnswer.objects.exists())
         self.assertFalse(models.DevinoAnswer.objects.get().is_fail)
         self.assertRedirects(response, self.url)
 
-    @mock.patch('core.views.ui.DevinoClient.get_sender_addresses')
-    @mock.patch('core.views.ui.DevinoClient.send_transactional_message')
+    @mock.patch('core.clients.PooledDevinoClient.get_sender_addresses')
+    @mock.patch('core.clients.PooledDevinoClient.send_transactional_message')
     def test_get_error(self, mock_obj_send, mock_obj_get):
         mock_obj_get.return_value = ApiAnswer.create({'Result': [{'SenderAddress': 'test@test.test',
                                                                   'Confirmed': True}]})
-        mock_obj_send.side_effect = rest.DevinoException(
+        mock_obj_send.side_effect = DevinoException(
             message='test',
             http_status=400,
             error=DevinoError(
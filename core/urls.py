@@ -11,6 +11,7 @@ urlpatterns = [
     url(r'^api/add_sender_address/$', rest.AddSenderAddress.as_view(), name='add_sender_address'),
     url(r'^api/del_sender_address/$', rest.DelSenderAddress.as_view(), name='del_sender_address'),
     url(r'^api/get_tasks/$', rest.GetTasks.as_view(), name='get_tasks'),
+    url(r'^api/stream_tasks/$', rest.StreamTasks.as_view(), name='stream_tasks'),
     url(r'^api/get_task/$', rest.GetTask.as_view(), name='get_task'),
     url(r'^api/add_task/$', rest.AddTask.as_view(), name='add_task'),
     url(r'^api/edit_task/$', rest.EditTask.as_view(), name='edit_task'),
@@ -21,9 +22,17 @@ urlpatterns = [
     url(r'^api/del_template/$', rest.DelTemplate.as_view(), name='del_template'),
     url(r'^api/get_state/$', rest.GetState.as_view(), name='get_state'),
     url(r'^api/get_state_detailing/$', rest.GetStateDetailing.as_view(), name='get_state_detailing'),
+    url(r'^api/stream_state_detailing/$', rest.StreamStateDetailing.as_view(), name='stream_state_detailing'),
     url(r'^api/send_message/$', rest.SendMessage.as_view(), name='send_message'),
+    url(r'^api/send_messages/$', rest.SendMessages.as_view(), name='send_messages'),
     url(r'^api/get_status_messages/$', rest.GetStatusMessages.as_view(), name='get_status_messages'),
+    url(r'^api/get_queued_message/$', rest.GetQueuedMessage.as_view(), name='get_queued_message'),
+    url(r'^api/get_devino_calls/$', rest.GetDevinoCalls.as_view(), name='get_devino_calls'),
+    url(r'^api/get_devino_call/$', rest.GetDevinoCall.as_view(), name='get_devino_call'),
+    url(r'^api/get_circuit_breakers/$', rest.GetCircuitBreakers.as_view(), name='get_circuit_breakers'),
+    url(r'^api/get_concurrency_limits/$', rest.GetConcurrencyLimits.as_view(), name='get_concurrency_limits'),
 
     url(r'^$', ui.Index.as_view()),
     url(r'^send_message/$', ui.SendMessage.as_view(), name='send_message_interface'),
+    url(r'^metrics$', ui.prometheus_metrics, name='metrics'),
 ]
@@ -1,63 +1,101 @@
 import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import views
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import Throttled
 
-from email_devino.client import DevinoClient
-from email_devino.client import DevinoException
-
+from core import audit
+from core import blobs
+from core import cache
+from core import clients
+from core import concurrency
 from core import models
+from core import ratelimit
+from core import resilience
 from core import consts
+from core import idempotency
+from core import metrics
+from core import contacts
+from core import pagination
 from core import serializers
-from core.utils import date_handler
+from core import singleflight
+from core.exceptions import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
 
 
 class BaseDevino(views.APIView):
     api_resource = None
     serializer = None
     api_resource_lib = None
+    coalesce = False    # share one upstream call between identical concurrent requests
+
+    def dispatch(self, request, *args, **kwargs):
+        self.timing = metrics.Timing(self.api_resource)
+        response = super(BaseDevino, self).dispatch(request, *args, **kwargs)
+        if response.streaming:
+            # the stream observes the timing once it is sent
+            return response
+        with self.timing.phase(metrics.PHASE_RENDER):
+            response.render()
+        if isinstance(response.data, dict):
+            self.timing.code = response.data.get('code')
+        self.timing.observe(response.status_code)
+        return response
 
-    def devino_request(self, serializer=None):
-        if serializer:
+    def validate(self, serializer):
+        with self.timing.phase(metrics.PHASE_VALIDATE):
             serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
 
-        json_data = json.dumps(
-            serializer.validated_data if serializer else None,
-            default=date_handler
-        )
-        devino_request = models.DevinoRequest.objects.create(api_resource=self.api_resource, data=json_data)
-
+    def devino_request(self, serializer=None):
+        data = self.validate(serializer) if serializer else None
+
+        if self.coalesce:
+            key = cache.request_key(self.api_resource, data)
+            response_data, status_response = singleflight.do(key, lambda: self.call_devino(data))
+        else:
+            response_data, status_response = self.call_devino(data)
+        return Response(response_data, status=status_response)
+
+    def call_devino(self, data):
+        limiter = concurrency.get_limiter(self.api_resource)
+        with self.timing.phase(metrics.PHASE_WAIT):
+            ratelimit.acquire(ratelimit.get_bucket(self.api_resource), ratelimit.get_max_wait(self.request))
+            limiter.acquire(api_resource=self.api_resource)
+
+        record = None
         try:
-            if serializer:
-                answer = self.api_resource_lib(**serializer.validated_data)
-            else:
-                answer = self.api_resource_lib()
-
-            models.DevinoAnswer.objects.create(
-                code=answer.code,
-                description=answer.description,
-                result=answer.result,
-                request=devino_request,
-            )
-            if answer.code == consts.STATUS_BAD_REQUEST:
-                status_response = status.HTTP_400_BAD_REQUEST
-            elif answer.code == consts.STATUS_ERROR_API:
-                status_response = status.HTTP_500_INTERNAL_SERVER_ERROR
-            else:
-                status_response = status.HTTP_200_OK
-            return Response({'code': answer.code, 'description': answer.description, 'result': answer.result},
-                            status=status_response)
-
-        except DevinoException as ex:
-            error = models.DevinoAnswer.objects.create(
-                code=ex.error.code,
-                description=ex.error.description,
-                request=devino_request,
-                is_fail=True,
-            )
-            return Response({'code': error.code, 'description': error.description}, status=status.HTTP_400_BAD_REQUEST)
+            with self.timing.phase(metrics.PHASE_UPSTREAM):
+                answer, record = audit.call(self.api_resource,
+                                            resilience.wrap(self.api_resource, self.api_resource_lib),
+                                            data, audit_data=self.get_audit_data(data))
+        finally:
+            limiter.release(record, self.api_resource)
+        with self.timing.phase(metrics.PHASE_AUDIT):
+            audit.write([record])
+        if answer is None:
+            return {'code': record.code, 'description': record.description}, status.HTTP_400_BAD_REQUEST
+
+        if answer.code == consts.STATUS_OK:
+            self.on_success(data, answer)
+        return {'code': answer.code, 'description': answer.description, 'result': answer.result}, \
+            get_status_response(answer.code)
+
+    def get_audit_data(self, data):
+        # None keeps data in the audit log as is
+        return None
+
+    def on_success(self, data, answer):
+        pass
 
     def get(self, request):
         serializer = self.serializer
@@ -88,112 +126,448 @@ class BaseDevino(views.APIView):
         return response
 
 
+class CachedResourceMixin(object):
+    """
+    Read-through cache of ok answers, the X-Cache header tells whether Devino was called
+    """
+    resource_cache = None
+    resource_cache_field = None
+
+    def devino_request(self, serializer=None):
+        resource_id = self.validate(serializer)[self.resource_cache_field]
+
+        cached = self.resource_cache.get(resource_id)
+        if cached is not None:
+            return Response(cached, headers={'X-Cache': 'HIT'})
+
+        version = self.resource_cache.version(resource_id)
+        response = super(CachedResourceMixin, self).devino_request(serializer)
+        if response.data.get('code') == consts.STATUS_OK:
+            self.resource_cache.set(resource_id, response.data, version)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class StateCacheMixin(object):
+    """
+    Statistics of a finished task never change and are cached without expiry,
+    other answers are kept for DEVINO_STATE_CACHE_TTL seconds.
+    A task is known as finished from the tasks cache of /api/get_task/, no extra call is made for it.
+    """
+
+    def devino_request(self, serializer=None):
+        key = cache.request_key(self.api_resource, self.validate(serializer))
+
+        cached = django_cache.get(key)
+        if cached is not None:
+            return Response(cached, headers={'X-Cache': 'HIT'})
+
+        # checked before the call, a task finishing meanwhile must not make a partial answer permanent
+        finished = cache.is_task_finished(serializer.validated_data['id_task'])
+        response = super(StateCacheMixin, self).devino_request(serializer)
+        if response.data.get('code') == consts.STATUS_OK:
+            django_cache.set(key, response.data, None if finished else settings.DEVINO_STATE_CACHE_TTL)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ContactListMixin(object):
+    """
+    contact_list arrives normalized and without duplicate groups, the answer tells how many were dropped.
+    It may also be uploaded as a CSV file in contact_file: the file is checked as a whole before the call
+    and then streamed to the client row by row, the audit log keeps its summary instead of the rows.
+    """
+    file_serializer = None
+
+    def devino_request(self, serializer=None):
+        if 'contact_file' in self.request.FILES:
+            serializer = self.file_serializer(data=self.request.data)
+        return super(ContactListMixin, self).devino_request(serializer)
+
+    def call_devino(self, data):
+        response_data, status_response = super(ContactListMixin, self).call_devino(data)
+        contact_list = data.get('contact_list')
+        if isinstance(contact_list, (contacts.ContactList, contacts.ContactFile)):
+            response_data['contact_list'] = contact_list.stats
+        return response_data, status_response
+
+    def get_audit_data(self, data):
+        contact_list = data.get('contact_list')
+        if isinstance(contact_list, contacts.ContactFile):
+            return dict(data, contact_list=None, contact_file=contact_list.summary)
+        if isinstance(contact_list, contacts.ContactList):
+            return dict(data, contact_list=[list(pair) for pair in contact_list])
+        return super(ContactListMixin, self).get_audit_data(data)
+
+
 class GetSenderAddresses(BaseDevino):
     api_resource = consts.GET_SENDER_ADDRESSES
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).get_sender_addresses
+    api_resource_lib = clients.ClientMethod('get_sender_addresses')
     http_method_names = ['get', ]
+    coalesce = True
 
 
 class AddSenderAddress(BaseDevino):
     api_resource = consts.ADD_SENDER_ADDRESS
     serializer = serializers.SenderAddress
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).add_sender_address
+    api_resource_lib = clients.ClientMethod('add_sender_address')
     http_method_names = ['post', ]
 
+    def on_success(self, data, answer):
+        cache.invalidate_sender_addresses()
+
 
 class DelSenderAddress(BaseDevino):
     api_resource = consts.DEL_SENDER_ADDRESS
     serializer = serializers.SenderAddress
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).del_sender_address
+    api_resource_lib = clients.ClientMethod('del_sender_address')
     http_method_names = ['delete', ]
 
+    def on_success(self, data, answer):
+        cache.invalidate_sender_addresses()
+
 
 class GetTasks(BaseDevino):
     api_resource = consts.GET_TASKS_LIST
     serializer = serializers.GetTasks
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).get_tasks
+    api_resource_lib = clients.ClientMethod('get_tasks')
     http_method_names = ['get', ]
+    coalesce = True
 
 
-class GetTask(BaseDevino):
+class GetTask(CachedResourceMixin, BaseDevino):
     api_resource = consts.GET_TASK
     serializer = serializers.GetTask
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).get_task
+    api_resource_lib = clients.ClientMethod('get_task')
     http_method_names = ['get', ]
+    coalesce = True
+    resource_cache = cache.tasks
+    resource_cache_field = 'id_task'
 
 
-class AddTask(BaseDevino):
+class AddTask(ContactListMixin, BaseDevino):
     api_resource = consts.ADD_TASK
     serializer = serializers.AddTask
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).add_task
+    file_serializer = serializers.AddTaskFile
+    api_resource_lib = clients.ClientMethod('add_task')
     http_method_names = ['post', ]
 
 
-class EditTask(BaseDevino):
+class EditTask(ContactListMixin, BaseDevino):
     api_resource = consts.EDIT_TASK
     serializer = serializers.EditTask
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).edit_task
+    file_serializer = serializers.EditTaskFile
+    api_resource_lib = clients.ClientMethod('edit_task')
     http_method_names = ['put', ]
 
+    def on_success(self, data, answer):
+        cache.tasks.invalidate(data['id_task'])
+
 
 class EditTaskStatus(BaseDevino):
     api_resource = consts.EDIT_TASK_STATUS
     serializer = serializers.EditTaskStatus
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).edit_task_status
+    api_resource_lib = clients.ClientMethod('edit_task_status')
     http_method_names = ['put', ]
 
+    def on_success(self, data, answer):
+        cache.tasks.invalidate(data['id_task'])
+
 
-class GetTemplate(BaseDevino):
+class GetTemplate(CachedResourceMixin, BaseDevino):
     api_resource = consts.GET_TEMPLATE
     serializer = serializers.GetTemplate
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).get_template
+    api_resource_lib = clients.ClientMethod('get_template')
     http_method_names = ['get', ]
+    coalesce = True
+    resource_cache = cache.templates
+    resource_cache_field = 'id_template'
 
 
 class AddTemplate(BaseDevino):
     api_resource = consts.ADD_TEMPLATE
     serializer = serializers.AddTemplate
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).add_template
+    api_resource_lib = clients.ClientMethod('add_template')
     http_method_names = ['post', ]
 
 
 class EditTemplate(BaseDevino):
     api_resource = consts.EDIT_TEMPLATE
     serializer = serializers.EditTemplate
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).edit_template
+    api_resource_lib = clients.ClientMethod('edit_template')
     http_method_names = ['put', ]
 
+    def on_success(self, data, answer):
+        cache.templates.invalidate(data['id_template'])
+
 
 class DelTemplate(BaseDevino):
     api_resource = consts.DEL_TEMPLATE
     serializer = serializers.DelTemplate
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).del_template
+    api_resource_lib = clients.ClientMethod('del_template')
     http_method_names = ['delete', ]
 
+    def on_success(self, data, answer):
+        cache.templates.invalidate(data['id_template'])
 
-class GetState(BaseDevino):
+
+class GetState(StateCacheMixin, BaseDevino):
     api_resource = consts.GET_STATE
     serializer = serializers.GetState
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).get_state
+    api_resource_lib = clients.ClientMethod('get_state')
     http_method_names = ['get', ]
+    coalesce = True
 
 
-class GetStateDetailing(BaseDevino):
+class GetStateDetailing(StateCacheMixin, BaseDevino):
     api_resource = consts.GET_STATE_DETAILING
     serializer = serializers.GetStateDetailing
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).get_state_detailing
+    api_resource_lib = clients.ClientMethod('get_state_detailing')
     http_method_names = ['get', ]
+    coalesce = True
+
+
+class StreamDevino(BaseDevino):
+    """
+    All rows of a paged list call as NDJSON, one row per line. Devino is paged through on the server,
+    a stream broken by a failed call ends with a line of its code and description.
+    filter_fields of the serializer aren't sent to Devino, filter_rows applies them to every page.
+    """
+    http_method_names = ['get', ]
+    filter_fields = ()
+
+    def get(self, request):
+        data = self.validate(self.serializer(data=request.query_params))
+        page_size = data.pop('page_size')
+        filters = {name: data.pop(name) for name in self.filter_fields}
+        pages = pagination.Pages(self.api_resource, self.api_resource_lib, data, page_size,
+                                 ratelimit.get_max_wait(request))
+
+        # the first page is fetched before answering, its failure is the status of the response
+        with self.timing.phase(metrics.PHASE_UPSTREAM):
+            page = next(pages, None)
+        if page is None:
+            with self.timing.phase(metrics.PHASE_AUDIT):
+                audit.write([pages.record])
+            return Response({'code': pages.record.code, 'description': pages.record.description},
+                            status=status.HTTP_400_BAD_REQUEST if pages.record.is_fail
+                            else get_status_response(pages.record.code))
+        return StreamingHttpResponse(self.stream(page, pages, filters), content_type='application/x-ndjson')
+
+    def stream(self, page, pages, filters):
+        try:
+            while page is not None:
+                with self.timing.phase(metrics.PHASE_RENDER):
+                    chunk = ''.join(json.dumps(row) + '\n' for row in self.filter_rows(page, filters))
+                if chunk:
+                    yield chunk
+                with self.timing.phase(metrics.PHASE_UPSTREAM):
+                    page = next(pages, None)
+
+            if pages.record.code != consts.STATUS_OK:
+                yield json.dumps({'code': pages.record.code, 'description': pages.record.description}) + '\n'
+        finally:
+            # also when the client went away in the middle
+            pages.close()
+            with self.timing.phase(metrics.PHASE_AUDIT):
+                audit.write([pages.record])
+            self.timing.code = pages.record.code
+            self.timing.observe(status.HTTP_200_OK)
+
+    def filter_rows(self, rows, filters):
+        return rows
+
+
+class StreamStateDetailing(StreamDevino):
+    api_resource = consts.GET_STATE_DETAILING
+    serializer = serializers.StreamStateDetailing
+    api_resource_lib = clients.ClientMethod('get_state_detailing')
+
+
+class StreamTasks(StreamDevino):
+    api_resource = consts.GET_TASKS_LIST
+    serializer = serializers.StreamTasks
+    api_resource_lib = clients.ClientMethod('get_tasks')
+    filter_fields = ('state', 'name')
+
+    def filter_rows(self, rows, filters):
+        name = filters['name'].lower() if filters['name'] else None
+        for row in rows:
+            if filters['state'] is not None and row.get('State') != filters['state']:
+                continue
+            if name is not None and name not in (row.get('Name') or '').lower():
+                continue
+            yield row
 
 
 class SendMessage(BaseDevino):
     api_resource = consts.SEND_MESSAGE
     serializer = serializers.SendMessage
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).send_transactional_message
+    api_resource_lib = clients.ClientMethod('send_transactional_message')
     http_method_names = ['post', ]
 
+    def post(self, request):
+        data = self.validate(self.serializer(data=request.data))
+
+        key = idempotency.get_key(request, data)
+        if key is None:
+            response_data, status_response = self.send(data)
+            return Response(response_data, status=status_response)
+
+        response_data, status_response, replayed = idempotency.run(request.user, key, data, lambda: self.send(data))
+        response = Response(response_data, status=status_response)
+        if replayed:
+            response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def send(self, data):
+        if settings.DEVINO_SEND_MESSAGE_QUEUE:
+            message = models.QueuedMessage.objects.create(data=data)
+            return {'id': message.id, 'status': message.status}, status.HTTP_202_ACCEPTED
+        return self.call_devino(data)
+
+
+class SendMessages(BaseDevino):
+    api_resource = consts.SEND_MESSAGE
+    serializer = serializers.SendMessages
+    api_resource_lib = clients.ClientMethod('send_transactional_message')
+    http_method_names = ['post', ]
+
+    def devino_request(self, serializer=None):
+        messages = self.validate(serializer)['messages']
+
+        self.max_wait = ratelimit.get_max_wait(self.request)
+        workers = min(settings.DEVINO_BATCH_WORKERS, len(messages))
+        # the messages wait for tokens and slots and are sent concurrently, the batch is timed as a whole
+        with self.timing.phase(metrics.PHASE_UPSTREAM):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self.send_in_thread, data) for data in messages]
+                sent = [self.get_sent(future) for future in futures]
+
+        with self.timing.phase(metrics.PHASE_AUDIT):
+            audit.write([record for record, item in sent if record is not None])
+        return Response({'result': [item for record, item in sent]})
+
+    def send_in_thread(self, data):
+        try:
+            return self.send(data)
+        finally:
+            close_old_connections()
+
+    def get_sent(self, future):
+        # a message that broke unexpectedly must not lose the audit records of the others
+        try:
+            return future.result()
+        except Exception:
+            logger.exception('Failed to send a message of the batch')
+            return None, {'code': consts.STATUS_ERROR_API, 'description': 'Failed to send the message'}
+
+    def send(self, data):
+        try:
+            ratelimit.acquire(consts.RATE_LIMIT_SEND, self.max_wait)
+        except Throttled as ex:
+            return None, {'code': consts.STATUS_THROTTLED, 'description': ex.detail}
+
+        try:
+            with concurrency.get_limiter(self.api_resource).slot(api_resource=self.api_resource) as slot:
+                answer, record = audit.call(self.api_resource,
+                                            resilience.wrap(self.api_resource, self.api_resource_lib), data)
+                slot.record = record
+        except Throttled as ex:
+            return None, {'code': consts.STATUS_THROTTLED, 'description': ex.detail}
+        except UpstreamUnavailable as ex:
+            return None, {'code': consts.STATUS_UNAVAILABLE, 'description': ex.detail}
+        if answer is None:
+            return record, {'code': record.code, 'description': record.description}
+        return record, {'code': answer.code, 'description': answer.description, 'result': answer.result}
+
 
 class GetStatusMessages(BaseDevino):
     api_resource = consts.GET_STATUS_MESSAGE
     serializer = serializers.GetStatusMessages
-    api_resource_lib = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).get_status_transactional_message
+    api_resource_lib = clients.ClientMethod('get_status_transactional_message')
+    http_method_names = ['get', ]
+    coalesce = True
+
+
+def get_status_response(code):
+    if code == consts.STATUS_BAD_REQUEST:
+        return status.HTTP_400_BAD_REQUEST
+    if code == consts.STATUS_ERROR_API:
+        return status.HTTP_500_INTERNAL_SERVER_ERROR
+    return status.HTTP_200_OK
+
+
+class GetQueuedMessage(views.APIView):
+    http_method_names = ['get', ]
+
+    def get(self, request):
+        serializer = serializers.GetQueuedMessage(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        message = get_object_or_404(models.QueuedMessage, id=serializer.validated_data['id'])
+        return Response({
+            'id': message.id,
+            'status': message.status,
+            'attempts': message.attempts,
+            'code': message.code,
+            'description': message.description,
+        })
+
+
+class GetDevinoCalls(views.APIView):
+    http_method_names = ['get', ]
+
+    def get(self, request):
+        serializer = serializers.GetDevinoCalls(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        records, next_cursor = audit.query(**serializer.validated_data)
+        return Response({
+            'result': [serialize_devino_call(record) for record in records],
+            'next_cursor': next_cursor,
+        })
+
+
+class GetDevinoCall(views.APIView):
     http_method_names = ['get', ]
+
+    def get(self, request):
+        serializer = serializers.GetDevinoCall(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        record = get_object_or_404(models.DevinoCall, id=serializer.validated_data['id'])
+        # payloads from the blob store are loaded only here, not in the list
+        record.data = blobs.get_data(record)
+        record.result = blobs.get_result(record)
+        return Response(serialize_devino_call(record))
+
+
+def serialize_devino_call(record):
+    return {
+        'id': record.id,
+        'api_resource': record.api_resource,
+        'data': record.data,
+        'data_hash': record.data_hash,
+        'data_size': record.data_size,
+        'code': record.code,
+        'description': record.description,
+        'result': record.result,
+        'result_hash': record.result_hash,
+        'result_size': record.result_size,
+        'is_fail': record.is_fail,
+        'latency': record.latency,
+        'dc': record.dc,
+    }
+
+
+class GetCircuitBreakers(views.APIView):
+    http_method_names = ['get', ]
+
+    def get(self, request):
+        return Response({'result': [breaker.get_state() for name, breaker in sorted(resilience.breakers.items())]})
+
+
+class GetConcurrencyLimits(views.APIView):
+    http_method_names = ['get', ]
+
+    def get(self, request):
+        # limits of the worker process that serves the request
+        return Response({'result': [limiter.get_state() for name, limiter in sorted(concurrency.limiters.items())]})
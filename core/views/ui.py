@@ -1,19 +1,21 @@
-import json
-
+from django.conf import settings
 from django.views.generic import FormView
 from django.urls import reverse_lazy
-from django.conf import settings
 from django.contrib import messages
 from django.views.generic import RedirectView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponseBadRequest, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseRedirect
+from prometheus_client import CONTENT_TYPE_LATEST
+from rest_framework.exceptions import Throttled
 
-from email_devino.client import DevinoClient
-from email_devino.client import DevinoException
-
-from core import models
+from core import audit
+from core import clients
 from core import forms
 from core import consts
+from core import metrics
+from core import ratelimit
+from core import resilience
+from core.exceptions import UpstreamUnavailable
 
 
 class Index(RedirectView):
@@ -27,27 +29,47 @@ class SendMessage(LoginRequiredMixin, FormView):
     success_url = reverse_lazy('send_message_interface')
     template_name = 'core/send_message.html'
 
+    def post(self, request, *args, **kwargs):
+        self.timing = metrics.Timing(consts.SEND_MESSAGE)
+        form = self.get_form()
+        with self.timing.phase(metrics.PHASE_VALIDATE):
+            is_valid = form.is_valid()
+        response = self.form_valid(form) if is_valid else self.form_invalid(form)
+
+        if hasattr(response, 'render'):
+            with self.timing.phase(metrics.PHASE_RENDER):
+                response.render()
+        self.timing.observe(response.status_code)
+        return response
+
     def form_valid(self, form):
-        json_data = json.dumps(form.cleaned_data)
-        devino_request = models.DevinoRequest.objects.create(api_resource=consts.SEND_MESSAGE, data=json_data)
+        try:
+            with self.timing.phase(metrics.PHASE_WAIT):
+                ratelimit.acquire(consts.RATE_LIMIT_SEND, settings.DEVINO_RATE_LIMIT_MAX_WAIT)
+        except Throttled:
+            messages.error(self.request, 'Too many messages are being sent, please repeat later')
+            return HttpResponseBadRequest()
 
         try:
-            answer = DevinoClient(settings.DEVINO_LOGIN, settings.DEVINO_PASSWORD).send_transactional_message(
-                **form.cleaned_data)
-            models.DevinoAnswer.objects.create(
-                code=answer.code,
-                description=answer.description,
-                result=answer.result,
-                request=devino_request,
-            )
-            messages.success(self.request, 'Message successfully delivered')
-        except DevinoException as ex:
-            models.DevinoAnswer.objects.create(
-                code=ex.error.code,
-                description=ex.error.description,
-                request=devino_request,
-                is_fail=True,
-            )
+            with self.timing.phase(metrics.PHASE_UPSTREAM):
+                answer, record = audit.call(
+                    consts.SEND_MESSAGE,
+                    resilience.wrap(consts.SEND_MESSAGE, clients.get_client().send_transactional_message),
+                    form.cleaned_data,
+                )
+        except UpstreamUnavailable:
+            messages.error(self.request, 'Devino is unavailable, please repeat later')
+            return HttpResponseBadRequest()
+        self.timing.code = record.code
+        with self.timing.phase(metrics.PHASE_AUDIT):
+            audit.write([record])
+        if answer is None:
             messages.error(self.request, 'Error in sending the request, pleate repeat')
             return HttpResponseBadRequest()
+
+        messages.success(self.request, 'Message successfully delivered')
         return HttpResponseRedirect(self.success_url)
+
+
+def prometheus_metrics(request):
+    return HttpResponse(metrics.generate(), content_type=CONTENT_TYPE_LATEST)
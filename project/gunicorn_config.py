@@ -0,0 +1,26 @@
+import os
+import glob
+
+bind = '0.0.0.0:80'
+workers = 5
+
+
+def on_starting(server):
+    # metric files of the previous run would be summed up with the new ones
+    path = os.environ.get('prometheus_multiproc_dir')
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in glob.glob(os.path.join(path, '*.db')):
+            os.remove(name)
+
+
+def worker_exit(server, worker):
+    # usually called in the exiting worker, in the master for workers that are already gone
+    if worker.pid == os.getpid():
+        from core import audit
+        audit.writer.flush()
+
+    # live gauges of the worker would be summed up forever
+    if os.environ.get('prometheus_multiproc_dir'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,4 +1,6 @@
 DEBUG = False
 SECRET_KEY = '123'
 
-ALLOWED_HOSTS = []
\ No newline at end of file
+ALLOWED_HOSTS = []
+
+DEVINO_AUDIT_MODE = 'buffered'
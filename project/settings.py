@@ -87,6 +87,21 @@ DATABASES = {
 }
 
 
+# Cache shared by all workers, create the table with "manage.py createcachetable"
+# https://docs.djangoproject.com/en/1.11/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {
+            # a full table drops a third of the entries, breaker states among them
+            'MAX_ENTRIES': 100000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -128,6 +143,132 @@ STATIC_URL = '/static/'
 
 DEVINO_LOGIN = 'Your Login'
 DEVINO_PASSWORD = 'Your password'
+DEVINO_URL = 'https://integrationapi.net/email/v1'
+DEVINO_BACKEND = 'devino'       # 'simulator' answers in the process with DEVINO_SIMULATOR, no calls are made
+DEVINO_POOL_SIZE = 10           # keep-alive connections per worker process
+DEVINO_CONNECT_TIMEOUT = 5      # seconds
+DEVINO_READ_TIMEOUT = 30        # seconds
+
+# confirmed sender addresses of the send message form
+DEVINO_SENDER_ADDRESSES_TTL = 300           # seconds
+DEVINO_SENDER_ADDRESSES_STALE_TTL = 86400   # seconds an expired list is still shown while it is refreshed
+
+# get_template / get_task answers, kept in every worker and invalidated by edits through the shared cache
+DEVINO_RESOURCE_CACHE_SIZE = 1000
+DEVINO_RESOURCE_CACHE_TTL = 600     # seconds
+
+# get_state / get_state_detailing answers of unfinished tasks, finished ones are kept without expiry
+DEVINO_STATE_CACHE_TTL = 30     # seconds
+
+# identical concurrent read requests of a worker share one upstream call. Set to the alias of a fast cache
+# shared by the workers (memcached, redis) to share it between them, every read then writes to that cache
+DEVINO_SINGLEFLIGHT_CACHE = None
+DEVINO_SINGLEFLIGHT_TIMEOUT = 40            # seconds to wait for another worker's call
+DEVINO_SINGLEFLIGHT_POLL_INTERVAL = 0.05    # seconds
+DEVINO_SINGLEFLIGHT_RESULT_TTL = 10         # seconds
+
+# audit records of Devino calls are saved right away ('sync') or in bulk by each worker ('buffered')
+DEVINO_AUDIT_MODE = 'sync'
+DEVINO_AUDIT_BUFFER_SIZE = 100
+DEVINO_AUDIT_BUFFER_MAX = 10000         # records kept while the database is unavailable
+DEVINO_AUDIT_FLUSH_INTERVAL = 2         # seconds
+DEVINO_AUDIT_PAGE_MAX_SIZE = 1000
+# data and result larger than this many bytes are stored once per content in AuditBlob, None keeps them inline
+DEVINO_AUDIT_BLOB_THRESHOLD = None
+DEVINO_AUDIT_BLOB_ORPHAN_GRACE = 86400  # seconds an unreferenced blob is kept
+
+# purge_devino_calls: days audit records are kept by api_resource, None keeps them forever
+DEVINO_RETENTION_DAYS = 180
+DEVINO_RETENTION_POLICY = {
+    'get_state': 30,
+    'get_state_detailing': 14,
+    'get_status_message': 30,
+}
+DEVINO_RETENTION_ARCHIVE_DIR = os.path.join(BASE_DIR, 'archive')
+DEVINO_RETENTION_BATCH_SIZE = 1000
+DEVINO_RETENTION_PAUSE = 0.1            # seconds between batches
+
+# token buckets of calls to Devino shared by all workers: tokens per second and the largest burst
+DEVINO_RATE_LIMITS = {
+    'send': {'rate': 100, 'burst': 200},    # send_message
+    'bulk': {'rate': 5, 'burst': 10},       # tasks, templates and sender addresses changes
+    'read': {'rate': 50, 'burst': 100},     # get_* calls
+}
+DEVINO_RATE_LIMIT_BACKEND = 'core.ratelimit.DatabaseBackend'
+DEVINO_RATE_LIMIT_MAX_WAIT = 5              # seconds a request may wait for a token before 429
+
+# (connect, read) timeouts in seconds by api_resource, others use DEVINO_CONNECT_TIMEOUT and DEVINO_READ_TIMEOUT
+DEVINO_TIMEOUTS = {
+    'send_message': (5, 15),
+    'get_state_detailing': (5, 60),
+}
+# get_* calls failed by a connection error or a 5xx answer are tried again after a jittered exponential backoff
+DEVINO_RETRY_ATTEMPTS = 3
+DEVINO_RETRY_BACKOFF = 0.1          # seconds before the first retry
+DEVINO_RETRY_BACKOFF_MAX = 2        # seconds
+
+# a circuit breaker per rate limit bucket opens on the error rate of a worker's calls and fails fast with 503
+DEVINO_BREAKER_WINDOW = 30          # seconds the calls are counted over
+DEVINO_BREAKER_MIN_CALLS = 20       # calls in the window before the error rate counts
+DEVINO_BREAKER_ERROR_RATE = 0.5
+DEVINO_BREAKER_COOL_DOWN = 30       # seconds the breaker is open before a probe call
+DEVINO_BREAKER_STATE_TTL = 86400    # seconds the state is kept after its last change, expired entries go first
+
+# calls to Devino in flight in each worker process per rate limit bucket, the limit adapts to Devino's health
+DEVINO_CONCURRENCY_INITIAL = 10
+DEVINO_CONCURRENCY_MIN = 1
+DEVINO_CONCURRENCY_MAX = 100
+DEVINO_CONCURRENCY_BACKOFF = 0.9            # the limit is multiplied by it on an error or a slow call
+DEVINO_CONCURRENCY_LATENCY_LIMIT = 5        # seconds, slower calls lower the limit
+DEVINO_CONCURRENCY_LATENCY_LIMITS = {       # by api_resource
+    'get_state_detailing': 20,
+}
+DEVINO_CONCURRENCY_MAX_WAIT = 1             # seconds a request waits for a free slot before 429
+
+# repeated /api/send_message/ requests with the same Idempotency-Key header get the answer of the first one
+DEVINO_IDEMPOTENCY_TTL = 86400              # seconds a key is kept
+DEVINO_IDEMPOTENCY_USER_MESSAGE_ID = False  # use user_message_id as the key when there is no header
+DEVINO_IDEMPOTENCY_WAIT_TIMEOUT = 40        # seconds a repeat waits for the first request
+DEVINO_IDEMPOTENCY_PENDING_TIMEOUT = 60     # seconds after which an unfinished first request is considered dead
+DEVINO_IDEMPOTENCY_POLL_INTERVAL = 0.1      # seconds
+
+# accept /api/send_message/ into the queue table and deliver with "manage.py dispatch_messages"
+DEVINO_SEND_MESSAGE_QUEUE = False
+DEVINO_DISPATCHER_WORKERS = 4
+DEVINO_DISPATCHER_BATCH_SIZE = 20
+DEVINO_DISPATCHER_POLL_INTERVAL = 1     # seconds
+DEVINO_DISPATCHER_LOCK_TIMEOUT = 300    # seconds before a claimed message is given to another dispatcher
+DEVINO_DISPATCHER_MAX_ATTEMPTS = 5
+
+# Devino simulator of DEVINO_BACKEND = 'simulator' and "manage.py simulate_devino": latency, errors and result sizes,
+# the 'default' profile is updated by the profile of each api_resource
+DEVINO_SIMULATOR = {
+    'seed': None,
+    'default': {
+        'latency': {'distribution': 'lognormal', 'median': 0.05, 'sigma': 0.5},    # seconds
+        'error_rate': 0,                # share of calls answered with error_status
+        'error_status': 500,
+        'connection_error_rate': 0,     # share of calls with a broken connection
+    },
+    'get_addresses_sender': {'result_size': 3},
+    'get_bulk_list': {'result_size': 50},
+    'get_state_detailing': {
+        'latency': {'distribution': 'lognormal', 'median': 0.3, 'sigma': 0.7},
+        'result_size': 1000,            # messages of a task, pages are cut by the Range header
+    },
+}
+
+# /api/stream_state_detailing/ and /api/stream_tasks/ page through Devino, the next pages are fetched
+# concurrently while a page is sent
+DEVINO_STREAM_PAGE_MAX_SIZE = 1000
+DEVINO_STREAM_PREFETCH = {      # pages fetched ahead by api_resource
+    'get_state_detailing': 1,
+    'get_bulk_list': 4,
+}
+
+# /api/send_messages/
+DEVINO_BATCH_MAX_SIZE = 1000
+DEVINO_BATCH_WORKERS = 10
 
 LOGIN_URL = '/admin/login/'
 LOGOUT_URL = '/admin/logout/'